@@ -6,6 +6,8 @@ from app.routes.data.data import data_bp
 from app.routes.analyze.analyze import analyze_bp
 from app.routes.visualization.visualization import visualization_bp
 from app.routes.frontend.frontend import frontend_bp
+from app.forecast.orders import order_registry
+from app.forecast.store import start_refresh_scheduler
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -19,4 +21,7 @@ def create_app(config_class=Config):
     app.register_blueprint(analyze_bp)
     app.register_blueprint(visualization_bp)
     
+    order_registry.load()
+    start_refresh_scheduler(app.config['FORECAST_REFRESH_INTERVAL'])
+    
     return app 
\ No newline at end of file
@@ -0,0 +1,61 @@
+from app.config import Config
+from typing import Callable, Dict, Optional, Tuple
+import threading
+import time
+
+COUNT_MODES = ('exact', 'planned', 'estimated')
+
+
+class CountCache:
+    """Row counts of filtered table ranges, keyed by table and the filters that affect the count.
+
+    Counts are dropped for a table when new rows are loaded into it (`invalidate`) and
+    expire after `ttl` seconds, which covers rows written past the API.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._counts: Dict[Tuple, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, counter: Callable[[], Optional[int]]) -> Optional[int]:
+        """Returns the cached count for `key` (table name first) or calls `counter` and caches it."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None and now - cached[0] < self.ttl:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        # Подсчёт вне блокировки: медленный COUNT по одной таблице не задерживает остальные
+        count = counter()
+        if count is not None:
+            with self._lock:
+                self._counts[key] = (now, count)
+        return count
+
+    def invalidate(self, table_name: str = None):
+        with self._lock:
+            if table_name is None:
+                self._counts.clear()
+            else:
+                for key in [key for key in self._counts if key[0] == table_name]:
+                    del self._counts[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+                "entries": len(self._counts),
+                "ttl": self.ttl,
+                "tables": sorted({key[0] for key in self._counts})
+            }
+
+
+count_cache = CountCache(Config.get('COUNT_CACHE_TTL'))
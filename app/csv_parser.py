@@ -0,0 +1,83 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+# Формат времени в выгрузках датчиков: 2024-01-01T00:06:09,555
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S,%f'
+TIME_COLUMN_NAMES = ('time', 'timestamp')
+DEFAULT_DECIMAL = ','
+
+
+def normalize_headers(headers: Iterable[str]) -> List[str]:
+    """Normalizes raw CSV headers to the column names used in the database."""
+    result = []
+    for header in headers:
+        clean_header = header.split(' ')[0].strip()
+        clean_header = ''.join(c for c in clean_header if c.isprintable())
+
+        if re.match(r'T_\d+', clean_header):
+            result.append("T")
+            continue
+
+        match = re.match(r'^T\d+_(.*)', clean_header)
+        if match:
+            clean_header = match.group(1)
+
+        result.append(clean_header)
+    return result
+
+
+def find_time_column(columns: Iterable[str]) -> Optional[str]:
+    for column in columns:
+        if column.lower() in TIME_COLUMN_NAMES:
+            return column
+    return None
+
+
+def build_dtypes(columns: Iterable[str], time_column: Optional[str]) -> Dict[str, str]:
+    """Time is read as a string and parsed separately, every sensor column is float64."""
+    return {column: (str if column == time_column else 'float64') for column in columns}
+
+
+def parse_time(values: pd.Series) -> pd.Series:
+    try:
+        return pd.to_datetime(values, format=TIME_FORMAT)
+    except (ValueError, TypeError):
+        # Запасной путь для файлов с другим форматом времени
+        return pd.to_datetime(values.str.replace(',', '.'))
+
+
+def read_sensor_csv(source, names: List[str], separator: str = ';', decimal: str = DEFAULT_DECIMAL,
+                    skip_header: bool = True, chunksize: Optional[int] = None, encoding: Optional[str] = None):
+    """Reads a sensor CSV with native comma-decimal parsing.
+
+    `names` are the already cleaned column names. With `chunksize` an iterator of
+    converted chunks is returned, otherwise a single DataFrame.
+    """
+    time_column = find_time_column(names)
+    reader = pd.read_csv(
+        source,
+        sep=separator,
+        names=names,
+        header=0 if skip_header else None,
+        dtype=build_dtypes(names, time_column),
+        decimal=decimal,
+        encoding=encoding,
+        chunksize=chunksize
+    )
+
+    if chunksize is None:
+        return _convert_time(reader, time_column)
+    return (_convert_time(chunk, time_column) for chunk in reader)
+
+
+def read_csv_header(path: str, separator: str = ';', encoding: str = 'utf-8-sig') -> List[str]:
+    with open(path, encoding=encoding) as f:
+        return f.readline().rstrip('\r\n').split(separator)
+
+
+def _convert_time(df: pd.DataFrame, time_column: Optional[str]) -> pd.DataFrame:
+    if time_column is not None:
+        df[time_column] = parse_time(df[time_column])
+    return df
@@ -0,0 +1,183 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.readings import sensor_lookup
+
+AGGREGATION_METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x: np.ndarray, Y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets for every row of `Y` (series x time) sharing the axis `x`.
+
+    Returns indices of shape (series, threshold): the first and the last point, and
+    from each of the threshold - 2 equal-count buckets the point that forms the
+    largest triangle with the previously selected point and the next bucket's mean.
+    """
+    series, n = Y.shape
+    if threshold >= n or threshold < 3:
+        return np.tile(np.arange(n), (series, 1))
+
+    edges = np.arange(threshold - 1) * (n - 2) // (threshold - 2) + 1
+    counts = np.diff(edges)
+
+    # Средние всех корзин сразу через накопленные суммы
+    x_sums = np.concatenate([[0.0], np.cumsum(x)])
+    Y_sums = np.concatenate([np.zeros((series, 1)), np.cumsum(Y, axis=1)], axis=1)
+    x_means = (x_sums[edges[1:]] - x_sums[edges[:-1]]) / counts
+    Y_means = (Y_sums[:, edges[1:]] - Y_sums[:, edges[:-1]]) / counts
+    # Для корзины j «следующая» точка - среднее корзины j + 1, для последней - последняя точка ряда
+    next_x = np.append(x_means[1:], x[-1])
+    next_Y = np.concatenate([Y_means[:, 1:], Y[:, -1:]], axis=1)
+
+    rows = np.arange(series)
+    result = np.empty((series, threshold), dtype=int)
+    result[:, 0] = 0
+    result[:, -1] = n - 1
+    selected = np.zeros(series, dtype=int)
+    for bucket, (start, end) in enumerate(zip(edges[:-1], edges[1:])):
+        xa = x[selected][:, None]
+        ya = Y[rows, selected][:, None]
+        area = np.abs(
+            (xa - next_x[bucket]) * (Y[:, start:end] - ya)
+            - (xa - x[start:end]) * (next_Y[:, bucket:bucket + 1] - ya)
+        )
+        selected = start + area.argmax(axis=1)
+        result[:, bucket + 1] = selected
+    return result
+
+
+def bucket_aggregates(x: np.ndarray, buckets: int, minimum: np.ndarray, maximum: np.ndarray,
+                      total: np.ndarray, count: np.ndarray) -> dict:
+    """Combines per-point aggregates (series x time) into `buckets` equal-width intervals of `x`.
+
+    For raw readings `minimum` and `maximum` are the values themselves, `total` the values
+    with NaN as 0 and `count` 1 for every non-NaN value; rollup rows pass their own
+    aggregates. Only non-empty intervals are returned; `start` holds the left edge of
+    each interval on the `x` scale.
+    """
+    span = x[-1] - x[0]
+    ids = np.zeros(len(x), dtype=int) if span <= 0 else \
+        np.minimum(((x - x[0]) / span * buckets).astype(int), buckets - 1)
+    starts = np.flatnonzero(np.r_[True, np.diff(ids) != 0])
+
+    count = np.add.reduceat(count, starts, axis=1)
+    total = np.add.reduceat(total, starts, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    return {
+        "start": x[0] + ids[starts] * (span / buckets if span > 0 else 0.0),
+        "min": np.fmin.reduceat(minimum, starts, axis=1),
+        "max": np.fmax.reduceat(maximum, starts, axis=1),
+        "mean": mean,
+        "count": count
+    }
+
+
+def _lttb_readings(index: pd.DatetimeIndex, columns, x: np.ndarray, values: np.ndarray,
+                   points: int, lookup) -> Dict[str, List[dict]]:
+    by_time = {}
+    complete = ~np.isnan(values).any(axis=1)
+
+    # Ряды без пропусков обрабатываются одним пакетом, остальные - по отдельности на своих точках
+    groups = [(np.flatnonzero(complete), np.arange(len(x)))] if complete.any() else []
+    for row in np.flatnonzero(~complete):
+        groups.append((np.array([row]), np.flatnonzero(~np.isnan(values[row]))))
+
+    for rows, positions in groups:
+        if not len(positions):
+            continue
+        selected = positions[lttb_indices(x[positions], values[np.ix_(rows, positions)], points)]
+        for row, indices in zip(rows, selected):
+            column = columns[row]
+            sensor_type, sensor_index = lookup.get(column, ("unknown", 0))
+            for position, value in zip(indices.tolist(), values[row, indices].tolist()):
+                by_time.setdefault(index[position].isoformat(), []).append({
+                    "sensor": column,
+                    "sensor_type": sensor_type,
+                    "sensor_index": sensor_index,
+                    "value": value
+                })
+    return by_time
+
+
+def _minmax_readings(index: pd.DatetimeIndex, columns, x: np.ndarray, aggregates: dict,
+                     lookup) -> Dict[str, List[dict]]:
+    origin = index[0]
+    times = [(origin + pd.Timedelta(seconds=float(start))).isoformat() for start in aggregates["start"]]
+    by_time = {time_str: [] for time_str in times}
+
+    bands = zip(*(aggregates[name].tolist() for name in ("mean", "min", "max", "count")))
+    for column, (means, minimums, maximums, counts) in zip(columns, bands):
+        sensor_type, sensor_index = lookup.get(column, ("unknown", 0))
+        for time_str, mean, minimum, maximum, count in zip(times, means, minimums, maximums, counts):
+            if not count:
+                continue
+            by_time[time_str].append({
+                "sensor": column,
+                "sensor_type": sensor_type,
+                "sensor_index": sensor_index,
+                "value": mean,
+                "min": minimum,
+                "max": maximum,
+                "count": int(count)
+            })
+    return {time_str: readings for time_str, readings in by_time.items() if readings}
+
+
+def _check_method(method: str):
+    if method not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown aggregation '{method}', expected one of: {', '.join(AGGREGATION_METHODS)}")
+
+
+def _seconds(index: pd.DatetimeIndex) -> np.ndarray:
+    # Секунды от первой точки: float64 без потери точности, в отличие от наносекунд эпохи
+    return (index - index[0]).total_seconds().to_numpy()
+
+
+def downsample_readings(df: pd.DataFrame, method: str, points: int, sensor_info) -> Dict[str, List[dict]]:
+    """Downsamples a sorted, Time-indexed frame to about `points` readings per sensor.
+
+    'lttb' keeps original readings chosen by Largest-Triangle-Three-Buckets; 'minmax'
+    returns per time bucket the mean as `value` together with `min`, `max` and `count`.
+    The result is grouped by timestamp in the sensor endpoint's readings format.
+    """
+    _check_method(method)
+    if df.empty:
+        return {}
+
+    x = _seconds(df.index)
+    values = df.to_numpy(dtype=float).T
+    lookup = sensor_lookup(sensor_info)
+    if method == 'lttb':
+        return _lttb_readings(df.index, list(df.columns), x, values, points, lookup)
+
+    valid = ~np.isnan(values)
+    aggregates = bucket_aggregates(x, points, values, values, np.where(valid, values, 0.0), valid.astype(int))
+    return _minmax_readings(df.index, list(df.columns), x, aggregates, lookup)
+
+
+def downsample_rollup_readings(df: pd.DataFrame, column_names, method: str, points: int,
+                               sensor_info) -> Dict[str, List[dict]]:
+    """`downsample_readings` for a rollup frame with `<column>_min/_max/_mean/_count` columns.
+
+    'lttb' runs on the bucket means; 'minmax' merges the rollup aggregates, so `min`,
+    `max` and `count` still describe the raw readings.
+    """
+    _check_method(method)
+    if df.empty:
+        return {}
+
+    def band(name):
+        return np.vstack([df[f"{column}_{name}"].to_numpy(dtype=float) for column in column_names])
+
+    x = _seconds(df.index)
+    mean = band("mean")
+    lookup = sensor_lookup(sensor_info)
+    if method == 'lttb':
+        return _lttb_readings(df.index, list(column_names), x, mean, points, lookup)
+
+    count = np.nan_to_num(band("count"))
+    aggregates = bucket_aggregates(x, points, band("min"), band("max"), np.nan_to_num(mean) * count, count)
+    return _minmax_readings(df.index, list(column_names), x, aggregates, lookup)
@@ -0,0 +1,127 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.special import comb
+from scipy.stats import norm
+
+# Облегчённый движок прогноза: ARIMA(p, d, q) сводится к AR(p) на d раз
+# продифференцированном ряде, коэффициенты всех рядов с одинаковыми (p, d) и длиной
+# находятся одним пакетным МНК. MA-часть (q) не оценивается.
+
+# Относительная регуляризация нормальных уравнений: защищает от вырожденных
+# матриц на постоянных рядах и почти не влияет на обычные
+RIDGE = 1e-8
+
+
+def fit_ar(Y: np.ndarray, p: int):
+    """Least-squares AR(p) with intercept for every row of `Y` (series x time).
+
+    Returns coefficients of shape (series, p + 1) - intercept, then lags 1..p -
+    and the residual variance of every series.
+    """
+    series, n = Y.shape
+    if n <= p + 1:
+        raise ValueError(f"Not enough observations ({n}) for AR({p})")
+    if p == 0:
+        return Y.mean(axis=1, keepdims=True), Y.var(axis=1)
+
+    X = np.empty((series, n - p, p + 1))
+    X[:, :, 0] = 1.0
+    for lag in range(1, p + 1):
+        X[:, :, lag] = Y[:, p - lag:n - lag]
+    y = Y[:, p:]
+
+    XtX = np.einsum('kti,ktj->kij', X, X)
+    Xty = np.einsum('kti,kt->ki', X, y)
+    scale = np.trace(XtX, axis1=1, axis2=2)[:, None, None] / (p + 1)
+    XtX += RIDGE * np.maximum(scale, 1.0) * np.eye(p + 1)
+    coef = np.linalg.solve(XtX, Xty[:, :, None])[:, :, 0]
+
+    residuals = y - np.einsum('kti,ki->kt', X, coef)
+    return coef, (residuals ** 2).mean(axis=1)
+
+
+def forecast_std(phi: np.ndarray, d: int, sigma2: np.ndarray, length: int) -> np.ndarray:
+    """Forecast standard errors of ARIMA(p, d, 0) from its psi (MA infinity) weights."""
+    series, p = phi.shape
+    # Полином phi(B) * (1 - B)^d; x_t = sum a_i x_{t-i} + e_t
+    polynomial = np.zeros((series, p + d + 1))
+    phi_polynomial = np.concatenate([np.ones((series, 1)), -phi], axis=1)
+    for i in range(d + 1):
+        polynomial[:, i:i + p + 1] += (-1) ** i * comb(d, i) * phi_polynomial
+    a = -polynomial[:, 1:]
+
+    psi = np.zeros((series, length))
+    psi[:, 0] = 1.0
+    for j in range(1, length):
+        lags = min(j, a.shape[1])
+        psi[:, j] = (a[:, :lags] * psi[:, j - 1::-1][:, :lags]).sum(axis=1)
+
+    return np.sqrt(sigma2[:, None] * np.cumsum(psi ** 2, axis=1))
+
+
+def forecast_ar(Y: np.ndarray, coef: np.ndarray, length: int) -> np.ndarray:
+    """Recursive multi-step forecast of every row of `Y` with its AR coefficients."""
+    p = coef.shape[1] - 1
+    # Последние p значений в порядке лаг 1, лаг 2, ... лаг p
+    history = Y[:, ::-1][:, :p].copy()
+    result = np.empty((Y.shape[0], length))
+
+    for step in range(length):
+        value = coef[:, 0] + (coef[:, 1:] * history).sum(axis=1)
+        result[:, step] = value
+        if p:
+            history = np.concatenate([value[:, None], history[:, :-1]], axis=1)
+    return result
+
+
+def arima_forecast(Y: np.ndarray, p: int, d: int, length: int):
+    """Forecasts `length` steps for every row of `Y` with AR(p) on the d-times differenced data.
+
+    Returns the mean forecast and its standard errors, both of shape (series, length).
+    """
+    levels = []
+    for _ in range(d):
+        levels.append(Y[:, -1])
+        Y = np.diff(Y, axis=1)
+
+    coef, sigma2 = fit_ar(Y, p)
+    forecast = forecast_ar(Y, coef, length)
+
+    # Обратное дифференцирование: от старшей разности к исходному ряду
+    for last in reversed(levels):
+        forecast = last[:, None] + np.cumsum(forecast, axis=1)
+    return forecast, forecast_std(coef[:, 1:], d, sigma2, length)
+
+
+def ar_forecasts(series_by_column: Dict[str, Tuple[str, list, pd.Series]], length: int, alpha: float):
+    """Batched counterpart of `fit_forecasts`: same arguments, same (forecasts, errors) result.
+
+    Columns are grouped by (p, d, number of observations) and each group is fitted
+    with a single batched least-squares solve. Each forecast is a (3, length) array:
+    mean, lower and upper bound of the 1 - `alpha` interval.
+    """
+    groups = {}
+    for column, (_, order, series) in series_by_column.items():
+        p, d = int(order[0]), int(order[1])
+        groups.setdefault((p, d, len(series)), []).append(column)
+
+    z = norm.ppf(1 - alpha / 2)
+    forecasts = {}
+    errors = {}
+    for (p, d, _), columns in groups.items():
+        Y = np.vstack([series_by_column[column][2].to_numpy(dtype=float) for column in columns])
+        try:
+            mean, std = arima_forecast(Y, p, d, length)
+        except (ValueError, np.linalg.LinAlgError) as e:
+            errors.update({column: str(e) for column in columns})
+            continue
+        bands = np.stack([mean, mean - z * std, mean + z * std], axis=1)
+        for row, column in enumerate(columns):
+            if np.isfinite(bands[row]).all():
+                forecasts[column] = bands[row]
+            else:
+                errors[column] = "AR forecast diverged"
+
+    return forecasts, errors
@@ -0,0 +1,85 @@
+from typing import Dict
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.readings import sensor_lookup
+
+BANDS = ('mean', 'lower', 'upper')
+
+
+class ForecastFrame:
+    """Forecast horizon for several sensors, stored column-wise.
+
+    Every sensor has one (3, length) float array: the mean forecast and the lower
+    and upper bound of its confidence interval, all on the shared `index`.
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, bands: Dict[str, np.ndarray], alpha: float = None):
+        self.index = index
+        self.bands = bands
+        self.alpha = alpha
+
+    @property
+    def columns(self):
+        return list(self.bands)
+
+    @property
+    def empty(self) -> bool:
+        return not self.bands
+
+    def mean(self) -> pd.DataFrame:
+        return pd.DataFrame({column: values[0] for column, values in self.bands.items()}, index=self.index)
+
+    def head(self, length: int) -> 'ForecastFrame':
+        return ForecastFrame(
+            self.index[:length], {column: values[:, :length] for column, values in self.bands.items()}, self.alpha
+        )
+
+    def select(self, columns) -> 'ForecastFrame':
+        return ForecastFrame(
+            self.index, {column: self.bands[column] for column in columns if column in self.bands}, self.alpha
+        )
+
+    def readings_by_time(self, sensor_info) -> dict:
+        """Groups the forecast into readings by timestamp, the format of the sensor endpoint."""
+        lookup = sensor_lookup(sensor_info)
+        times = [timestamp.isoformat() for timestamp in self.index]
+        predictions_by_time = {time_str: [] for time_str in times}
+
+        for column, values in self.bands.items():
+            sensor_type, sensor_index = lookup.get(column, ("unknown", 0))
+            for time_str, mean, lower, upper in zip(times, *values.tolist()):
+                if math.isnan(mean):
+                    continue
+                predictions_by_time[time_str].append({
+                    "sensor": column,
+                    "sensor_type": sensor_type,
+                    "sensor_index": sensor_index,
+                    "value": mean,
+                    "lower": lower,
+                    "upper": upper
+                })
+
+        return predictions_by_time
+
+    def to_dict(self) -> dict:
+        return {
+            "times": [timestamp.isoformat() for timestamp in self.index],
+            "alpha": self.alpha,
+            "sensors": {
+                column: dict(zip(BANDS, values.tolist())) for column, values in self.bands.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ForecastFrame':
+        return cls(
+            pd.to_datetime(data["times"]),
+            {
+                column: np.array([values[band] for band in BANDS], dtype=float)
+                for column, values in data["sensors"].items()
+            },
+            data.get("alpha")
+        )
@@ -0,0 +1,152 @@
+from app.config import Config
+from collections import OrderedDict
+from typing import Optional, Tuple
+import threading
+import logging
+import pickle
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+
+class CachedModel:
+    """A fitted SARIMAX result together with the span of data it was fitted on."""
+
+    def __init__(self, results, first_time, last_time):
+        self.results = results
+        self.first_time = first_time
+        self.last_time = last_time
+        self.nobs = int(results.nobs)
+        self.size_bytes = len(pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ModelCache:
+    """LRU cache of fitted SARIMAX models with an entry count and a memory cap.
+
+    Keys are (table, column, order_key, order). The last timestamp used for the fit
+    is the data watermark: when a request's window contains it and brings new rows
+    after it, the cached model is extended with `append` instead of being refitted.
+    The training window slides forward as rows arrive, so the extended model keeps
+    rows that have left the window; it is refitted once those exceed `max_drift`
+    of the window.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, max_drift: float = 0.25):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_drift = max_drift
+        self._entries: 'OrderedDict[Tuple, CachedModel]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.extensions = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[CachedModel]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry: CachedModel):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size_bytes
+
+            if entry.size_bytes > self.max_bytes:
+                logging.warning(f"Model {key} ({entry.size_bytes} bytes) exceeds the cache limit, not cached")
+                return
+
+            self._entries[key] = entry
+            self._bytes += entry.size_bytes
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "max_drift": self.max_drift,
+                "hits": self.hits,
+                "extensions": self.extensions,
+                "misses": self.misses
+            }
+
+    def plan(self, key, series: pd.Series):
+        """Decides how to obtain a model for `series` without fitting anything.
+
+        Returns ('hit', results, None), ('extend', results, new_values) or
+        ('fit', None, values), where the values are what `fit_or_extend` needs.
+        """
+        entry = self.get(key)
+
+        if entry is not None:
+            position = series.index.searchsorted(entry.last_time)
+            if position < len(series) and series.index[position] == entry.last_time:
+                new_values = series.to_numpy()[position + 1:]
+                # Строки модели, выпавшие из начала текущего окна: окно сдвигается на число новых строк.
+                # Отрицательный сдвиг - окно начинается раньше модели, её нужно обучить заново
+                drift = entry.nobs + len(new_values) - len(series)
+                if 0 <= drift <= self.max_drift * len(series):
+                    if not len(new_values):
+                        self.hits += 1
+                        return 'hit', entry.results, None
+                    self.extensions += 1
+                    return 'extend', entry.results, new_values
+
+        self.misses += 1
+        return 'fit', None, series.to_numpy()
+
+    def store(self, key, results, series: pd.Series):
+        self.put(key, CachedModel(results, series.index[0], series.index[-1]))
+
+    def fit(self, table_name: str, column: str, order_key: str, order, series: pd.Series):
+        """Returns fitted SARIMAX results for `series`, reusing or extending a cached fit.
+
+        `series` must be sorted by its DatetimeIndex and contain no NaN values.
+        """
+        key = model_key(table_name, column, order_key, order)
+        action, results, values = self.plan(key, series)
+        if action == 'hit':
+            return results
+
+        results = fit_or_extend(values, order, results)
+        self.store(key, results, series)
+        return results
+
+
+def model_key(table_name: str, column: str, order_key: str, order) -> Tuple:
+    return (table_name, column, order_key, tuple(order))
+
+
+def fit_or_extend(values, order, base_results=None):
+    """Fits a new model on `values`, or appends `values` as new observations to `base_results`."""
+    if base_results is not None:
+        return base_results.append(np.asarray(values, dtype=float))
+    return fit_sarimax(values, order)
+
+
+def fit_sarimax(values, order):
+    # Модель обучается на массиве без индекса: у данных из БД нет частоты,
+    # а прогноз всё равно переиндексируется на сетку 10 с
+    return SARIMAX(endog=np.asarray(values, dtype=float), order=order).fit(disp=False)
+
+
+model_cache = ModelCache(
+    max_entries=Config.get('MODEL_CACHE_MAX_ENTRIES'),
+    max_bytes=Config.get('MODEL_CACHE_MAX_BYTES'),
+    max_drift=Config.get('MODEL_CACHE_MAX_DRIFT')
+)
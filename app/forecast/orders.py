@@ -0,0 +1,142 @@
+from app.config import Config
+from typing import Dict, Optional, Tuple
+import threading
+import logging
+import json
+import time
+import os
+
+
+class OrderRegistry:
+    """ARIMA orders from orders.json, parsed once and reloaded when the file changes.
+
+    The file's mtime and size are checked at most every RELOAD_CHECK_SECONDS. Column to
+    order-key matches are memoized, and the columns of known tables can be indexed up
+    front with `index_table`, so per-request lookups are dictionary reads.
+    """
+
+    RELOAD_CHECK_SECONDS = 1.0
+
+    def __init__(self, path: str):
+        self.path = path
+        self._orders: Dict[str, Tuple[int, int, int]] = {}
+        self._columns: Dict[str, Optional[str]] = {}
+        self._tables: Dict[str, Dict[str, str]] = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def load(self):
+        """Reads the file if it changed since the last load; called lazily by every lookup."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+                version = (stat.st_mtime, stat.st_size)
+            except OSError:
+                version = None
+
+            if version == self._version:
+                return
+
+            orders = {}
+            if version is not None:
+                try:
+                    with open(self.path) as f:
+                        orders = _validate(json.load(f))
+                except (OSError, ValueError) as e:
+                    # Битый файл не должен ронять прогнозы: остаются последние корректные параметры,
+                    # а повторная попытка будет после следующего изменения файла
+                    logging.warning(f"Could not load {self.path}, keeping previous orders: {e}")
+                    self._version = version
+                    return
+
+            self._orders = orders
+            self._columns = {}
+            self._tables = {}
+            self._version = version
+            self.loads += 1
+            print(f"Loaded {len(orders)} orders from {self.path}")
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked_at >= self.RELOAD_CHECK_SECONDS:
+            self.load()
+
+    @property
+    def available(self) -> bool:
+        self._maybe_reload()
+        return self._version is not None
+
+    def keys(self):
+        self._maybe_reload()
+        return list(self._orders)
+
+    def order_key(self, column: str) -> Optional[str]:
+        """Order key for a column: the column itself or its last two parts (T2_Up_1 -> Up_1)."""
+        self._maybe_reload()
+        columns = self._columns
+        if column not in columns:
+            columns[column] = _match(column, self._orders)
+        return columns[column]
+
+    def index_table(self, table_name: str, columns) -> Dict[str, str]:
+        """Precomputes and keeps the column -> order key index of a table's columns."""
+        index = {}
+        for column in columns:
+            order_key = self.order_key(column)
+            if order_key:
+                index[column] = order_key
+        self._tables[table_name] = index
+        return index
+
+    def match(self, columns, table_name: Optional[str] = None) -> Dict[str, Tuple[str, Tuple[int, int, int]]]:
+        """Returns {column: (order_key, order)} for the columns that have orders."""
+        self._maybe_reload()
+        orders = self._orders
+        index = self._tables.get(table_name) if table_name else None
+        result = {}
+        for column in columns:
+            order_key = index[column] if index is not None and column in index else self.order_key(column)
+            if order_key in orders:
+                result[column] = (order_key, orders[order_key])
+        return result
+
+    def stats(self) -> dict:
+        self._maybe_reload()
+        return {
+            "path": self.path,
+            "available": self._version is not None,
+            "orders": len(self._orders),
+            "loads": self.loads,
+            "indexed_columns": len(self._columns),
+            "indexed_tables": list(self._tables)
+        }
+
+
+def _match(column: str, orders) -> Optional[str]:
+    if column in orders:
+        return column
+    column_parts = column.split('_')
+    if len(column_parts) >= 3:
+        potential_key = f"{column_parts[-2]}_{column_parts[-1]}"
+        if potential_key in orders:
+            return potential_key
+    return None
+
+
+def _validate(raw) -> Dict[str, Tuple[int, int, int]]:
+    if not isinstance(raw, dict):
+        raise ValueError("orders.json must contain an object of {key: [p, d, q]}")
+
+    orders = {}
+    for key, order in raw.items():
+        if (isinstance(order, list) and len(order) == 3
+                and all(isinstance(value, int) and not isinstance(value, bool) and value >= 0 for value in order)):
+            orders[key] = tuple(order)
+        else:
+            logging.warning(f"Skipping invalid order {key}: {order!r}, expected [p, d, q] of non-negative integers")
+    return orders
+
+
+order_registry = OrderRegistry(Config.get('ORDERS_FILE'))
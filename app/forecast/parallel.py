@@ -0,0 +1,124 @@
+from app.config import Config
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+import multiprocessing
+import threading
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.forecast.model_cache import model_cache, model_key, fit_or_extend
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_forecast_pool() -> Optional[ProcessPoolExecutor]:
+    """Returns the shared forecasting process pool, or None when FORECAST_WORKERS is 0."""
+    global _pool
+    workers = Config.get('FORECAST_WORKERS')
+    if workers == 0:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            # Без fork: процесс приложения многопоточный (задачи, вставка, планировщик), и блокировка,
+            # захваченная другим потоком в момент fork, навсегда осталась бы занятой в дочернем процессе
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _pool = ProcessPoolExecutor(max_workers=workers or None, mp_context=context)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def forecast_bands(results, length: int, alpha: float) -> np.ndarray:
+    """Mean, lower and upper bound as a (3, length) array from a single get_forecast call."""
+    forecast = results.get_forecast(length)
+    bounds = np.asarray(forecast.conf_int(alpha=alpha))
+    return np.vstack([np.asarray(forecast.predicted_mean), bounds[:, 0], bounds[:, 1]])
+
+
+def _fit_task(values, order, base_results, length, alpha):
+    # Выполняется в дочернем процессе: модель возвращается вместе с прогнозом,
+    # чтобы родитель сохранил её в кэше моделей
+    results = fit_or_extend(values, order, base_results)
+    return results, forecast_bands(results, length, alpha)
+
+
+def fit_forecasts(table_name: Optional[str], series_by_column: Dict[str, Tuple[str, list, pd.Series]],
+                  length: int, timeout: Optional[float] = None, alpha: Optional[float] = None):
+    """Forecasts `length` steps for every column, one model per pool task.
+
+    `series_by_column` maps column -> (order_key, order, series). Cache hits are served
+    in the calling process; fits and extensions run in the pool and are stored in the
+    model cache when they finish. Returns ({column: (3, length) array}, {column: error}),
+    where the array rows are the mean and the bounds of the 1 - `alpha` interval.
+    Columns that do not finish within `timeout` seconds are reported as errors.
+    """
+    if timeout is None:
+        timeout = Config.get('FORECAST_TIMEOUT')
+    if alpha is None:
+        alpha = Config.get('FORECAST_ALPHA')
+
+    forecasts = {}
+    errors = {}
+    pending = {}
+    pool = get_forecast_pool()
+    deadline = time.monotonic() + timeout
+
+    for column, (order_key, order, series) in series_by_column.items():
+        key = model_key(table_name, column, order_key, order) if table_name else None
+        action, base_results, values = model_cache.plan(key, series) if key else ('fit', None, series.to_numpy())
+
+        try:
+            if action == 'hit':
+                forecasts[column] = forecast_bands(base_results, length, alpha)
+            elif pool is None:
+                results, forecasts[column] = _fit_task(values, order, base_results, length, alpha)
+                if key:
+                    model_cache.store(key, results, series)
+            else:
+                future = pool.submit(_fit_task, values, order, base_results, length, alpha)
+                pending[future] = (column, key, series)
+        except BrokenProcessPool:
+            _reset_pool()
+            errors[column] = "Forecast worker pool is unavailable"
+        except Exception as e:
+            errors[column] = str(e)
+
+    done, not_done = wait(pending, timeout=max(deadline - time.monotonic(), 0))
+
+    for future in done:
+        column, key, series = pending[future]
+        try:
+            results, forecasts[column] = future.result()
+            if key:
+                model_cache.store(key, results, series)
+        except BrokenProcessPool:
+            _reset_pool()
+            errors[column] = "Forecast worker pool is unavailable"
+        except Exception as e:
+            errors[column] = str(e)
+
+    for future in not_done:
+        column, _, _ = pending[future]
+        # Уже запущенную задачу отменить нельзя - она доработает и будет отброшена
+        future.cancel()
+        errors[column] = f"Forecast timed out after {timeout} seconds"
+
+    errors = {column: errors[column] for column in series_by_column if column in errors}
+    if errors:
+        logging.warning(f"Forecast errors: {errors}")
+
+    return forecasts, errors
@@ -0,0 +1,251 @@
+from app.db_client import DBClient
+from datetime import timedelta
+from typing import Optional
+import pandas as pd
+
+from app.config import Config
+from app.forecast.ar import ar_forecasts
+from app.forecast.frame import ForecastFrame
+from app.forecast.orders import order_registry
+from app.forecast.parallel import fit_forecasts
+from app.readings import to_readings
+from app.table_cache import table_cache
+from app.long_storage import long_storage, fetch_long_rows
+
+# 'sarimax' - модель statsmodels на каждый датчик (пул процессов, кэш моделей),
+# 'ar' - пакетный AR(p) по d-й разности на NumPy, без MA-части
+FORECAST_ENGINES = ('sarimax', 'ar')
+
+# Шаг модели: прогноз строится на сетке 10 с, к ней же приводятся данные при resample
+MODEL_FREQUENCY = '10s'
+
+
+def sensor_columns(sensors):
+    """Maps the request `sensors` list ([{"Up": 1}, {"T": 1}, ...]) to table columns.
+
+    Returns (column_names, sensor_info), where sensor_info holds column_name,
+    sensor_type and sensor_index for every requested sensor.
+    """
+    column_names = []
+    sensor_info = []
+    for sensor_item in sensors:
+        for sensor_type, sensor_index in sensor_item.items():
+            if sensor_type == 'T':
+                column_name = f"T"
+            else:
+                column_name = f"{sensor_type}_{sensor_index}"
+            column_names.append(column_name)
+            sensor_info.append({
+                "column_name": column_name,
+                "sensor_type": sensor_type,
+                "sensor_index": sensor_index
+            })
+    return column_names, sensor_info
+
+
+def resolve_engines(columns, engine: str = None, engines: dict = None) -> dict:
+    """Returns the engine for each column: per-sensor override, then request default, then config.
+
+    Raises ValueError for unknown engine names.
+    """
+    engine = engine or Config.get('FORECAST_ENGINE')
+    engines = engines or {}
+    for name in [engine, *engines.values()]:
+        if name not in FORECAST_ENGINES:
+            raise ValueError(f"Unknown forecast engine '{name}', expected one of {list(FORECAST_ENGINES)}")
+    return {column: engines.get(column, engine) for column in columns}
+
+
+def process_models(data: pd.DataFrame, length: int, table_name: str = None,
+                   timeout: float = None, engine: str = None, engines: dict = None, alpha: float = None):
+    """Forecasts every column of `data` that has an orders.json entry.
+
+    Returns a ForecastFrame with the mean and 1 - `alpha` bounds per column, and the
+    per-column errors.
+    """
+    alpha = alpha or Config.get('FORECAST_ALPHA')
+    print(f"Data columns: {list(data.columns)}")
+    column_to_order = order_registry.match(data.columns, table_name)
+    print(f"Column to order mapping: {column_to_order}")
+
+    series_by_column = {}
+    for column in data.columns:
+        if column in column_to_order:
+            order_key, order = column_to_order[column]
+            print(f"Processing predictions for {column} using order parameters from {order_key}")
+            series_by_column[column] = (order_key, order, data[column])
+        else:
+            print(f"No matching order parameters found for column {column}")
+
+    column_engines = resolve_engines(series_by_column, engine, engines)
+    by_engine = {name: {} for name in FORECAST_ENGINES}
+    for column, item in series_by_column.items():
+        by_engine[column_engines[column]][column] = item
+
+    forecasts, errors = ar_forecasts(by_engine['ar'], length, alpha) if by_engine['ar'] else ({}, {})
+    if by_engine['sarimax']:
+        sarimax_forecasts, sarimax_errors = fit_forecasts(table_name, by_engine['sarimax'], length, timeout, alpha)
+        forecasts.update(sarimax_forecasts)
+        errors.update(sarimax_errors)
+    errors = {column: errors[column] for column in series_by_column if column in errors}
+
+    index = pd.date_range(data.index[-1] + timedelta(seconds=10), data.index[-1] + timedelta(seconds=length * 10), freq=MODEL_FREQUENCY)
+    for column in forecasts:
+        print(f"Successfully generated prediction for {column}")
+    for column, error in errors.items():
+        print(f"Error generating prediction for {column}: {error}")
+
+    result = ForecastFrame(index, {i: forecasts[i] for i in data.columns if i in forecasts}, alpha)
+    print(f"Final prediction columns: {result.columns}")
+    return result, errors
+
+
+def rows_to_frame(rows, column_names, dropna: bool = True) -> pd.DataFrame:
+    """Builds a Time-indexed, sorted DataFrame from PostgREST rows, by default without NaN rows."""
+    df = pd.DataFrame.from_records(rows, columns=["Time", *column_names])
+    df.index = pd.to_datetime(df.pop("Time").to_numpy())
+    df = df.astype(float).sort_index()
+    print(f"Created DataFrame with columns: {list(df.columns)} and {len(df)} rows")
+
+    if dropna:
+        df_before = len(df)
+        df = df.dropna()
+        df_after = len(df)
+        print(f"After dropping NaN values: {df_after} rows (dropped {df_before - df_after} rows)")
+    return df
+
+
+def parse_duration(value) -> Optional[pd.Timedelta]:
+    """Accepts seconds (number or numeric string) or a pandas duration string such as '6h' or '30min'."""
+    if value in (None, '', 0):
+        return None
+    try:
+        return pd.Timedelta(seconds=float(value))
+    except (TypeError, ValueError):
+        return pd.Timedelta(value)
+
+
+def fetch_rows(table_name, column_names, limit: int, time_start=None, time_end=None, duration=None,
+               long: Optional[bool] = None) -> list:
+    """Reads up to `limit` rows of `column_names` in the time range, newest first.
+
+    Rows are requested in pages of FORECAST_FETCH_PAGE_SIZE. With `duration` reading
+    stops once the rows span that long before the newest one. `long` selects the
+    storage format (STORAGE_MODE by default); rollup tables are always wide.
+    """
+    page_size = Config.get('FORECAST_FETCH_PAGE_SIZE')
+    supabase = DBClient().get_supabase()
+    if long_storage() if long is None else long:
+        return fetch_long_rows(supabase, table_name, column_names, limit, time_start, time_end, duration)
+
+    def page_query(start, end):
+        # Построители запросов postgrest изменяемые, поэтому на каждую страницу - новый
+        query = supabase.table(table_name).select("Time," + ",".join(column_names))
+        if time_start:
+            query = query.gte('Time', time_start)
+        if time_end:
+            query = query.lte('Time', time_end)
+        return query.order('Time', desc=True).range(start, end)
+
+    rows = []
+    while len(rows) < limit:
+        start = len(rows)
+        end = min(start + page_size, limit) - 1
+        page = page_query(start, end).execute().data
+        rows.extend(page)
+        if len(page) < end - start + 1:
+            break
+        # Строки идут от новых к старым: как только страница вышла за окно, дальше читать незачем
+        if duration is not None and pd.Timestamp(rows[-1]["Time"]) <= pd.Timestamp(rows[0]["Time"]) - duration:
+            break
+    return rows
+
+
+def fetch_frame(table_name, column_names, limit: int, time_start=None, time_end=None, duration=None,
+                dropna: bool = True):
+    """The newest `limit` rows of the range as a sorted, Time-indexed frame and the number of rows read.
+
+    Served by the local table cache when it is enabled, otherwise read with `fetch_rows`.
+    """
+    cached = table_cache.read(table_name, column_names, limit, fetch_rows, time_start, time_end, duration)
+    if cached is None:
+        rows = fetch_rows(table_name, column_names, limit, time_start, time_end, duration)
+        return rows_to_frame(rows, column_names, dropna), len(rows)
+
+    print(f"Read {len(cached)} rows of {table_name} from the table cache")
+    return (cached.dropna() if dropna else cached), len(cached)
+
+
+def fetch_training_frame(table_name, column_names, time_start=None, time_end=None,
+                         points=None, duration=None, resample=None) -> pd.DataFrame:
+    """Fetches the most recent training window of `column_names` as a DataFrame.
+
+    At most `points` rows (FORECAST_TRAINING_POINTS by default) are read, newest first,
+    in pages of FORECAST_FETCH_PAGE_SIZE rows. `duration` further limits the window to
+    that span before the last reading. With `resample` the frame is averaged onto the
+    10 s model grid.
+    """
+    points = int(points or Config.get('FORECAST_TRAINING_POINTS'))
+    duration = parse_duration(duration if duration is not None else Config.get('FORECAST_TRAINING_DURATION'))
+    resample = Config.get('FORECAST_RESAMPLE') if resample is None else resample
+
+    df, rows_read = fetch_frame(table_name, column_names, points, time_start, time_end, duration)
+
+    if duration is not None and not df.empty:
+        df = df[df.index > df.index[-1] - duration]
+    if resample and not df.empty:
+        df = df.resample(MODEL_FREQUENCY).mean().dropna()
+    print(f"Training window: {len(df)} rows from {rows_read} fetched")
+    return df
+
+
+def forecast_window(df: pd.DataFrame, table_name, length, timeout=None, engine=None, engines=None, alpha=None):
+    """Fits forecasts on a training frame.
+
+    Returns (ForecastFrame, errors), where errors maps column -> message.
+    """
+    if df.empty:
+        print("DataFrame is empty after dropping NaN values")
+        return ForecastFrame(pd.DatetimeIndex([]), {}, alpha), {}
+
+    if not order_registry.available:
+        print(f"orders.json file not found at {order_registry.path}")
+        return ForecastFrame(pd.DatetimeIndex([]), {}, alpha), {}
+
+    forecast, errors = process_models(df, length, table_name, timeout, engine, engines, alpha)
+    print(f"Generated predictions for {len(forecast.columns)} sensors, {len(forecast.index)} steps")
+    return forecast, errors
+
+
+def run_forecast(job, table_name, sensors, time_start=None, time_end=None, length=10, timeout=None,
+                 engine=None, engines=None, training=None, alpha=None):
+    """Job body for POST /api/v1/analyze/forecast: fetches the window and forecasts it."""
+    engine = engine or Config.get('FORECAST_ENGINE')
+    column_names, sensor_info = sensor_columns(sensors)
+
+    df = fetch_training_frame(table_name, column_names, time_start, time_end, **(training or {}))
+    job.update_progress(len(df))
+
+    if df.empty:
+        raise ValueError(f"No data available for prediction in table '{table_name}'")
+
+    forecast, errors = forecast_window(df, table_name, length, timeout, engine, engines, alpha)
+    if errors:
+        job.errors.extend(f"{column}: {error}" for column, error in errors.items())
+
+    result = {
+        "table": table_name,
+        "predictions": to_readings(forecast.readings_by_time(sensor_info)),
+        "prediction_series": forecast.to_dict(),
+        "prediction_params": {
+            "length": length,
+            "alpha": forecast.alpha,
+            "engine": engine,
+            "time_start": time_start,
+            "time_end": time_end,
+            "training_rows": len(df)
+        }
+    }
+    if errors:
+        result["prediction_errors"] = errors
+    return result
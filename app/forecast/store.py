@@ -0,0 +1,241 @@
+from app.config import Config
+from app.db_client import DBClient
+from app.jobs import JobQueue
+from datetime import datetime, timezone
+from typing import Optional
+import threading
+import logging
+import json
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from app.forecast.frame import ForecastFrame
+from app.forecast.orders import order_registry
+from app.forecast.service import process_models, fetch_training_frame
+
+
+class ForecastStore:
+    """Precomputed forecasts per table, kept in memory and mirrored to JSON files.
+
+    An entry holds the forecast timestamps, one value list per sensor column, the
+    per-column errors, and when and on which data it was computed. Files survive
+    restarts and are the source of truth between worker processes: an entry is read
+    back whenever its file's mtime or size differs from the copy in memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _path(self, table_name: str) -> str:
+        return os.path.join(self.directory, f"{table_name}.json")
+
+    def get(self, table_name: str) -> Optional[dict]:
+        path = self._path(table_name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._entries.get(table_name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            # Файл обновлён другим процессом (или ещё не читался) - перечитываем
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not read stored forecast {path}: {e}")
+                return cached[1] if cached is not None else None
+            self._entries[table_name] = (version, entry)
+            return entry
+
+    def put(self, table_name: str, entry: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(table_name)
+        # Запись через временный файл: читатель не увидит наполовину записанный JSON
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        stat = os.stat(path)
+
+        with self._lock:
+            self._entries[table_name] = ((stat.st_mtime_ns, stat.st_size), entry)
+
+    def stats(self) -> dict:
+        # Список берётся из файлов, чтобы включать прогнозы, рассчитанные другими процессами
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    self.get(name[:-len('.json')])
+
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "tables": {
+                    table_name: {
+                        "computed_at": entry["computed_at"],
+                        "age_seconds": entry_age(entry),
+                        "length": entry["length"],
+                        "columns": len(entry.get("forecast", {}).get("sensors", {})),
+                        "errors": len(entry["errors"])
+                    }
+                    for table_name, (_, entry) in self._entries.items()
+                }
+            }
+
+
+def entry_age(entry: dict) -> float:
+    computed_at = datetime.fromisoformat(entry["computed_at"])
+    return round((datetime.now(timezone.utc) - computed_at).total_seconds(), 1)
+
+
+def stored_predictions(entry: dict, column_names, length: int):
+    """Returns (ForecastFrame, errors) for the requested columns from a stored entry.
+
+    Returns None when the entry is shorter than `length` or a requested column is not
+    a sensor of the table the entry was computed for, so the caller can fall back to
+    fitting on demand.
+    """
+    if "forecast" not in entry or length > entry["length"]:
+        return None
+    # Датчики таблицы без параметров в orders.json прогноза не имеют и на лету тоже не получат
+    if any(column not in entry["sensors"] for column in column_names):
+        return None
+
+    forecast = ForecastFrame.from_dict(entry["forecast"]).select(column_names).head(length)
+    errors = {column: entry["errors"][column] for column in column_names if column in entry["errors"]}
+    return forecast, errors
+
+
+def refresh_table(job, table_name: str, length: Optional[int] = None, points: Optional[int] = None) -> dict:
+    """Fits and stores forecasts for every sensor of `table_name` that has an orders.json entry."""
+    length = length or Config.get('FORECAST_STORE_LENGTH')
+    supabase = DBClient().get_supabase()
+
+    metadata = supabase.table('sensor_metadata').select('sensor_code').eq('table_name', table_name).execute().data
+    sensors = [sensor['sensor_code'] for sensor in metadata]
+    columns = list(order_registry.index_table(table_name, sensors))
+
+    if not columns:
+        raise ValueError(f"No sensors of table '{table_name}' have an entry in {order_registry.path}")
+
+    df = fetch_training_frame(table_name, columns, points=points)
+    if job:
+        job.update_progress(len(df))
+
+    if df.empty:
+        raise ValueError(f"No complete rows available for forecasting table '{table_name}'")
+
+    forecast, errors = process_models(df, length, table_name)
+
+    entry = {
+        "table_name": table_name,
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+        "data_until": df.index[-1].isoformat(),
+        "training_rows": len(df),
+        "length": length,
+        "engine": Config.get('FORECAST_ENGINE'),
+        "sensors": sensors,
+        "forecast": forecast.to_dict(),
+        "errors": errors
+    }
+    forecast_store.put(table_name, entry)
+
+    if job and errors:
+        job.errors.extend(f"{column}: {error}" for column, error in errors.items())
+
+    return {
+        "table_name": table_name,
+        "computed_at": entry["computed_at"],
+        "data_until": entry["data_until"],
+        "columns": forecast.columns,
+        "errors": errors
+    }
+
+
+def refresh_all(job) -> dict:
+    """Refreshes the stored forecasts of every table listed in the `tables` table."""
+    supabase = DBClient().get_supabase()
+    tables = [table['name'] for table in supabase.table('tables').select('name').execute().data]
+
+    refreshed = {}
+    for table_name in tables:
+        try:
+            refreshed[table_name] = refresh_table(None, table_name)
+        except Exception as e:
+            logging.warning(f"Forecast refresh for {table_name} failed: {e}")
+            if job:
+                job.errors.append(f"{table_name}: {e}")
+    return {"tables": refreshed}
+
+
+def schedule_refresh(table_name: Optional[str] = None):
+    """Queues a refresh of one table (or of all tables); repeated calls share the running job."""
+    if table_name is None:
+        return JobQueue().submit('forecast_refresh', refresh_all, key='forecast_refresh:*')
+    return JobQueue().submit(
+        'forecast_refresh', refresh_table, table_name,
+        params={"table_name": table_name}, key=f"forecast_refresh:{table_name}"
+    )
+
+
+_scheduler_started = False
+_scheduler_lock = threading.Lock()
+
+
+def _acquire_scheduler_lock(directory: str):
+    """Takes the scheduler file lock shared by all worker processes; returns its file or None.
+
+    The lock is held until the process exits, so only one worker schedules refreshes and
+    another takes over when it stops. Without fcntl (Windows) every process schedules.
+    """
+    if fcntl is None:
+        return True
+    os.makedirs(directory, exist_ok=True)
+    lock_file = open(os.path.join(directory, '.refresh.lock'), 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def start_refresh_scheduler(interval: float):
+    """Starts a daemon thread that queues a refresh of all tables every `interval` seconds.
+
+    Every worker process starts the thread, but only the one holding the scheduler lock
+    in FORECAST_STORE_DIR queues refreshes; the others retry the lock on each tick.
+    """
+    global _scheduler_started
+    with _scheduler_lock:
+        if _scheduler_started or interval <= 0:
+            return
+        _scheduler_started = True
+
+    def loop():
+        lock = None
+        while True:
+            time.sleep(interval)
+            try:
+                lock = lock or _acquire_scheduler_lock(forecast_store.directory)
+                if lock:
+                    schedule_refresh()
+            except Exception as e:
+                logging.warning(f"Could not schedule forecast refresh: {e}")
+
+    threading.Thread(target=loop, name='forecast-refresh', daemon=True).start()
+
+
+forecast_store = ForecastStore(Config.get('FORECAST_STORE_DIR'))
@@ -0,0 +1,60 @@
+from typing import Callable, Dict, Tuple
+import threading
+import os
+
+import pandas as pd
+
+
+class FrameCache:
+    """Process-wide cache of parsed DataFrames keyed by file path and mtime.
+
+    A file is re-parsed only when its modification time (or size) changes.
+    Cached frames are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._frames: Dict[str, Tuple[Tuple[float, int], pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, loader: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = (stat.st_mtime, stat.st_size)
+
+        with self._lock:
+            cached = self._frames.get(path)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+
+            # Разбор под блокировкой: параллельные запросы не парсят один файл дважды
+            self.misses += 1
+            frame = loader(path)
+            self._frames[path] = (version, frame)
+            return frame
+
+    def invalidate(self, path: str = None):
+        with self._lock:
+            if path is None:
+                self._frames.clear()
+            else:
+                self._frames.pop(os.path.abspath(path), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+                "entries": len(self._frames),
+                "files": [
+                    {"path": path, "mtime": version[0], "rows": len(frame)}
+                    for path, (version, frame) in self._frames.items()
+                ]
+            }
+
+
+sensor_frame_cache = FrameCache()
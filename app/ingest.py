@@ -0,0 +1,300 @@
+from app.db_client import DBClient
+from app.csv_parser import normalize_headers, find_time_column, read_sensor_csv
+from app.insert_pipeline import InsertPipeline
+from app.forecast.orders import order_registry
+from app.count_cache import count_cache
+from app.table_cache import table_cache
+from app.long_storage import LONG_TABLE, long_storage, to_long_records
+from app.config import Config
+from app.rollups import ROLLUP_LEVELS, RollupBuilder, rollup_table_name, rollup_table_columns, \
+    begin_rollup_load, end_rollup_load
+from typing import Callable, List, Optional
+import pandas as pd
+import re
+
+
+class IngestError(Exception):
+    pass
+
+
+def read_headers(stream, separator: str) -> List[str]:
+    """Consumes the header line of a text stream and returns the cleaned column names."""
+    first_line = stream.readline()
+    return normalize_headers(first_line.split(separator))
+
+
+def ingest_csv(stream, table_name: str, separator: str = ';', decimal: str = ',', create_table: bool = True,
+               chunk_size: int = 10000, batch_size: int = 1000, max_workers: Optional[int] = None,
+               progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Creates the sensor table (optionally) and streams the CSV into it chunk by chunk.
+
+    `stream` is a text stream positioned at the header line. Batches are inserted
+    concurrently by `InsertPipeline`; batches that fail after retries are listed in
+    `ingest.failed_batches` of the result. `progress` is called with the number of
+    rows inserted so far after every batch. With STORAGE_MODE=long the readings go to the
+    shared sensor_readings table instead of a table of their own, and the counts are
+    readings rather than rows. With ROLLUPS_ENABLED the loaded rows are
+    also merged into the 1m/1h/1d rollup tables; a rollup failure is reported in
+    `rollups.error` and does not fail the load, but marks the rollups of the table as
+    incomplete, so aggregated reads fall back to the raw rows.
+    """
+    clean_headers = read_headers(stream, separator)
+    time_column = find_time_column(clean_headers)
+
+    if not time_column:
+        raise IngestError("Time column not found in CSV")
+
+    db_client = DBClient()
+    supabase = db_client.get_supabase()
+
+    sensor_columns = [header for header in clean_headers if header != time_column]
+    long = long_storage()
+    rollups = RollupBuilder(table_name, sensor_columns, time_column) if Config.get('ROLLUPS_ENABLED') else None
+    rollup_error = None
+
+    if create_table:
+        if long:
+            # Узкая таблица общая для всех загрузок: таблица только регистрируется в списке
+            _register_table(supabase, table_name)
+        else:
+            _create_table(supabase, table_name, clean_headers, time_column)
+        if rollups:
+            try:
+                for level in ROLLUP_LEVELS:
+                    _create_sensor_table(supabase, rollup_table_name(table_name, level),
+                                         rollup_table_columns(sensor_columns))
+            except IngestError as e:
+                rollups, rollup_error = None, str(e)
+
+    rollup_load = False
+    if Config.get('ROLLUPS_ENABLED'):
+        # До вставки первой строки: пока загрузка идёт, агрегаты неполные
+        try:
+            begin_rollup_load(supabase, table_name, reset=create_table)
+            rollup_load = True
+        except Exception as e:
+            rollups, rollup_error = None, f"Could not mark rollups as loading: {e}"
+
+    reader = read_sensor_csv(
+        stream,
+        names=clean_headers,
+        separator=separator,
+        decimal=decimal,
+        skip_header=False,
+        chunksize=chunk_size
+    )
+
+    rollup_errors = []
+
+    def add_rollups(batch: List[dict]):
+        # Агрегаты строятся только по вставленным пакетам: строки неудачных пакетов в них не попадают
+        try:
+            rollups.add(_batch_frame(batch, time_column, long))
+        except (KeyError, TypeError, ValueError) as e:
+            rollup_errors.append(f"Could not aggregate rows: {e}")
+
+    pipeline = InsertPipeline(
+        LONG_TABLE if long else table_name,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        supabase=supabase,
+        progress=progress,
+        on_batch=add_rollups if rollups else None
+    )
+
+    loaded_from = loaded_to = None
+    try:
+        for chunk in reader:
+            if long:
+                pipeline.submit(to_long_records(chunk, time_column, table_name))
+            else:
+                pipeline.submit(_chunk_to_records(chunk, time_column))
+            if not chunk.empty:
+                chunk_from, chunk_to = chunk[time_column].min(), chunk[time_column].max()
+                loaded_from = chunk_from if loaded_from is None else min(loaded_from, chunk_from)
+                loaded_to = chunk_to if loaded_to is None else max(loaded_to, chunk_to)
+    except Exception as e:
+        if rollup_load:
+            _end_rollup_load(supabase, table_name, f"Load failed: {e}")
+        raise
+    finally:
+        summary = pipeline.close()
+        # Даже частично загруженные строки меняют число записей в таблице
+        count_cache.invalidate(table_name)
+        # Локальная копия сбрасывается целиком для новой таблицы и по затронутым дням при дозагрузке
+        if create_table:
+            table_cache.invalidate(table_name)
+        elif loaded_from is not None:
+            table_cache.invalidate(table_name, loaded_from, loaded_to)
+
+    if summary["failed_batches"]:
+        print(f"Loaded {summary['rows_inserted']} rows into {table_name}, "
+              f"{len(summary['failed_batches'])} batches failed")
+    else:
+        print(f"Data successfully loaded into table {table_name}: "
+              f"{summary['rows_inserted']} rows in {summary['batch_count']} batches")
+
+    sensor_metadata = build_sensor_metadata(clean_headers, time_column, table_name)
+
+    try:
+        supabase.table("sensor_metadata").upsert(sensor_metadata).execute()
+        print(f"Successfully updated sensor metadata")
+    except Exception as e:
+        print(f"Error updating sensor metadata: {str(e)}")
+
+    order_registry.index_table(table_name, [sensor["sensor_code"] for sensor in sensor_metadata])
+
+    if rollup_errors:
+        rollups, rollup_error = None, rollup_errors[0]
+
+    rollup_summary = None
+    if rollups and summary["rows_inserted"]:
+        try:
+            rollup_summary = rollups.write(supabase)
+            print(f"Updated rollups of {table_name}: {rollup_summary}")
+        except Exception as e:
+            rollup_error = str(e)
+    if rollup_error:
+        print(f"Error updating rollups of {table_name}: {rollup_error}")
+        rollup_summary = {"error": rollup_error}
+    if rollup_load:
+        _end_rollup_load(supabase, table_name, rollup_error)
+
+    return {
+        "table_name": table_name,
+        "rows_inserted": summary["rows_inserted"],
+        "storage_mode": "long" if long else "wide",
+        "sensors_metadata": len(sensor_metadata),
+        "rollups": rollup_summary,
+        "ingest": {"chunk_size": chunk_size, **summary}
+    }
+
+
+def build_sensor_metadata(columns: List[str], time_column: str, table_name: str) -> List[dict]:
+    sensor_metadata = []
+    for column in columns:
+        if column == time_column:
+            continue
+
+        sensor_type = "Unknown"
+        pipe_number = None
+        sensor_number = None
+
+        if column == "T":
+            sensor_type = "Температура"
+            sensor_number = None
+
+        elif '_' in column:
+            temp_match = re.match(r'([A-Za-z]+)_(\d+)', column)
+            if temp_match:
+                try:
+                    sensor_code = temp_match.group(1)
+                    sensor_number = int(temp_match.group(2))
+
+                    if sensor_code == 'K':
+                        sensor_type = "Кольцевая деформация"
+                    elif sensor_code == 'L':
+                        sensor_type = "Левая образующая"
+                    elif sensor_code == 'R':
+                        sensor_type = "Правая образующая"
+                    elif sensor_code == 'Up':
+                        sensor_type = "Верхняя образующая"
+                except:
+                    pass
+            else:
+                match = re.match(r'T(\d+)_([A-Za-z]+)_(\d+)', column)
+                if match:
+                    try:
+                        pipe_number = int(match.group(1))
+                        sensor_code = match.group(2)
+                        sensor_number = int(match.group(3))
+
+                        if sensor_code == 'K':
+                            sensor_type = "Кольцевая деформация"
+                        elif sensor_code == 'L':
+                            sensor_type = "Левая образующая"
+                        elif sensor_code == 'R':
+                            sensor_type = "Правая образующая"
+                        elif sensor_code == 'Up':
+                            sensor_type = "Верхняя образующая"
+                    except:
+                        pass
+
+        sensor_metadata.append({
+            "sensor_code": column,
+            "pipe_number": pipe_number,
+            "sensor_type": sensor_type,
+            "sensor_number": sensor_number,
+            "description": f"{sensor_type} датчик #{sensor_number} на трубе #{pipe_number}" if pipe_number else f"{sensor_type} датчик #{sensor_number}",
+            "units": "°C" if sensor_type == "Температура" else "мм",
+            "table_name": table_name
+        })
+    return sensor_metadata
+
+
+def _create_table(supabase, table_name: str, clean_headers: List[str], time_column: str):
+    columns = {}
+    for header in clean_headers:
+        if header == time_column:
+            columns[header] = "TIMESTAMP WITH TIME ZONE"
+        else:
+            columns[header] = "DOUBLE PRECISION"
+
+    _create_sensor_table(supabase, table_name, columns)
+    _register_table(supabase, table_name)
+
+
+def _register_table(supabase, table_name: str):
+    try:
+        supabase.table("tables").insert({"name": table_name}).execute()
+        print(f"Successfully added table {table_name} to tables table")
+    except Exception as e:
+        print(f"Error adding table to tables table: {str(e)}")
+
+
+def _create_sensor_table(supabase, table_name: str, columns: dict):
+    try:
+        print(f"Creating table {table_name} with structure: {columns}")
+
+        result = supabase.rpc(
+            'create_sensor_table',
+            {
+                'table_name': table_name,
+                'columns_json': columns
+            }
+        ).execute()
+
+        print(f"Table creation result: {result.data}")
+    except Exception as e:
+        print(f"Error creating table: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise IngestError(f"Error creating table: {str(e)}")
+
+    if result.data and isinstance(result.data, str) and result.data.startswith('Error:'):
+        raise IngestError(f"Error creating table: {result.data}")
+
+
+def _end_rollup_load(supabase, table_name: str, error: Optional[str]):
+    try:
+        end_rollup_load(supabase, table_name, error)
+    except Exception as e:
+        # Незавершённая загрузка оставляет агрегаты неполными - чтение пойдёт по исходным строкам
+        print(f"Error marking rollups of {table_name} as loaded: {str(e)}")
+
+
+def _batch_frame(batch: List[dict], time_column: str, long: bool) -> pd.DataFrame:
+    """An inserted batch as a frame with the time column and one column per sensor."""
+    df = pd.DataFrame.from_records(batch)
+    if long:
+        # Показания одной отметки времени могут попасть в разные пакеты - недостающие датчики станут NaN
+        df = df.pivot_table(index="time", columns="sensor_id", values="value", aggfunc="last", dropna=False)
+        df = df.rename_axis(columns=None).reset_index().rename(columns={"time": time_column})
+    return df
+
+
+def _chunk_to_records(chunk: pd.DataFrame, time_column: str):
+    chunk = chunk.copy()
+    if pd.api.types.is_datetime64_any_dtype(chunk[time_column]):
+        chunk[time_column] = chunk[time_column].map(lambda value: value.isoformat())
+    return chunk.to_dict('records')
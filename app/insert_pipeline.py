@@ -0,0 +1,118 @@
+from app.config import Config
+from app.db_client import DBClient
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import threading
+import logging
+import time
+
+
+class InsertPipeline:
+    """Inserts records into a table in fixed-size batches over a bounded thread pool.
+
+    All batches share the supabase client of `DBClient` (or the client passed in),
+    so pointing SUPABASE_URL at any PostgREST-compatible server is enough to run it
+    locally. Failed batches are retried with exponential backoff; a batch that still
+    fails is reported in the summary instead of aborting the rest of the load.
+    `on_batch` is called from the insert threads with every batch once it is stored.
+    """
+
+    def __init__(self, table_name: str, batch_size: Optional[int] = None, max_workers: Optional[int] = None,
+                 max_retries: Optional[int] = None, retry_backoff: Optional[float] = None, supabase=None,
+                 progress: Optional[Callable[[int], None]] = None,
+                 on_batch: Optional[Callable[[List[dict]], None]] = None):
+        self.table_name = table_name
+        self.batch_size = batch_size or Config.get('INGEST_BATCH_SIZE')
+        self.max_workers = max_workers or Config.get('INSERT_WORKERS')
+        self.max_retries = Config.get('INSERT_MAX_RETRIES') if max_retries is None else max_retries
+        self.retry_backoff = Config.get('INSERT_RETRY_BACKOFF') if retry_backoff is None else retry_backoff
+        self.supabase = supabase or DBClient().get_supabase()
+        self.progress = progress
+        self.on_batch = on_batch
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='insert')
+        # Не даём читателю CSV убежать вперёд: в памяти не больше 2 пакетов на поток
+        self._slots = threading.BoundedSemaphore(self.max_workers * 2)
+        self._lock = threading.Lock()
+        self._next_offset = 0
+        self._rows_inserted = 0
+        self._batches = []
+        self._failed = []
+        self._started_at = time.perf_counter()
+
+    def submit(self, records: List[dict]):
+        """Splits `records` into batches and queues them; blocks while the pool is saturated."""
+        for start in range(0, len(records), self.batch_size):
+            batch = records[start:start + self.batch_size]
+            offset = self._next_offset
+            self._next_offset += len(batch)
+
+            self._slots.acquire()
+            future = self._executor.submit(self._insert_batch, batch, offset)
+            future.add_done_callback(lambda _: self._slots.release())
+
+    def close(self) -> dict:
+        """Waits for all queued batches and returns the load summary."""
+        self._executor.shutdown(wait=True)
+        elapsed = time.perf_counter() - self._started_at
+        latencies = sorted(batch["latency_ms"] for batch in self._batches)
+
+        return {
+            "rows_inserted": self._rows_inserted,
+            "rows_failed": sum(batch["rows"] for batch in self._failed),
+            "batch_count": len(self._batches),
+            "rows_per_batch": self.batch_size,
+            "workers": self.max_workers,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self._rows_inserted / elapsed, 1) if elapsed > 0 else None,
+            "latency_ms": {
+                "min": latencies[0] if latencies else None,
+                "avg": round(sum(latencies) / len(latencies), 1) if latencies else None,
+                "p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+                "max": latencies[-1] if latencies else None
+            },
+            "batches": sorted(self._batches, key=lambda batch: batch["offset"]),
+            "failed_batches": sorted(self._failed, key=lambda batch: batch["offset"])
+        }
+
+    def _insert_batch(self, batch: List[dict], offset: int):
+        started_at = time.perf_counter()
+        attempt = 0
+        error = None
+
+        while attempt <= self.max_retries:
+            attempt += 1
+            try:
+                self.supabase.table(self.table_name).insert(batch).execute()
+                error = None
+                break
+            except Exception as e:
+                error = str(e)
+                logging.warning(f"Insert into {self.table_name} failed for rows {offset}-{offset + len(batch) - 1} "
+                                f"(attempt {attempt}): {error}")
+                if attempt <= self.max_retries:
+                    time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+
+        stats = {
+            "offset": offset,
+            "rows": len(batch),
+            "attempts": attempt,
+            "latency_ms": round((time.perf_counter() - started_at) * 1000, 1)
+        }
+
+        with self._lock:
+            self._batches.append(stats)
+            if error is not None:
+                self._failed.append({**stats, "error": error})
+                return
+
+            self._rows_inserted += len(batch)
+            if self.progress:
+                self.progress(self._rows_inserted)
+
+        if self.on_batch:
+            try:
+                self.on_batch(batch)
+            except Exception as e:
+                logging.warning(f"Batch callback for {self.table_name} failed for rows {offset}-"
+                                f"{offset + len(batch) - 1}: {e}")
@@ -0,0 +1,150 @@
+from app.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+import threading
+import logging
+import uuid
+import time
+
+
+class Job:
+    """State of a single background job, updated by the worker thread that runs it."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+
+    def __init__(self, kind: str, params: Optional[dict] = None, key: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.params = params or {}
+        self.state = Job.QUEUED
+        self.rows_done = 0
+        self.errors = []
+        self.result = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self._started_clock = None
+        self._finished_clock = None
+
+    def update_progress(self, rows_done: int):
+        self.rows_done = rows_done
+
+    @property
+    def done(self) -> bool:
+        return self.state in (Job.FINISHED, Job.FAILED)
+
+    def rows_per_second(self) -> Optional[float]:
+        if self._started_clock is None:
+            return None
+        elapsed = (self._finished_clock or time.perf_counter()) - self._started_clock
+        if elapsed <= 0:
+            return None
+        return round(self.rows_done / elapsed, 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "params": self.params,
+            "rows_done": self.rows_done,
+            "rows_per_second": self.rows_per_second(),
+            "errors": self.errors,
+            "result": self.result,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class JobQueue:
+    """Process-local job queue backed by a thread pool.
+
+    Jobs live in the memory of the worker process that accepted them, so with
+    several gunicorn workers the status has to be polled from the same process
+    (e.g. sticky sessions or a single worker with threads).
+    """
+
+    _instance: Optional['JobQueue'] = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(JobQueue, cls).__new__(cls)
+                cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=Config.get('JOB_WORKERS'),
+            thread_name_prefix='job'
+        )
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._max_history = Config.get('JOB_HISTORY_SIZE')
+        self._initialized = True
+
+    def submit(self, kind: str, func, *args, params: Optional[dict] = None,
+               key: Optional[str] = None, **kwargs) -> Job:
+        """Queues `func(job, *args, **kwargs)`; its return value becomes `job.result`.
+
+        When `key` is given and a job with the same key is still queued or running,
+        that job is returned instead of starting a duplicate.
+        """
+        with self._lock:
+            if key is not None:
+                active = self._active.get(key)
+                if active is not None and not active.done:
+                    return active
+
+            job = Job(kind, params, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active[key] = job
+            self._prune()
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, func, args, kwargs):
+        job.state = Job.RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        job._started_clock = time.perf_counter()
+        state = Job.FAILED
+        try:
+            job.result = func(job, *args, **kwargs)
+            state = Job.FINISHED
+        except Exception as e:
+            logging.exception(f"Job {job.id} ({job.kind}) failed")
+            job.errors.append(str(e))
+        finally:
+            # Время окончания записывается до итогового состояния: _prune сортирует завершённые задачи по нему
+            job._finished_clock = time.perf_counter()
+            job.finished_at = datetime.now(timezone.utc)
+            job.state = state
+            if job.key is not None:
+                with self._lock:
+                    if self._active.get(job.key) is job:
+                        del self._active[job.key]
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.done and job.finished_at is not None]
+        excess = len(finished) - self._max_history
+        if excess <= 0:
+            return
+        finished.sort(key=lambda job: job.finished_at)
+        for job in finished[:excess]:
+            del self._jobs[job.id]
@@ -0,0 +1,159 @@
+from app.config import Config
+from typing import List, Optional, Tuple
+import pandas as pd
+
+# Узкое хранение (STORAGE_MODE=long): одна строка на показание датчика в общей таблице
+# sensor_readings (table_id, sensor_id, time, value), схема - sql/sensor_readings.sql.
+# Пустые показания хранятся как NULL, поэтому у каждой отметки времени по строке на датчик.
+LONG_TABLE = 'sensor_readings'
+
+
+def long_storage() -> bool:
+    return Config.get('STORAGE_MODE') == 'long'
+
+
+def to_long_records(chunk: pd.DataFrame, time_column: str, table_name: str) -> List[dict]:
+    """Melts a parsed CSV chunk into sensor_readings records; NaN values become NULL."""
+    times = chunk[time_column]
+    if pd.api.types.is_datetime64_any_dtype(times):
+        times = times.map(lambda value: value.isoformat())
+    long = chunk.drop(columns=[time_column]).assign(time=times.to_numpy()).melt(
+        id_vars="time", var_name="sensor_id", value_name="value"
+    )
+    long.insert(0, "table_id", table_name)
+    return long.astype(object).where(long.notna(), None).to_dict('records')
+
+
+def long_query(supabase, table_name: str, column_names, time_start=None, time_end=None,
+               columns: str = "sensor_id,time,value", count: Optional[str] = None, head: Optional[bool] = None):
+    """Readings of `column_names` of a table in the time range, before ordering and paging."""
+    query = supabase.table(LONG_TABLE).select(columns, count=count, head=head) \
+        .eq('table_id', table_name).in_('sensor_id', list(column_names))
+    if time_start:
+        query = query.gte('time', time_start)
+    if time_end:
+        query = query.lte('time', time_end)
+    return query
+
+
+def apply_value_filters(query, value_min=None, value_max=None):
+    # В узком формате фильтр по значению отбирает отдельные показания, а не строки таблицы
+    if value_min is not None:
+        query = query.gte('value', value_min)
+    if value_max is not None:
+        query = query.lte('value', value_max)
+    return query
+
+
+def pivot_readings(readings) -> List[dict]:
+    """Turns sensor_readings rows into wide rows {"Time", <column>: value}, in the order of `readings`."""
+    rows = {}
+    for reading in readings:
+        row = rows.get(reading["time"])
+        if row is None:
+            row = rows[reading["time"]] = {"Time": reading["time"]}
+        row[reading["sensor_id"]] = reading["value"]
+    return list(rows.values())
+
+
+def fetch_long_rows(supabase, table_name: str, column_names, limit: int, time_start=None, time_end=None,
+                    duration=None) -> List[dict]:
+    """`fetch_rows` for the long storage: up to `limit` wide rows, newest first."""
+    page_size = Config.get('FORECAST_FETCH_PAGE_SIZE')
+    wanted = limit * len(column_names)
+
+    readings = []
+    while len(readings) < wanted:
+        start = len(readings)
+        end = min(start + page_size, wanted) - 1
+        page = long_query(supabase, table_name, column_names, time_start, time_end) \
+            .order('time', desc=True).order('sensor_id').range(start, end).execute().data
+        readings.extend(page)
+        if len(page) < end - start + 1:
+            break
+        if duration is not None and pd.Timestamp(readings[-1]["time"]) <= pd.Timestamp(readings[0]["time"]) - duration:
+            break
+    return pivot_readings(readings)[:limit]
+
+
+def _time_params(table_name: str, column_names, time_start=None, time_end=None, value_min=None,
+                 value_max=None) -> dict:
+    return {
+        "p_table_id": table_name,
+        "p_sensor_ids": list(dict.fromkeys(column_names)),
+        "p_time_start": time_start or None,
+        "p_time_end": time_end or None,
+        "p_value_min": value_min,
+        "p_value_max": value_max
+    }
+
+
+def long_page(supabase, table_name: str, column_names, time_start=None, time_end=None, value_min=None,
+              value_max=None, page: int = 1, page_size: int = 20, cursor=None,
+              keyset: bool = False) -> Tuple[List[dict], bool]:
+    """One page of wide rows, newest first, by offset or (with `keyset`) by a Time cursor.
+
+    The page is taken over distinct timestamps by `sensor_reading_times` (sql/sensor_readings.sql),
+    then their readings are fetched, so a timestamp is never split between pages. Returns the
+    rows and whether a next page exists (always False for offset pages).
+    """
+    params = _time_params(table_name, column_names, time_start, time_end, value_min, value_max)
+    if keyset:
+        params.update(p_before=cursor or None, p_offset=0, p_limit=page_size + 1)
+    else:
+        params.update(p_before=None, p_offset=(page - 1) * page_size, p_limit=page_size)
+    times = [row["time"] for row in supabase.rpc('sensor_reading_times', params).execute().data]
+    # Лишняя отметка только признак следующей страницы
+    has_more = keyset and len(times) > page_size
+    times = times[:page_size]
+    if not times:
+        return [], False
+
+    page_size_rows = Config.get('FORECAST_FETCH_PAGE_SIZE')
+    readings = []
+    while True:
+        batch = apply_value_filters(
+            long_query(supabase, table_name, column_names, times[-1], times[0]), value_min, value_max
+        ).order('time', desc=True).order('sensor_id') \
+            .range(len(readings), len(readings) + page_size_rows - 1).execute().data
+        readings.extend(batch)
+        if len(batch) < page_size_rows:
+            break
+
+    # Между отметками страницы могут быть показания отметок, не прошедших фильтр по значению
+    page_times = {pd.Timestamp(value) for value in times}
+    return [row for row in pivot_readings(readings) if pd.Timestamp(row["Time"]) in page_times], has_more
+
+
+def long_count(supabase, table_name: str, column_names, time_start=None, time_end=None, value_min=None,
+               value_max=None, count_mode: str = 'exact') -> Optional[int]:
+    """Number of timestamps in the filtered range, as `long_page` pages them.
+
+    `exact` counts distinct timestamps with `sensor_reading_time_count`; `planned` and
+    `estimated` divide the estimated number of readings by the number of sensors, which
+    with value filters is only an upper bound.
+    """
+    if count_mode == 'exact':
+        return supabase.rpc('sensor_reading_time_count', _time_params(
+            table_name, column_names, time_start, time_end, value_min, value_max
+        )).execute().data
+
+    readings = apply_value_filters(
+        long_query(supabase, table_name, column_names, time_start, time_end,
+                   columns="time", count=count_mode, head=True),
+        value_min, value_max
+    ).execute().count
+    if readings is None:
+        return None
+    return -(-readings // len(column_names))
+
+
+def long_bounds(supabase, table_name: str):
+    """First and last reading time of a table as raw strings, or None if it has no readings."""
+    def query():
+        return supabase.table(LONG_TABLE).select("time").eq('table_id', table_name)
+
+    first = query().order('time').limit(1).execute().data
+    last = query().order('time', desc=True).limit(1).execute().data
+    return (first[0]["time"], last[0]["time"]) if first and last else None
+
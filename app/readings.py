@@ -0,0 +1,32 @@
+from typing import Dict, List, Tuple
+
+
+def sensor_lookup(sensor_info) -> Dict[str, Tuple[str, int]]:
+    """Maps column -> (sensor_type, sensor_index); for a repeated column the first sensor wins."""
+    lookup = {}
+    for item in sensor_info:
+        lookup.setdefault(item["column_name"], (item["sensor_type"], item["sensor_index"]))
+    return lookup
+
+
+def rows_to_readings_by_time(rows, column_names, sensor_info) -> Dict[str, List[dict]]:
+    """Groups PostgREST rows into readings by their Time value, in `column_names` order."""
+    lookup = sensor_lookup(sensor_info)
+    templates = [(column, *lookup.get(column, ("unknown", 0))) for column in column_names]
+
+    data_by_time = {}
+    for row in rows:
+        readings = data_by_time.setdefault(row["Time"], [])
+        readings.extend(
+            {"sensor": column, "sensor_type": sensor_type, "sensor_index": sensor_index, "value": row[column]}
+            for column, sensor_type, sensor_index in templates
+            if column in row
+        )
+    return data_by_time
+
+
+def to_readings(by_time):
+    return [
+        {"time": time_value, "readings": readings}
+        for time_value, readings in sorted(by_time.items(), reverse=True)
+    ]
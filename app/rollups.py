@@ -0,0 +1,185 @@
+from app.config import Config
+from typing import Dict, List, Optional
+import threading
+import pandas as pd
+
+# Уровни агрегации: суффикс таблицы -> длина интервала в секундах, от мелкого к крупному
+ROLLUP_LEVELS = {'1m': 60, '1h': 3600, '1d': 86400}
+AGGREGATES = ('min', 'max', 'mean', 'last', 'count')
+# Полнота агрегатов по таблицам (sql/rollups.sql)
+ROLLUP_STATUS_TABLE = 'sensor_rollup_status'
+
+
+def rollup_table_name(table_name: str, level: str) -> str:
+    return f"{table_name}_rollup_{level}"
+
+
+def rollup_columns(column_names) -> List[str]:
+    return [f"{column}_{aggregate}" for column in column_names for aggregate in AGGREGATES]
+
+
+def rollup_table_columns(column_names) -> Dict[str, str]:
+    """Column types for `create_sensor_table`: bucket start, time of its newest reading, aggregates."""
+    columns = {"Time": "TIMESTAMP WITH TIME ZONE", "Last_time": "TIMESTAMP WITH TIME ZONE"}
+    columns.update({column: "DOUBLE PRECISION" for column in rollup_columns(column_names)})
+    return columns
+
+
+def _utc(index) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+
+
+def aggregate_readings(df: pd.DataFrame, level: str) -> pd.DataFrame:
+    """Aggregates raw readings (Time-indexed, one column per sensor) into buckets of `level`."""
+    df = df.set_axis(_utc(df.index))
+    buckets = df.index.floor(f"{ROLLUP_LEVELS[level]}s")
+    grouped = df.groupby(buckets)
+
+    parts = {
+        "min": grouped.min(),
+        "max": grouped.max(),
+        "mean": grouped.mean(),
+        "last": grouped.last(),
+        "count": grouped.count()
+    }
+    result = pd.concat(
+        {f"{column}_{aggregate}": parts[aggregate][column] for column in df.columns for aggregate in AGGREGATES},
+        axis=1
+    )
+    result["Last_time"] = pd.Series(df.index, index=df.index).groupby(buckets).max()
+    return result
+
+
+def merge_rollups(frames: List[pd.DataFrame], column_names, level: Optional[str] = None) -> pd.DataFrame:
+    """Merges rollup frames whose buckets may overlap, optionally re-bucketing them to a coarser `level`.
+
+    Means are weighted by counts; `last` is taken from the bucket part with the newest
+    `Last_time` that has a value for the sensor.
+    """
+    df = pd.concat(frames)
+    if level is not None:
+        df.index = df.index.floor(f"{ROLLUP_LEVELS[level]}s")
+    # После сортировки по Last_time groupby().last() берёт самое свежее непустое значение
+    df = df.sort_values("Last_time", kind="stable")
+    grouped = df.groupby(level=0, sort=True)
+
+    result = {}
+    for column in column_names:
+        count = df[f"{column}_count"].fillna(0)
+        weighted = (df[f"{column}_mean"].fillna(0) * count).groupby(level=0).sum()
+        total = grouped[f"{column}_count"].sum()
+        result[f"{column}_min"] = grouped[f"{column}_min"].min()
+        result[f"{column}_max"] = grouped[f"{column}_max"].max()
+        result[f"{column}_mean"] = (weighted / total).where(total > 0)
+        result[f"{column}_last"] = grouped[f"{column}_last"].last()
+        result[f"{column}_count"] = total
+    result["Last_time"] = grouped["Last_time"].max()
+    return pd.DataFrame(result)
+
+
+def _to_records(df: pd.DataFrame) -> List[dict]:
+    df = df.copy()
+    df["Last_time"] = df["Last_time"].map(lambda value: value.isoformat())
+    df.insert(0, "Time", [timestamp.isoformat() for timestamp in df.index])
+    # JSON не допускает NaN: пустые агрегаты пишутся как NULL
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class RollupBuilder:
+    """Collects rollups of a load batch by batch and merges them into the rollup tables.
+
+    Batches are aggregated to the finest level as they are stored; coarser levels are
+    derived from it in `write`. `add` is called from the insert threads, only for
+    batches that were inserted, so the rollups never count rows that failed to load.
+    Buckets are merged with the rows already in a rollup table by the
+    `merge_sensor_rollups` function (sql/rollups.sql), so later loads extend the
+    rollups instead of replacing them.
+    """
+
+    COMPACT_EVERY = 20
+
+    def __init__(self, table_name: str, column_names, time_column: str):
+        self.table_name = table_name
+        self.column_names = list(column_names)
+        self.time_column = time_column
+        self._finest = next(iter(ROLLUP_LEVELS))
+        self._parts: List[pd.DataFrame] = []
+        self._lock = threading.Lock()
+
+    def add(self, chunk: pd.DataFrame):
+        readings = chunk.set_index(pd.to_datetime(chunk[self.time_column]))
+        readings = readings.reindex(columns=self.column_names).astype(float)
+        if readings.empty:
+            return
+        part = aggregate_readings(readings, self._finest)
+        with self._lock:
+            self._parts.append(part)
+            # Частичные агрегаты соседних пакетов периодически сливаются, чтобы не копить их в памяти
+            if len(self._parts) >= self.COMPACT_EVERY:
+                self._parts = [merge_rollups(self._parts, self.column_names)]
+
+    def levels(self) -> Dict[str, pd.DataFrame]:
+        with self._lock:
+            parts = list(self._parts)
+        if not parts:
+            return {}
+        frames = {}
+        previous = merge_rollups(parts, self.column_names)
+        for level in ROLLUP_LEVELS:
+            previous = frames[level] = previous if level == self._finest else \
+                merge_rollups([previous], self.column_names, level)
+        return frames
+
+    def write(self, supabase) -> dict:
+        """Merges the collected buckets into every rollup table; returns buckets written per level.
+
+        Each batch is merged by one upsert, so a failed batch leaves the table as it was.
+        Batches are not retried: a merge that did commit would be counted twice.
+        """
+        written = {}
+        batch_size = Config.get('INGEST_BATCH_SIZE')
+        for level, frame in self.levels().items():
+            rollup_table = rollup_table_name(self.table_name, level)
+            records = _to_records(frame)
+            failed = []
+            for start in range(0, len(records), batch_size):
+                try:
+                    supabase.rpc('merge_sensor_rollups', {
+                        'table_name': rollup_table,
+                        'sensor_columns': self.column_names,
+                        'rows': records[start:start + batch_size]
+                    }).execute()
+                except Exception as e:
+                    failed.append(str(e))
+            if failed:
+                raise RuntimeError(f"{len(failed)} batches failed for {rollup_table}: {failed[0]}")
+            written[level] = {"rows": len(frame)}
+        return written
+
+
+def begin_rollup_load(supabase, table_name: str, reset: bool = False):
+    """Marks the rollups of a table as incomplete until the matching `end_rollup_load`."""
+    supabase.rpc('begin_rollup_load', {'p_table_name': table_name, 'p_reset': reset}).execute()
+
+
+def end_rollup_load(supabase, table_name: str, error: Optional[str] = None):
+    """Ends a load; with `error` the rollups of the table stay incomplete until it is recreated."""
+    supabase.rpc('end_rollup_load', {'p_table_name': table_name, 'p_error': error}).execute()
+
+
+def rollups_complete(supabase, table_name: str) -> bool:
+    """Whether the rollup tables hold every loaded row: no load is running and none has failed."""
+    try:
+        status = supabase.table(ROLLUP_STATUS_TABLE).select("loads_running,failed") \
+            .eq('table_name', table_name).execute().data
+    except Exception as e:
+        print(f"Could not read rollup status of {table_name}: {e}")
+        return False
+    return bool(status) and status[0]["loads_running"] == 0 and not status[0]["failed"]
+
+
+def pick_rollup_level(resolution_seconds: float) -> Optional[str]:
+    """The coarsest rollup level whose buckets are no longer than `resolution_seconds`, if any."""
+    fitting = [level for level, seconds in ROLLUP_LEVELS.items() if seconds <= resolution_seconds]
+    return fitting[-1] if fitting else None
@@ -1,53 +1,165 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, url_for
 from app.db_client import DBClient
-import pandas as pd
-from datetime import datetime, timedelta
-import os
+from app.config import Config
 import json
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+from app.forecast.model_cache import model_cache
+from app.forecast.orders import order_registry
+from app.forecast.service import (
+    sensor_columns, fetch_training_frame, forecast_window, run_forecast, resolve_engines, parse_duration,
+    fetch_rows, fetch_frame, rows_to_frame
+)
+from app.forecast.store import forecast_store, stored_predictions, entry_age, schedule_refresh
+from app.jobs import JobQueue
+from app.readings import rows_to_readings_by_time, to_readings
+from app.count_cache import count_cache, COUNT_MODES
+from app.downsample import downsample_readings, downsample_rollup_readings, AGGREGATION_METHODS
+from app.rollups import pick_rollup_level, rollup_table_name, rollups_complete
+from app.table_cache import table_cache
+from app.long_storage import long_storage, long_page, long_count
+from app.sensor_filters import apply_sensor_filters, parse_value_bound, parse_time_bound
 
 analyze_bp = Blueprint('analyze', __name__, url_prefix='/api/v1/analyze')
 
-def process_models(data: pd.DataFrame, orders_filename: str, length: int):
-    pred = {}
-    with open(orders_filename) as f:
-        orders = json.load(f)
-        print(f"Available orders: {list(orders.keys())}")
-        print(f"Data columns: {list(data.columns)}")
-        
-        column_to_order = {}
-        for column in data.columns:
-            if column in orders:
-                column_to_order[column] = column
-            else:
-                column_parts = column.split('_')
-                if len(column_parts) >= 3: 
-                    potential_key = f"{column_parts[-2]}_{column_parts[-1]}"
-                    if potential_key in orders:
-                        column_to_order[column] = potential_key
-        
-        print(f"Column to order mapping: {column_to_order}")
-        
-        for column in data.columns:
-            order_key = column_to_order.get(column)
-            if order_key:
-                print(f"Processing predictions for {column} using order parameters from {order_key}")
-                try:
-                    model = SARIMAX(endog=data[column], order=orders[order_key]).fit(disp=False)
-                    fc_pred = model.get_forecast(length)
-                    pred_df = fc_pred.conf_int(alpha = 0.05)
-                    pred_df['Prediction'] = model.predict(start = pred_df.index[0], end = pred_df.index[-1])
-                    pred_df.index = pd.date_range(data.index[-1] + timedelta(seconds=10), data.index[-1] + timedelta(seconds=length * 10), freq='10s')
-                    pred[column] = pred_df["Prediction"]
-                    print(f"Successfully generated prediction for {column}")
-                except Exception as e:
-                    print(f"Error generating prediction for {column}: {str(e)}")
-            else:
-                print(f"No matching order parameters found for column {column}")
+PAGINATION_MODES = ('offset', 'cursor')
+
+
+@analyze_bp.route('/model_cache', methods=['GET'])
+def get_model_cache_stats():
+    return jsonify({
+        "status": "success",
+        "model_cache": model_cache.stats()
+    }), 200
+
+
+@analyze_bp.route('/count_cache', methods=['GET'])
+def get_count_cache_stats():
+    return jsonify({
+        "status": "success",
+        "count_cache": count_cache.stats()
+    }), 200
+
+
+@analyze_bp.route('/table_cache', methods=['GET'])
+def get_table_cache_stats():
+    return jsonify({
+        "status": "success",
+        "table_cache": table_cache.stats()
+    }), 200
+
+
+@analyze_bp.route('/orders', methods=['GET'])
+def get_orders():
+    return jsonify({
+        "status": "success",
+        "orders": order_registry.stats()
+    }), 200
+
+@analyze_bp.route('/forecast_store', methods=['GET'])
+def get_forecast_store_stats():
+    return jsonify({
+        "status": "success",
+        "forecast_store": forecast_store.stats()
+    }), 200
+
+
+@analyze_bp.route('/forecast_store/<table_name>/refresh', methods=['POST'])
+def refresh_forecast_store(table_name):
+    job = schedule_refresh(table_name)
+    return jsonify({
+        "status": "accepted",
+        "message": f"Forecast refresh for table '{table_name}' queued",
+        "job_id": job.id,
+        "job_url": url_for('data.get_job', job_id=job.id)
+    }), 202
+
+
+@analyze_bp.route('/forecast', methods=['POST'])
+def submit_forecast():
+    request_data = request.get_json(silent=True)
+    
+    if not request_data:
+        return jsonify({"message": "Request body is required", "status": "error", "code": "MISSING_REQUEST_BODY"}), 400
     
-    result_df = pd.DataFrame({i: pred[i] for i in data.columns if i in pred})
-    print(f"Final prediction columns: {list(result_df.columns)}")
-    return result_df
+    table_name = request_data.get('table_name')
+    sensors = request_data.get('sensors', [])
+    time_start = request_data.get('time_start')
+    time_end = request_data.get('time_end')
+    prediction_length = request_data.get('prediction_length', 10)
+    prediction_timeout = request_data.get('prediction_timeout')
+    forecast_engine = request_data.get('forecast_engine') or Config.get('FORECAST_ENGINE')
+    forecast_engines = request_data.get('forecast_engines')
+    prediction_alpha = request_data.get('prediction_alpha') or Config.get('FORECAST_ALPHA')
+    training = {
+        "points": request_data.get('training_points'),
+        "duration": request_data.get('training_duration'),
+        "resample": request_data.get('resample')
+    }
+    
+    if not table_name:
+        return jsonify({"message": "Table name is required", "status": "error", "code": "MISSING_TABLE_NAME"}), 400
+    
+    if not sensors:
+        return jsonify({
+            "message": "At least one sensor must be specified in the sensors array",
+            "status": "error",
+            "code": "MISSING_REQUIRED_FILTERS"
+        }), 422
+    
+    try:
+        resolve_engines([], forecast_engine, forecast_engines)
+        parse_duration(training["duration"])
+        if not 0 < prediction_alpha < 1:
+            raise ValueError(f"prediction_alpha must be between 0 and 1, got {prediction_alpha}")
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": str(e), "status": "error", "code": "INVALID_FORECAST_PARAMS"}), 400
+    
+    params = {
+        "table_name": table_name,
+        "sensors": sensors,
+        "time_start": time_start,
+        "time_end": time_end,
+        "prediction_length": prediction_length,
+        "forecast_engine": forecast_engine,
+        "forecast_engines": forecast_engines,
+        "prediction_alpha": prediction_alpha,
+        "training": training
+    }
+    # Одинаковые запросы, пока задача в работе, получают один и тот же job_id
+    key = "forecast:" + json.dumps(params, sort_keys=True)
+    
+    job = JobQueue().submit(
+        'forecast', run_forecast, table_name, sensors,
+        time_start=time_start, time_end=time_end,
+        length=prediction_length, timeout=prediction_timeout,
+        engine=forecast_engine, engines=forecast_engines, training=training, alpha=prediction_alpha,
+        params=params, key=key
+    )
+    
+    return jsonify({
+        "status": "accepted",
+        "message": f"Forecast for table '{table_name}' queued",
+        "job_id": job.id,
+        "job_url": url_for('analyze.get_forecast', job_id=job.id),
+        "state": job.state
+    }), 202
+
+
+@analyze_bp.route('/forecast/<job_id>', methods=['GET'])
+def get_forecast(job_id):
+    job = JobQueue().get(job_id)
+    
+    if job is None or job.kind != 'forecast':
+        return jsonify({
+            "message": f"Forecast job '{job_id}' not found",
+            "status": "error",
+            "code": "JOB_NOT_FOUND"
+        }), 404
+    
+    return jsonify({
+        "status": "success",
+        "job": job.to_dict()
+    }), 200
+
 
 @analyze_bp.route('/tables', methods=['GET'])
 def get_tables():
@@ -135,10 +247,27 @@ def get_sensor_data(table_name):
     
     page = request_data.get('page', 1)
     page_size = request_data.get('page_size', 20)
+    pagination_mode = request_data.get('pagination', 'offset')
+    cursor = request_data.get('cursor')
+    count_mode = request_data.get('count_mode') or Config.get('PAGINATION_COUNT_MODE')
+    aggregation = request_data.get('aggregation')
+    points = request_data.get('points') or Config.get('DOWNSAMPLE_POINTS')
+    resolution = request_data.get('resolution')
+    use_rollups = request_data.get('use_rollups', True)
     
     # Prediction parameters
     include_predictions = request_data.get('include_predictions', False)
     prediction_length = request_data.get('prediction_length', 10)
+    prediction_timeout = request_data.get('prediction_timeout')
+    use_stored_predictions = request_data.get('use_stored_predictions', True)
+    forecast_engine = request_data.get('forecast_engine') or Config.get('FORECAST_ENGINE')
+    forecast_engines = request_data.get('forecast_engines')
+    prediction_alpha = request_data.get('prediction_alpha') or Config.get('FORECAST_ALPHA')
+    training = {
+        "points": request_data.get('training_points'),
+        "duration": request_data.get('training_duration'),
+        "resample": request_data.get('resample')
+    }
 
     print(f"Filters: {filters}")
     
@@ -163,158 +292,160 @@ def get_sensor_data(table_name):
             "code": "MISSING_REQUIRED_FILTERS"
         }), 422
     
-    column_names = []
-    sensor_info = [] 
-    for sensor_item in sensors:
-        for sensor_type, sensor_index in sensor_item.items():
-            if sensor_type == 'T':
-                column_name = f"T"
-            else:
-                column_name = f"{sensor_type}_{sensor_index}"
-            column_names.append(column_name)
-            sensor_info.append({
-                "column_name": column_name,
-                "sensor_type": sensor_type,
-                "sensor_index": sensor_index
-            })
+    column_names, sensor_info = sensor_columns(sensors)
     
-    select_columns = "Time," + ",".join(column_names)
-    print(f"Select columns: {select_columns}")
-    query = supabase.table(table_name).select(select_columns)
+    try:
+        value_min = parse_value_bound(value_min, "value_min")
+        value_max = parse_value_bound(value_max, "value_max")
+        time_start_utc = parse_time_bound(time_start, "time_start")
+        time_end_utc = parse_time_bound(time_end, "time_end")
+    except ValueError as e:
+        return jsonify({"message": str(e), "status": "error", "code": "INVALID_FILTER_PARAMS"}), 400
     
-    if time_start:
-        query = query.gte('Time', time_start)
+    if pagination_mode not in PAGINATION_MODES or count_mode not in COUNT_MODES:
+        return jsonify({
+            "message": f"pagination must be one of {', '.join(PAGINATION_MODES)} "
+                       f"and count_mode one of {', '.join(COUNT_MODES)}",
+            "status": "error",
+            "code": "INVALID_PAGINATION_PARAMS"
+        }), 400
     
-    if time_end:
-        query = query.lte('Time', time_end)
+    try:
+        if aggregation is not None and (aggregation not in AGGREGATION_METHODS
+                                        or not isinstance(points, int) or isinstance(points, bool) or points < 3):
+            raise ValueError(f"aggregation must be one of {', '.join(AGGREGATION_METHODS)} "
+                             f"and points an integer of at least 3")
+        resolution = parse_duration(resolution)
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": str(e), "status": "error", "code": "INVALID_AGGREGATION_PARAMS"}), 400
     
-    if value_min is not None:
-        for column_name in column_names:
-            query = query.or_(f"{column_name}.gte.{value_min}")
+    try:
+        resolve_engines(column_names, forecast_engine, forecast_engines)
+        parse_duration(training["duration"])
+        if not 0 < prediction_alpha < 1:
+            raise ValueError(f"prediction_alpha must be between 0 and 1, got {prediction_alpha}")
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": str(e), "status": "error", "code": "INVALID_FORECAST_PARAMS"}), 400
     
-    if value_max is not None:
-        for column_name in column_names:
-            query = query.or_(f"{column_name}.lte.{value_max}")
+    # Готовый прогноз из хранилища отдаётся без выборки всей истории и обучения моделей;
+    # с time_end прогноз строится от конца окна, поэтому считается на лету
+    stored = None
+    stored_entry = None
+    if include_predictions and use_stored_predictions and not time_end:
+        stored_entry = forecast_store.get(table_name)
+    if stored_entry and not forecast_engines \
+            and stored_entry.get("engine", "sarimax") == forecast_engine \
+            and stored_entry.get("forecast", {}).get("alpha") == prediction_alpha:
+        stored = stored_predictions(stored_entry, column_names, prediction_length)
     
-    if include_predictions:
-        response = query.order('Time').execute()
+    select_columns = "Time," + ",".join(column_names)
+    print(f"Select columns: {select_columns}")
+    query = apply_sensor_filters(
+        supabase.table(table_name).select(select_columns), column_names, time_start, time_end, value_min, value_max
+    ).order('Time', desc=True)
+    
+    if aggregation:
+        # Весь диапазон читается целиком и прореживается до points точек на датчик вместо постраничной выдачи
+        max_rows = Config.get('DOWNSAMPLE_MAX_ROWS')
+        rollup_level = None
+        if use_rollups and Config.get('ROLLUPS_ENABLED') and time_start and time_end:
+            # Самый крупный уровень, интервал которого не больше нужного шага графика
+            span = time_end_utc - time_start_utc
+            rollup_level = pick_rollup_level((resolution or span / points).total_seconds())
+            # Пока идёт загрузка или после неудачного обновления агрегатов читаются исходные строки
+            if rollup_level and not rollups_complete(supabase, table_name):
+                print(f"Rollups of {table_name} are incomplete, reading raw rows")
+                rollup_level = None
+        
+        range_frame = None
+        if rollup_level:
+            rollup_fields = [f"{column}_{name}" for column in column_names for name in ('min', 'max', 'mean', 'count')]
+            try:
+                # Агрегированные таблицы широкие и в узком формате хранения
+                rows = fetch_rows(rollup_table_name(table_name, rollup_level), rollup_fields, max_rows,
+                                  time_start, time_end, long=False)
+                range_frame, rows_read = rows_to_frame(rows, rollup_fields, dropna=False), len(rows)
+            except Exception as e:
+                # Таблицы, загруженные до появления агрегатов, читаются напрямую
+                print(f"Rollup {rollup_level} of {table_name} is not available, reading raw rows: {e}")
+                rollup_level = None
+        if range_frame is None:
+            range_frame, rows_read = fetch_frame(table_name, column_names, max_rows, time_start, time_end, dropna=False)
+    elif long_storage():
+        paginated_data, has_more = long_page(
+            supabase, table_name, column_names, time_start, time_end, value_min, value_max,
+            page=page, page_size=page_size, cursor=cursor, keyset=pagination_mode == 'cursor'
+        )
+    elif pagination_mode == 'cursor':
+        # Keyset-пагинация: следующая страница начинается после последнего Time предыдущей,
+        # поэтому глубина страницы не влияет на стоимость запроса
+        if cursor:
+            query = query.lt('Time', cursor)
+        rows = query.limit(page_size + 1).execute().data
+        has_more = len(rows) > page_size
+        paginated_data = rows[:page_size]
     else:
         range_start = (page - 1) * page_size
         range_end = range_start + page_size - 1
-        response = query.order('Time', desc=True).range(range_start, range_end).execute()
+        paginated_data = query.range(range_start, range_end).execute().data
     
     try:
-        count_query = supabase.table(table_name).select("Time", count='exact')
-        
-        if time_start:
-            count_query = count_query.gte('Time', time_start)
-        
-        if time_end:
-            count_query = count_query.lte('Time', time_end)
-        
-        count_result = count_query.execute()
-        total_count = count_result.count
-        
-        total_pages = (total_count + page_size - 1) // page_size
-        
-        predictions_by_time = {}
-        if include_predictions and response.data:
-            print(f"Attempting to generate predictions")
-            df_data = {}
-            time_column = []
-            
-            for row in response.data:
-                time_column.append(row["Time"])
-                for column_name in column_names:
-                    if column_name not in df_data:
-                        df_data[column_name] = []
-                    if column_name in row:
-                        df_data[column_name].append(row[column_name])
-                    else:
-                        df_data[column_name].append(None)
-            
-            df = pd.DataFrame(df_data)
-            print(f"Created DataFrame with columns: {list(df.columns)} and {len(df)} rows")
-            df.index = pd.to_datetime(time_column)
-            df = df.sort_index()  
-            
-            df_before = len(df)
-            df = df.dropna()
-            df_after = len(df)
-            print(f"After dropping NaN values: {df_after} rows (dropped {df_before - df_after} rows)")
-            
-            if not df.empty:
-                orders_filename = os.path.join('data', 'orders.json')
-                if os.path.exists(orders_filename):
-                    print(f"Found orders.json file at {orders_filename}")
-                    predictions_df = process_models(df, orders_filename, prediction_length)
-                    print(f"Generated predictions with shape: {predictions_df.shape}")
-                    
-                    for idx, timestamp in enumerate(predictions_df.index):
-                        time_str = timestamp.isoformat()
-                        if time_str not in predictions_by_time:
-                            predictions_by_time[time_str] = []
-                        
-                        for column in predictions_df.columns:
-                            if not pd.isna(predictions_df.iloc[idx][column]):
-                                sensor_info_item = next((item for item in sensor_info if item["column_name"] == column), None)
-                                sensor_type = sensor_info_item["sensor_type"] if sensor_info_item else "unknown"
-                                sensor_index = sensor_info_item["sensor_index"] if sensor_info_item else 0
-                                
-                                predictions_by_time[time_str].append({
-                                    "sensor": column,
-                                    "sensor_type": sensor_type,
-                                    "sensor_index": sensor_index,
-                                    "value": float(predictions_df.iloc[idx][column])
-                                })
-                else:
-                    print(f"orders.json file not found at {orders_filename}")
+        if aggregation:
+            total_count = total_pages = None
+        else:
+            # Число строк зависит только от таблицы и фильтров и кэшируется до следующей загрузки в таблицу
+            has_value_filters = value_min is not None or value_max is not None
+            count_key = (
+                table_name, time_start, time_end, value_min, value_max,
+                tuple(sorted(column_names)) if has_value_filters or long_storage() else (), count_mode
+            )
+            if long_storage():
+                counter = lambda: long_count(
+                    supabase, table_name, column_names, time_start, time_end, value_min, value_max, count_mode
+                )
             else:
-                print("DataFrame is empty after dropping NaN values")
-        
-        paginated_data = response.data
-        if include_predictions:
-            start_idx = (page - 1) * page_size
-            end_idx = start_idx + page_size
-            paginated_data = paginated_data[-end_idx:-start_idx] if start_idx > 0 else paginated_data[-end_idx:]
-            paginated_data.reverse()  
-        
-        data_by_time = {}
-        for row in paginated_data:
-            time_value = row["Time"]
-            if time_value not in data_by_time:
-                data_by_time[time_value] = []
+                counter = lambda: apply_sensor_filters(
+                    supabase.table(table_name).select("Time", count=count_mode, head=True),
+                    column_names, time_start, time_end, value_min, value_max
+                ).execute().count
+            total_count = count_cache.get(count_key, counter)
             
-            for column_name in column_names:
-                if column_name in row:
-                    sensor_info_item = next((item for item in sensor_info if item["column_name"] == column_name), None)
-                    sensor_type = sensor_info_item["sensor_type"] if sensor_info_item else "unknown"
-                    sensor_index = sensor_info_item["sensor_index"] if sensor_info_item else 0
-                    
-                    data_by_time[time_value].append({
-                        "sensor": column_name,
-                        "sensor_type": sensor_type,
-                        "sensor_index": sensor_index,
-                        "value": row[column_name]
-                    })
+            total_pages = (total_count + page_size - 1) // page_size if total_count is not None else None
         
-        transformed_data = [
-            {"time": time_value, "readings": readings}
-            for time_value, readings in sorted(data_by_time.items(), reverse=True)
-        ]
+        forecast = None
+        prediction_errors = {}
+        training_rows = None
+        if stored is not None:
+            forecast, prediction_errors = stored
+        elif include_predictions:
+            # Обучающее окно читается отдельно от страницы для отображения и ограничено по размеру
+            print(f"Attempting to generate predictions")
+            training_df = fetch_training_frame(table_name, column_names, time_start, time_end, **training)
+            training_rows = len(training_df)
+            forecast, prediction_errors = forecast_window(
+                training_df, table_name, prediction_length, prediction_timeout,
+                forecast_engine, forecast_engines, prediction_alpha
+            )
         
-        predicted_data = [
-            {"time": time_value, "readings": readings}
-            for time_value, readings in sorted(predictions_by_time.items(), reverse=True)
-        ]
+        if aggregation:
+            if rollup_level:
+                data_by_time = downsample_rollup_readings(range_frame, column_names, aggregation, points, sensor_info)
+            else:
+                data_by_time = downsample_readings(range_frame, aggregation, points, sensor_info)
+        else:
+            data_by_time = rows_to_readings_by_time(paginated_data, column_names, sensor_info)
+        
+        transformed_data = to_readings(data_by_time)
+        predicted_data = to_readings(forecast.readings_by_time(sensor_info)) if forecast is not None else []
         
         response_data = {
             "data": transformed_data,
             "pagination": {
-                "page": page,
+                "mode": pagination_mode,
                 "page_size": page_size,
                 "total_count": total_count,
-                "total_pages": total_pages
+                "total_pages": total_pages,
+                "count_mode": count_mode
             },
             "filters": {
                 "sensors": sensors,
@@ -327,51 +458,74 @@ def get_sensor_data(table_name):
             "status": "success"
         }
         
+        if aggregation:
+            del response_data["pagination"]
+            response_data["aggregation"] = {
+                "method": aggregation,
+                "points": points,
+                "rows": len(range_frame),
+                "truncated": rows_read >= max_rows,
+                "source": rollup_table_name(table_name, rollup_level) if rollup_level else table_name,
+                "rollup": rollup_level
+            }
+        elif pagination_mode == 'cursor':
+            response_data["pagination"].update({
+                "cursor": cursor,
+                "next_cursor": paginated_data[-1]["Time"] if has_more else None,
+                "has_more": has_more
+            })
+        else:
+            response_data["pagination"]["page"] = page
+        
         if include_predictions:
             print(f"Include predictions is set to: {include_predictions}")
             print(f"Generated {len(predicted_data)} prediction data points")
             
             response_data["predictions"] = predicted_data
+            if forecast is not None:
+                response_data["prediction_series"] = forecast.to_dict()
             response_data["prediction_params"] = {
-                "length": prediction_length
+                "length": prediction_length,
+                "alpha": prediction_alpha,
+                "engine": forecast_engine
             }
+            if forecast_engines:
+                response_data["prediction_params"]["engines"] = forecast_engines
+            if training_rows is not None:
+                response_data["prediction_params"]["training_rows"] = training_rows
+            if prediction_errors:
+                response_data["prediction_errors"] = prediction_errors
+            if stored is not None:
+                response_data["prediction_params"].update({
+                    "source": "store",
+                    "computed_at": stored_entry["computed_at"],
+                    "data_until": stored_entry["data_until"],
+                    "age_seconds": entry_age(stored_entry)
+                })
+            else:
+                response_data["prediction_params"]["source"] = "live"
             
             if predicted_data:
                 print(f"Added {len(predicted_data)} prediction points to response")
             else:
                 print("No predictions were generated, but predictions section was added to response")
                 
-                if not os.path.exists(os.path.join('data', 'orders.json')):
+                if not order_registry.available:
                     print("WARNING: orders.json file was not found")
                     response_data["prediction_error"] = "Configuration file not found"
-                elif not response.data:
+                elif training_rows == 0:
                     print("WARNING: No data returned from database")
                     response_data["prediction_error"] = "No data available for prediction"
                 else:
-                    order_file = os.path.join('data', 'orders.json')
-                    if os.path.exists(order_file):
-                        with open(order_file, 'r') as f:
-                            orders = json.load(f)
-                            print(f"Orders file contains keys: {list(orders.keys())}")
-                            print(f"Looking for columns: {column_names}")
-                            
-                            matched_columns = []
-                            for col in column_names:
-                                if col in orders:
-                                    matched_columns.append(col)
-                                else:
-                                    parts = col.split('_')
-                                    if len(parts) >= 2:
-                                        partial = f"{parts[-2]}_{parts[-1]}"
-                                        if partial in orders:
-                                            matched_columns.append(col)
-                            
-                            if not matched_columns:
-                                response_data["prediction_error"] = "No matching configuration for selected sensors"
-                                print(f"WARNING: None of the requested columns match entries in orders.json")
-                            else:
-                                response_data["prediction_error"] = "Error generating predictions"
-                                print(f"WARNING: Found matches but predictions still failed: {matched_columns}")
+                    print(f"Looking for columns: {column_names}")
+                    matched_columns = list(order_registry.match(column_names, table_name))
+                    
+                    if not matched_columns:
+                        response_data["prediction_error"] = "No matching configuration for selected sensors"
+                        print(f"WARNING: None of the requested columns match entries in orders.json")
+                    else:
+                        response_data["prediction_error"] = "Error generating predictions"
+                        print(f"WARNING: Found matches but predictions still failed: {matched_columns}")
         else:
             print(f"No predictions added to response. include_predictions={include_predictions}")
         
@@ -1,11 +1,17 @@
-from flask import Blueprint, jsonify, request
-from app.db_client import DBClient
-import pandas as pd
+from flask import Blueprint, jsonify, request, url_for
+from app.config import Config
+from app.csv_parser import normalize_headers, DEFAULT_DECIMAL, find_time_column
+from app.ingest import ingest_csv, read_headers, IngestError
+from app.jobs import JobQueue
+from app.forecast.store import schedule_refresh
 import io
+import os
 import re
+import tempfile
 
 data_bp = Blueprint('data', __name__, url_prefix='/api/v1/data')
 
+
 @data_bp.route('/analyze', methods=['POST'])
 def analyze_csv():
     if 'file' not in request.files:
@@ -26,22 +32,7 @@ def analyze_csv():
         stream = io.StringIO(file_content, newline=None)
         
         first_line = stream.readline()
-        headers = first_line.split(separator)
-        
-        clean_headers = []
-        for header in headers:
-            clean_header = header.split(' ')[0].strip()
-            clean_header = ''.join(c for c in clean_header if c.isprintable())
-            
-            if re.match(r'T_\d+', clean_header):
-                clean_headers.append("T")
-                continue
-                
-            match = re.match(r'^T\d+_(.*)', clean_header)
-            if match:
-                clean_header = match.group(1) 
-                
-            clean_headers.append(clean_header)
+        clean_headers = normalize_headers(first_line.split(separator))
         
         sensor_types = {}
         pipe_numbers = set()
@@ -118,189 +109,81 @@ def create_and_load():
     
     try:
         separator = request.form.get('separator', ';')
+        decimal = request.form.get('decimal', DEFAULT_DECIMAL)
         table_name = request.form.get('table_name', 'sensor_data')
         create_table = request.form.get('create_table', 'true').lower() == 'true'
-        
-        file_content = file.stream.read().decode("UTF-8-SIG")
-        stream = io.StringIO(file_content, newline=None)
-        
-        first_line = stream.readline()
-        headers = first_line.split(separator)
-        
-        clean_headers = []
-        for header in headers:
-            clean_header = header.split(' ')[0].strip()
-            clean_header = ''.join(c for c in clean_header if c.isprintable())
-            
-            if re.match(r'T_\d+', clean_header):
-                clean_headers.append("T")
-                continue
-                
-            match = re.match(r'^T\d+_(.*)', clean_header)
-            if match:
-                clean_header = match.group(1)  
-                
-            clean_headers.append(clean_header)
-        
-        stream.seek(0)
-        
-        df = pd.read_csv(stream, sep=separator, names=clean_headers, skiprows=1, dtype=str)
-        
-        time_column = None
-        for col in df.columns:
-            if col.lower() == 'time' or col.lower() == 'timestamp':
-                time_column = col
-                break
-        
-        if not time_column:
-            return jsonify({"message": "Time column not found in CSV", "status": "error"}), 400
-        
-        for column in df.columns:
-            if column == time_column:
-                df[column] = df[column].str.replace(',', '.')
-                try:
-                    df[column] = pd.to_datetime(df[column])
-                except Exception as e:
-                    print(f"Error converting time: {str(e)}")
-                continue
-                
-            try:
-                df[column] = df[column].str.replace(',', '.').astype(float)
-            except Exception as e:
-                print(f"Error converting column {column}: {str(e)}")
-        
-        db_client = DBClient()
-        supabase = db_client.get_supabase()
-        
-        if create_table:
-            columns = {}
-            for header in clean_headers:
-                if header == time_column:
-                    columns[header] = "TIMESTAMP WITH TIME ZONE"
-                else:
-                    columns[header] = "DOUBLE PRECISION"
-            
-            try:
-                print(f"Creating table {table_name} with structure: {columns}")
-                
-                result = supabase.rpc(
-                    'create_sensor_table',
-                    {
-                        'table_name': table_name,
-                        'columns_json': columns 
-                    }
-                ).execute()
-                
-                print(f"Table creation result: {result.data}")
-                
-                if result.data and isinstance(result.data, str) and result.data.startswith('Error:'):
-                    return jsonify({
-                        "status": "error",
-                        "message": f"Error creating table: {result.data}"
-                    }), 500
-                
-                try:
-                    supabase.table("tables").insert({"name": table_name}).execute()
-                    print(f"Successfully added table {table_name} to tables table")
-                except Exception as e:
-                    print(f"Error adding table to tables table: {str(e)}")
-                
-            except Exception as e:
-                print(f"Error creating table: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                return jsonify({
-                    "status": "error",
-                    "message": f"Error creating table: {str(e)}"
-                }), 500
-        
-        records = df.to_dict('records')
-        
-        for record in records:
-            for key, value in record.items():
-                if isinstance(value, pd.Timestamp):
-                    record[key] = value.isoformat()
-        
+        run_async = request.form.get('async', 'true').lower() == 'true'
         try:
-            response = supabase.table(table_name).insert(records).execute()
-            print(f"Data successfully loaded into table {table_name}")
-        except Exception as e:
-            print(f"Error inserting data: {str(e)}")
-            return jsonify({
-                "status": "error",
-                "message": f"Error inserting data: {str(e)}"
-            }), 500
-        
-        sensor_metadata = []
-        for column in df.columns:
-            if column == time_column:
-                continue
-                
-            sensor_type = "Unknown"
-            pipe_number = None
-            sensor_number = None
-            
-            if column == "T":
-                sensor_type = "Температура"
-                sensor_number = None
-            
-            elif '_' in column:
-                temp_match = re.match(r'([A-Za-z]+)_(\d+)', column)
-                if temp_match:
-                    try:
-                        sensor_code = temp_match.group(1)
-                        sensor_number = int(temp_match.group(2))
-                        
-                        if sensor_code == 'K':
-                            sensor_type = "Кольцевая деформация"
-                        elif sensor_code == 'L':
-                            sensor_type = "Левая образующая"
-                        elif sensor_code == 'R':
-                            sensor_type = "Правая образующая"
-                        elif sensor_code == 'Up':
-                            sensor_type = "Верхняя образующая"
-                    except:
-                        pass
-                else:
-                    match = re.match(r'T(\d+)_([A-Za-z]+)_(\d+)', column)
-                    if match:
-                        try:
-                            pipe_number = int(match.group(1))
-                            sensor_code = match.group(2)
-                            sensor_number = int(match.group(3))
-                            
-                            if sensor_code == 'K':
-                                sensor_type = "Кольцевая деформация"
-                            elif sensor_code == 'L':
-                                sensor_type = "Левая образующая"
-                            elif sensor_code == 'R':
-                                sensor_type = "Правая образующая"
-                            elif sensor_code == 'Up':
-                                sensor_type = "Верхняя образующая"
-                        except:
-                            pass
-            
-            sensor_metadata.append({
-                "sensor_code": column,
-                "pipe_number": pipe_number,
-                "sensor_type": sensor_type,
-                "sensor_number": sensor_number,
-                "description": f"{sensor_type} датчик #{sensor_number} на трубе #{pipe_number}" if pipe_number else f"{sensor_type} датчик #{sensor_number}",
-                "units": "°C" if sensor_type == "Температура" else "мм",
-                "table_name": table_name
-            })
-        
+            chunk_size = int(request.form.get('chunk_size', Config.get('INGEST_CHUNK_SIZE')))
+            batch_size = int(request.form.get('batch_size', Config.get('INGEST_BATCH_SIZE')))
+            max_workers = int(request.form.get('workers', Config.get('INSERT_WORKERS')))
+            if chunk_size <= 0 or batch_size <= 0 or max_workers <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return jsonify({"message": "chunk_size, batch_size and workers must be positive integers",
+                            "status": "error"}), 422
+
+        # Сохраняем загрузку во временный файл: запрос завершится раньше, чем фоновая загрузка
+        fd, upload_path = tempfile.mkstemp(suffix='.csv', prefix='upload_')
+        os.close(fd)
+        # Файл удаляет задача загрузки; до передачи ей он удаляется здесь при любом исходе
+        handed_off = False
         try:
-            supabase.table("sensor_metadata").upsert(sensor_metadata).execute()
-            print(f"Successfully updated sensor metadata")
-        except Exception as e:
-            print(f"Error updating sensor metadata: {str(e)}")
-        
+            file.save(upload_path)
+
+            with open(upload_path, encoding="UTF-8-SIG") as stream:
+                clean_headers = read_headers(stream, separator)
+
+            if not find_time_column(clean_headers):
+                return jsonify({"message": "Time column not found in CSV", "status": "error"}), 400
+
+            options = {
+                "separator": separator,
+                "decimal": decimal,
+                "create_table": create_table,
+                "chunk_size": chunk_size,
+                "batch_size": batch_size,
+                "max_workers": max_workers
+            }
+
+            if run_async:
+                job = JobQueue().submit(
+                    'ingest',
+                    _run_ingest_job,
+                    upload_path,
+                    table_name,
+                    params={"table_name": table_name, "file_name": file.filename, **options},
+                    **options
+                )
+                handed_off = True
+                return jsonify({
+                    "status": "accepted",
+                    "message": f"Loading into {table_name} has been queued",
+                    "job_id": job.id,
+                    "job_url": url_for('data.get_job', job_id=job.id)
+                }), 202
+
+            handed_off = True
+            try:
+                result = _run_ingest_job(None, upload_path, table_name, **options)
+            except IngestError as e:
+                return jsonify({"message": str(e), "status": "error"}), 500
+        finally:
+            if not handed_off and os.path.exists(upload_path):
+                os.remove(upload_path)
+
+        failed_batches = result["ingest"]["failed_batches"]
+        if failed_batches:
+            return jsonify({
+                "status": "partial",
+                "message": f"{len(failed_batches)} batches failed to load into {table_name}",
+                **result
+            }), 207
+
         return jsonify({
             "status": "success",
             "message": f"Data loaded successfully into {table_name}",
-            "rows_inserted": len(records),
-            "sensors_metadata": len(sensor_metadata)
+            **result
         }), 200
         
     except Exception as e:
@@ -314,3 +197,33 @@ def load_data():
     return create_and_load()
 
 
+@data_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = JobQueue().get(job_id)
+
+    if job is None:
+        return jsonify({"message": f"Job {job_id} not found", "status": "error", "code": "JOB_NOT_FOUND"}), 404
+
+    return jsonify({"status": "success", "job": job.to_dict()}), 200
+
+
+def _run_ingest_job(job, upload_path, table_name, **options):
+    try:
+        with open(upload_path, encoding="UTF-8-SIG") as stream:
+            result = ingest_csv(
+                stream,
+                table_name,
+                progress=job.update_progress if job else None,
+                **options
+            )
+    finally:
+        os.remove(upload_path)
+
+    # Прогнозы пересчитываются в фоне, чтобы первый зритель таблицы не ждал обучения моделей
+    if result["rows_inserted"]:
+        result["forecast_job_id"] = schedule_refresh(table_name).id
+
+    if job:
+        for batch in result["ingest"]["failed_batches"]:
+            job.errors.append(f"Rows {batch['offset']}-{batch['offset'] + batch['rows'] - 1}: {batch['error']}")
+    return result
@@ -0,0 +1,63 @@
+import json
+import struct
+
+import numpy as np
+
+# Бинарный формат модели трубы для загрузки прямо в типизированные массивы WebGL:
+#
+#   uint32 (little-endian)  длина JSON-заголовка в байтах (кратна 4)
+#   JSON-заголовок          метаданные + описание буферов, дополнен пробелами
+#   буферы                  float32/uint32, little-endian, каждый выровнен на 4 байта
+#
+# Смещения буферов в заголовке ("offset") отсчитываются от начала первого буфера
+BINARY_MIMETYPE = 'application/octet-stream'
+
+BUFFER_DTYPES = {
+    'float32': np.dtype('<f4'),
+    'uint32': np.dtype('<u4')
+}
+
+
+def pack_binary(header, buffers):
+    """Packs `header` (dict) and named arrays into a single binary payload.
+
+    `buffers` is a list of (name, array, dtype_name, item_size) tuples, where
+    `item_size` is the number of components per element (3 for xyz, 1 for indices).
+    """
+    descriptors = []
+    chunks = []
+    offset = 0
+
+    for name, array, dtype_name, item_size in buffers:
+        data = np.ascontiguousarray(array, dtype=BUFFER_DTYPES[dtype_name]).tobytes()
+        descriptors.append({
+            "name": name,
+            "dtype": dtype_name,
+            "offset": offset,
+            "length": len(data) // BUFFER_DTYPES[dtype_name].itemsize,
+            "item_size": item_size
+        })
+        chunks.append(data)
+        offset += len(data)
+
+    header_bytes = json.dumps({**header, "buffers": descriptors}).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 4)
+
+    return b''.join([struct.pack('<I', len(header_bytes)), header_bytes] + chunks)
+
+
+def unpack_binary(payload):
+    """Inverse of `pack_binary`: returns the header and a dict of NumPy arrays."""
+    header_length = struct.unpack_from('<I', payload, 0)[0]
+    header = json.loads(payload[4:4 + header_length].decode('utf-8'))
+    body_start = 4 + header_length
+
+    arrays = {}
+    for descriptor in header["buffers"]:
+        arrays[descriptor["name"]] = np.frombuffer(
+            payload,
+            dtype=BUFFER_DTYPES[descriptor["dtype"]],
+            count=descriptor["length"],
+            offset=body_start + descriptor["offset"]
+        )
+    return header, arrays
@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from typing import Callable, Tuple
+import threading
+
+
+def _entry_bytes(geometry: dict) -> int:
+    arrays = sum(geometry[name].nbytes for name in ("vertices", "normals", "indices"))
+    return arrays + sum(len(payload) for payload in geometry["payloads"].values())
+
+
+class GeometryCache:
+    """Pipe geometries keyed by their parameters, bounded by the bytes they hold.
+
+    The size of an entry counts its arrays and the encoded payloads added to it with
+    `add_payload`. Least recently used entries are evicted once the total exceeds
+    `max_bytes`; an entry larger than the whole budget is returned without being kept.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, dict]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple, builder: Callable[[], dict]) -> dict:
+        with self._lock:
+            geometry = self._entries.get(key)
+            if geometry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return geometry
+
+            # Построение под блокировкой: параллельные запросы не строят одну сетку дважды
+            self.misses += 1
+            geometry = builder()
+            size = _entry_bytes(geometry)
+            if size > self.max_bytes:
+                return geometry
+            geometry["cache_key"] = key
+            self._entries[key] = geometry
+            self._bytes += size
+            self._evict()
+            return geometry
+
+    def add_payload(self, geometry: dict, response_format: str, payload):
+        """Stores an encoded representation on the geometry and counts it if the entry is cached."""
+        with self._lock:
+            if response_format in geometry["payloads"]:
+                return
+            geometry["payloads"][response_format] = payload
+            if self._entries.get(geometry.get("cache_key")) is geometry:
+                self._bytes += len(payload)
+                self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, geometry = self._entries.popitem(last=False)
+            self._bytes -= _entry_bytes(geometry)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
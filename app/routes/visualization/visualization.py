@@ -1,9 +1,14 @@
-from flask import Blueprint, jsonify, request, render_template, send_from_directory
+from flask import Blueprint, Response, jsonify, request, render_template, send_from_directory
 import pandas as pd
 import numpy as np
 import os
 import json
+import hashlib
 from app.db_client import DBClient
+from app.csv_parser import read_csv_header, read_sensor_csv
+from app.frame_cache import sensor_frame_cache
+from app.routes.visualization.binary_format import pack_binary, BINARY_MIMETYPE
+from app.routes.visualization.geometry_cache import GeometryCache
 import logging
 import locale
 
@@ -11,22 +16,23 @@ import locale
 visualization_bp = Blueprint('visualization', __name__, url_prefix='/api/v1/visualization',
                             template_folder='templates', static_folder='static')
 
+# Функция для разбора CSV с данными датчиков (результат кэшируется в sensor_frame_cache)
+def _load_sensor_csv(csv_path):
+    # Очистка имен столбцов от лишней информации (единицы измерения и т.п.)
+    columns = [col.split(' ')[0] for col in read_csv_header(csv_path, separator=';')]
+    
+    # Числа с запятой разбираются парсером напрямую (decimal=','),
+    # время - по фиксированному формату 2024-01-01T00:06:09,555
+    return read_sensor_csv(csv_path, names=columns, separator=';', encoding='utf-8-sig')
+
 # Функция для чтения данных из CSV
 def read_sensor_data_from_csv(csv_path, time_start=None, time_end=None):
     try:
-        # Загрузка CSV с данными датчиков
-        df = pd.read_csv(csv_path, sep=';', encoding='utf-8')
-        
-        # Очистка имен столбцов от лишней информации
-        df.columns = [col.split(' ')[0] for col in df.columns]
+        # Файл разбирается один раз и перечитывается только при изменении mtime.
+        # Кэшированный DataFrame общий для всех запросов - не изменяем его
+        df = sensor_frame_cache.get(csv_path, _load_sensor_csv)
         
-        # Преобразуем столбец времени в datetime с явным указанием формата
-        # Здесь предполагаем, что формат даты - ISO (2024-01-01T00:06:09,555)
-        # Заменяем запятую на точку в значениях времени для правильного парсинга
-        df['Time'] = df['Time'].str.replace(',', '.')
-        df['Time'] = pd.to_datetime(df['Time'], format='%Y-%m-%dT%H:%M:%S.%f')
-        
-        # Применяем фильтры по времени, если указаны
+        # Применяем фильтры по времени, если указаны (фильтрация создаёт новый DataFrame)
         if time_start:
             time_start = pd.to_datetime(time_start)
             df = df[df['Time'] >= time_start]
@@ -35,18 +41,271 @@ def read_sensor_data_from_csv(csv_path, time_start=None, time_end=None):
             time_end = pd.to_datetime(time_end)
             df = df[df['Time'] <= time_end]
         
-        # Преобразуем числовые столбцы, заменяя запятые на точки
-        for column in df.columns:
-            if column != 'Time':
-                # Заменяем запятые на точки и преобразуем в числовой формат
-                df[column] = df[column].astype(str).str.replace(',', '.').astype(float)
-        
         return df
     
     except Exception as e:
         logging.error(f"Error reading sensor data: {str(e)}")
         raise
 
+# Функция для построения геометрии трубы: вершины, нормали и индексы треугольников.
+# Порядок элементов совпадает с прежней реализацией на вложенных циклах:
+# для каждого кольца i и угла j - вершина внешней, затем внутренней поверхности
+def build_pipe_geometry(length, radius, wall_thickness, segments, sections):
+    z = np.arange(sections + 1) / sections * length
+    theta = np.arange(segments) / segments * 2 * np.pi
+    cos_theta = np.cos(theta)
+    sin_theta = np.sin(theta)
+    
+    # vertices[i, j, k] - вершина k (0 - внешняя, 1 - внутренняя) на кольце i и угле j
+    vertices = np.empty((sections + 1, segments, 2, 3))
+    vertices[:, :, 0, 0] = radius * cos_theta
+    vertices[:, :, 0, 1] = radius * sin_theta
+    vertices[:, :, 1, 0] = (radius - wall_thickness) * cos_theta
+    vertices[:, :, 1, 1] = (radius - wall_thickness) * sin_theta
+    vertices[:, :, :, 2] = z[:, np.newaxis, np.newaxis]
+    
+    # Нормали (упрощенно): наружу для внешней поверхности, внутрь - для внутренней
+    normals = np.zeros((sections + 1, segments, 2, 3))
+    normals[:, :, 0, 0] = cos_theta
+    normals[:, :, 0, 1] = sin_theta
+    normals[:, :, 1, 0] = -cos_theta
+    normals[:, :, 1, 1] = -sin_theta
+    
+    # Индексы для треугольников (faces)
+    i = np.arange(sections)[:, np.newaxis]
+    j = np.arange(segments)[np.newaxis, :]
+    j_next = (j + 1) % segments
+    idx00 = 2 * (i * segments + j)
+    idx01 = 2 * (i * segments + j_next)
+    idx10 = 2 * ((i + 1) * segments + j)
+    idx11 = 2 * ((i + 1) * segments + j_next)
+    
+    indices = np.stack([
+        # Два треугольника для внешней поверхности
+        idx00, idx10, idx01,
+        idx01, idx10, idx11,
+        # Два треугольника для внутренней поверхности (обратный порядок)
+        idx00 + 1, idx01 + 1, idx10 + 1,
+        idx01 + 1, idx11 + 1, idx10 + 1
+    ], axis=-1)
+    
+    return vertices.ravel(), normals.ravel(), indices.ravel()
+
+# Уровни детализации (segments, sections) от грубого к подробному.
+# Каждый квад сетки даёт 4 треугольника (2 на внешней и 2 на внутренней поверхности)
+LOD_TIERS = [(16, 32), (32, 64), (64, 128), (128, 256), (256, 512)]
+# Примерное число пикселей экрана на один сегмент окружности для выбора по размеру окна
+PIXELS_PER_SEGMENT = 8
+
+def triangle_count(segments, sections):
+    return 4 * segments * sections
+
+# Объём кэша геометрии в байтах (массивы и закодированные представления); самый подробный
+# уровень детализации с JSON- и бинарным представлением занимает около 75 МБ
+GEOMETRY_CACHE_MAX_BYTES = 128 * 1024 * 1024
+# Размеры трубы округляются до миллиметра, чтобы близкие значения от клиента давали один ключ кэша
+GEOMETRY_DECIMALS = 3
+
+geometry_cache = GeometryCache(GEOMETRY_CACHE_MAX_BYTES)
+
+# Геометрия зависит только от параметров трубы, поэтому строится один раз на набор параметров.
+# Кэшируются только уровни детализации из LOD_TIERS: произвольные segments/sections
+# строятся на каждый запрос и не вытесняют из кэша стандартные уровни
+def get_pipe_geometry(length, radius, wall_thickness, segments, sections):
+    key = (length, radius, wall_thickness, segments, sections)
+    if (segments, sections) not in LOD_TIERS:
+        return _build_pipe_geometry(*key)
+    return geometry_cache.get(key, lambda: _build_pipe_geometry(*key))
+
+# В записи геометрии хранятся массивы (только для чтения), ETag и закодированные представления
+def _build_pipe_geometry(length, radius, wall_thickness, segments, sections):
+    vertices, normals, indices = build_pipe_geometry(length, radius, wall_thickness, segments, sections)
+    for array in (vertices, normals, indices):
+        array.flags.writeable = False
+    
+    parameters = {
+        "length": length,
+        "radius": radius,
+        "wall_thickness": wall_thickness,
+        "segments": segments,
+        "sections": sections
+    }
+    etag = hashlib.sha1(json.dumps(parameters, sort_keys=True).encode()).hexdigest()
+    lod = {
+        "tier": LOD_TIERS.index((segments, sections)) if (segments, sections) in LOD_TIERS else None,
+        "triangles": triangle_count(segments, sections),
+        "tiers": [
+            {"tier": tier, "segments": tier_segments, "sections": tier_sections,
+             "triangles": triangle_count(tier_segments, tier_sections)}
+            for tier, (tier_segments, tier_sections) in enumerate(LOD_TIERS)
+        ]
+    }
+    
+    return {
+        "metadata": {"version": 1.0, "type": "pipe", "parameters": parameters, "lod": lod, "etag": etag},
+        "vertices": vertices,
+        "normals": normals,
+        "indices": indices,
+        "etag": etag,
+        "payloads": {}
+    }
+
+# Закодированная геометрия в формате 'json' или 'binary'; кодируется при первом запросе
+def get_geometry_payload(geometry, response_format):
+    payload = geometry["payloads"].get(response_format)
+    if payload is not None:
+        return payload
+    
+    if response_format == 'binary':
+        payload = pack_binary(
+            {"status": "success", "metadata": geometry["metadata"]},
+            [
+                ("vertices", geometry["vertices"], "float32", 3),
+                ("normals", geometry["normals"], "float32", 3),
+                ("indices", geometry["indices"], "uint32", 1)
+            ]
+        )
+    else:
+        payload = json.dumps({
+            "status": "success",
+            "geometry": {
+                "metadata": geometry["metadata"],
+                "vertices": geometry["vertices"].tolist(),
+                "normals": geometry["normals"].tolist(),
+                "indices": geometry["indices"].tolist()
+            }
+        })
+    
+    geometry_cache.add_payload(geometry, response_format, payload)
+    return payload
+
+# Количество вершин, для которых матрица расстояний до датчиков считается за один шаг
+COLOR_CHUNK_VERTICES = 65536
+
+# Функция для определения цвета на основе значения и критического порога (векторно):
+# зелёный -> жёлтый до 80% порога, жёлтый -> красный до 100%, красный выше порога
+def get_colors_for_values(values, critical_threshold):
+    ratio = values / critical_threshold
+    colors = np.zeros((len(ratio), 3))
+    
+    critical = ratio >= 1.0
+    warning = ~critical & (ratio >= 0.8)
+    normal = ~(critical | warning)
+    
+    # Красный для критических значений
+    colors[critical, 0] = 1.0
+    
+    # Плавный переход от жёлтого к красному
+    colors[warning, 0] = 1.0
+    colors[warning, 1] = 1.0 * (1 - (ratio[warning] - 0.8) / 0.2)
+    
+    # Плавный переход от зелёного к жёлтому
+    colors[normal, 0] = ratio[normal] / 0.8
+    colors[normal, 1] = 1.0
+    
+    return colors
+
+# Функция для расчёта цветов вершин: значение в вершине - среднее показаний датчиков
+# с весами 1 / (1 + d^2), где d - расстояние от вершины до датчика.
+# Матрица расстояний считается блоками по COLOR_CHUNK_VERTICES вершин, а суммы по датчикам
+# накапливаются в том же порядке, что и в прежнем поэлементном цикле, поэтому результат
+# совпадает с ним с точностью до последнего бита округления (см. benchmarks/bench_pipe_colors.py)
+def compute_vertex_colors(vertices, sensors, critical_threshold):
+    points = np.asarray(vertices, dtype=float).reshape(-1, 3)
+    active = [sensor for sensor in sensors if sensor["type"] != "temperature"]
+    weighted_values = np.zeros(len(points))
+    
+    if active:
+        positions = np.array([sensor["position"] for sensor in active], dtype=float)
+        values = np.array([sensor["value"] for sensor in active], dtype=float)
+        
+        for start in range(0, len(points), COLOR_CHUNK_VERTICES):
+            chunk = points[start:start + COLOR_CHUNK_VERTICES]
+            
+            # Матрица расстояний: строки - вершины, столбцы - датчики
+            dx = chunk[:, 0, np.newaxis] - positions[np.newaxis, :, 0]
+            dy = chunk[:, 1, np.newaxis] - positions[np.newaxis, :, 1]
+            dz = chunk[:, 2, np.newaxis] - positions[np.newaxis, :, 2]
+            distance = np.sqrt(dx**2 + dy**2 + dz**2)
+            
+            # Влияние обратно пропорционально квадрату расстояния
+            weights = 1.0 / (1.0 + distance**2)
+            
+            # Нормализуем веса
+            total_weight = np.zeros(len(chunk))
+            for k in range(len(active)):
+                total_weight += weights[:, k]
+            weights /= total_weight[:, np.newaxis]
+            
+            # Взвешенное значение деформации для вершины
+            weighted = np.zeros(len(chunk))
+            for k in range(len(active)):
+                weighted += values[k] * weights[:, k]
+            weighted_values[start:start + len(chunk)] = weighted
+    
+    return get_colors_for_values(weighted_values, critical_threshold).ravel()
+
+# Функция для определения датчиков деформации и их положения на трубе
+def extract_sensors(sensor_data, length, radius):
+    sensors = []
+    
+    # Получаем последнюю строку данных (или среднее нескольких строк)
+    latest_data = sensor_data.iloc[-1:].mean().to_dict()
+    
+    # Определяем типы датчиков
+    sensor_types = {}
+    for column in sensor_data.columns:
+        if column == "Time":
+            continue
+            
+        # T2_K_1 - кольцевая деформация
+        # T2_Up_1 - верхняя часть
+        # T2_R_1 - правая сторона
+        # T2_L_1 - левая сторона
+        # T_2 - температура
+        if "_K_" in column:  # Кольцевая деформация
+            sensor_type = "ring"
+            sensor_num = int(column.split("_")[-1])
+            position = float(sensor_num) / 3.0 * length  # Примерное позиционирование
+            sensors.append({
+                "id": column,
+                "type": sensor_type,
+                "position": [0, 0, position],
+                "value": latest_data.get(column, 0)
+            })
+        elif "_Up_" in column:  # Верхняя часть
+            sensor_type = "up"
+            sensor_num = int(column.split("_")[-1])
+            position = float(sensor_num) / 3.0 * length
+            sensors.append({
+                "id": column,
+                "type": sensor_type,
+                "position": [0, radius, position],
+                "value": latest_data.get(column, 0)
+            })
+        elif "_R_" in column:  # Правая сторона
+            sensor_type = "right"
+            sensor_num = int(column.split("_")[-1])
+            position = float(sensor_num) / 3.0 * length
+            sensors.append({
+                "id": column,
+                "type": sensor_type,
+                "position": [radius, 0, position],
+                "value": latest_data.get(column, 0)
+            })
+        elif "_L_" in column:  # Левая сторона
+            sensor_type = "left"
+            sensor_num = int(column.split("_")[-1])
+            position = float(sensor_num) / 3.0 * length
+            sensors.append({
+                "id": column,
+                "type": sensor_type,
+                "position": [-radius, 0, position],
+                "value": latest_data.get(column, 0)
+            })
+    
+    return sensors
+
 # Функция для создания 3D модели трубы
 def generate_pipe_model(sensor_data, length=10.0, radius=1.0, wall_thickness=0.1, segments=32, sections=64, critical_threshold=500):
     # Создаем JSON модель трубы, которую будем передавать на фронтенд
@@ -70,163 +329,21 @@ def generate_pipe_model(sensor_data, length=10.0, radius=1.0, wall_thickness=0.1
         "indices": []
     }
     
-    # Создаем вершины цилиндра (трубы)
-    for i in range(sections + 1):
-        z = (i / sections) * length
-        for j in range(segments):
-            theta = (j / segments) * 2 * np.pi
-            
-            # Внешняя поверхность трубы
-            x_outer = radius * np.cos(theta)
-            y_outer = radius * np.sin(theta)
-            
-            # Внутренняя поверхность трубы
-            x_inner = (radius - wall_thickness) * np.cos(theta)
-            y_inner = (radius - wall_thickness) * np.sin(theta)
-            
-            # Добавляем вершины внешней и внутренней поверхности
-            pipe_model["vertices"].extend([x_outer, y_outer, z])
-            pipe_model["vertices"].extend([x_inner, y_inner, z])
-            
-            # Нормали (упрощенно)
-            normal_outer = [np.cos(theta), np.sin(theta), 0]
-            normal_inner = [-np.cos(theta), -np.sin(theta), 0]
-            
-            pipe_model["normals"].extend(normal_outer)
-            pipe_model["normals"].extend(normal_inner)
-    
-    # Создаем индексы для треугольников (faces)
-    for i in range(sections):
-        for j in range(segments):
-            # Индексы для внешней поверхности
-            idx00 = 2 * (i * segments + j)
-            idx01 = 2 * (i * segments + (j + 1) % segments)
-            idx10 = 2 * ((i + 1) * segments + j)
-            idx11 = 2 * ((i + 1) * segments + (j + 1) % segments)
-            
-            # Два треугольника для внешней поверхности
-            pipe_model["indices"].extend([idx00, idx10, idx01])
-            pipe_model["indices"].extend([idx01, idx10, idx11])
-            
-            # Индексы для внутренней поверхности
-            idx00_in = idx00 + 1
-            idx01_in = idx01 + 1
-            idx10_in = idx10 + 1
-            idx11_in = idx11 + 1
-            
-            # Два треугольника для внутренней поверхности (обратный порядок)
-            pipe_model["indices"].extend([idx00_in, idx01_in, idx10_in])
-            pipe_model["indices"].extend([idx01_in, idx11_in, idx10_in])
+    # Геометрия цилиндра (трубы) берётся из кэша по её параметрам
+    geometry = get_pipe_geometry(length, radius, wall_thickness, segments, sections)
+    pipe_model["metadata"]["lod"] = geometry["metadata"]["lod"]
+    vertices = geometry["vertices"]
+    pipe_model["vertices"] = vertices.tolist()
+    pipe_model["normals"] = geometry["normals"].tolist()
+    pipe_model["indices"] = geometry["indices"].tolist()
 
     # Добавляем информацию о датчиках и цветах деформации
     if sensor_data is not None:
-        # Получаем последнюю строку данных (или среднее нескольких строк)
-        latest_data = sensor_data.iloc[-1:].mean().to_dict()
+        pipe_model["sensors"] = extract_sensors(sensor_data, length, radius)
         
-        # Определяем типы датчиков
-        sensor_types = {}
-        for column in sensor_data.columns:
-            if column == "Time":
-                continue
-                
-            # T2_K_1 - кольцевая деформация
-            # T2_Up_1 - верхняя часть
-            # T2_R_1 - правая сторона
-            # T2_L_1 - левая сторона
-            # T_2 - температура
-            if "_K_" in column:  # Кольцевая деформация
-                sensor_type = "ring"
-                sensor_num = int(column.split("_")[-1])
-                position = float(sensor_num) / 3.0 * length  # Примерное позиционирование
-                pipe_model["sensors"].append({
-                    "id": column,
-                    "type": sensor_type,
-                    "position": [0, 0, position],
-                    "value": latest_data.get(column, 0)
-                })
-            elif "_Up_" in column:  # Верхняя часть
-                sensor_type = "up"
-                sensor_num = int(column.split("_")[-1])
-                position = float(sensor_num) / 3.0 * length
-                pipe_model["sensors"].append({
-                    "id": column,
-                    "type": sensor_type,
-                    "position": [0, radius, position],
-                    "value": latest_data.get(column, 0)
-                })
-            elif "_R_" in column:  # Правая сторона
-                sensor_type = "right"
-                sensor_num = int(column.split("_")[-1])
-                position = float(sensor_num) / 3.0 * length
-                pipe_model["sensors"].append({
-                    "id": column,
-                    "type": sensor_type,
-                    "position": [radius, 0, position],
-                    "value": latest_data.get(column, 0)
-                })
-            elif "_L_" in column:  # Левая сторона
-                sensor_type = "left"
-                sensor_num = int(column.split("_")[-1])
-                position = float(sensor_num) / 3.0 * length
-                pipe_model["sensors"].append({
-                    "id": column,
-                    "type": sensor_type,
-                    "position": [-radius, 0, position],
-                    "value": latest_data.get(column, 0)
-                })
-        
-        # Функция для определения цвета на основе значения и критического порога
-        def get_color_for_value(value, critical_threshold):
-            ratio = value / critical_threshold
-            
-            if ratio >= 1.0:
-                # Красный для критических значений
-                return [1.0, 0.0, 0.0]
-            elif ratio >= 0.8:
-                # Плавный переход от жёлтого к красному
-                factor = (ratio - 0.8) / 0.2
-                return [1.0, 1.0 * (1 - factor), 0.0]
-            else:
-                # Плавный переход от зелёного к жёлтому
-                factor = ratio / 0.8
-                return [factor, 1.0, 0.0]
-        
-        # Рассчитываем цвета для вершин на основе близости к датчикам и их показаниям
-        all_sensor_values = [sensor["value"] for sensor in pipe_model["sensors"] if sensor["type"] != "temperature"]
-        
-        # Рассчитываем цвета для всех вершин
-        num_vertices = len(pipe_model["vertices"]) // 3
-        
-        for i in range(num_vertices):
-            vertex_x = pipe_model["vertices"][i * 3]
-            vertex_y = pipe_model["vertices"][i * 3 + 1]
-            vertex_z = pipe_model["vertices"][i * 3 + 2]
-            
-            # Находим ближайший датчик и рассчитываем влияние
-            weights = []
-            for sensor in pipe_model["sensors"]:
-                if sensor["type"] == "temperature":
-                    continue
-                
-                sensor_x, sensor_y, sensor_z = sensor["position"]
-                # Рассчитываем расстояние
-                distance = np.sqrt((vertex_x - sensor_x)**2 + (vertex_y - sensor_y)**2 + (vertex_z - sensor_z)**2)
-                # Влияние обратно пропорционально квадрату расстояния
-                weight = 1.0 / (1.0 + distance**2)
-                weights.append((sensor["id"], weight, sensor["value"]))
-            
-            # Нормализуем веса
-            total_weight = sum(w[1] for w in weights)
-            if total_weight > 0:
-                weights = [(sid, w/total_weight, val) for sid, w, val in weights]
-            
-            # Рассчитываем взвешенное значение деформации для вершины
-            weighted_value = sum(val * w for _, w, val in weights) if weights else 0
-            
-            # Конвертируем в цвет на основе нового алгоритма
-            color = get_color_for_value(weighted_value, critical_threshold)
-            
-            pipe_model["colors"].extend(color)
+        # Рассчитываем цвета для всех вершин на основе близости к датчикам и их показаниям
+        colors = compute_vertex_colors(vertices, pipe_model["sensors"], critical_threshold)
+        pipe_model["colors"] = colors.tolist()
     
     return pipe_model
 
@@ -235,23 +352,97 @@ def generate_pipe_model(sensor_data, length=10.0, radius=1.0, wall_thickness=0.1
 def visualization_page():
     return render_template('visualization.html')
 
+# Путь к CSV файлу с данными датчиков
+SENSOR_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'case_2.csv')
+
+# Формат ответа для модели трубы: 'json' (по умолчанию) или 'binary' (см. binary_format.py)
+def _response_format(args):
+    response_format = args.get('format', 'json')
+    if response_format not in ('json', 'binary'):
+        raise ValueError(f"Unsupported format '{response_format}', expected 'json' or 'binary'")
+    return response_format
+
+# Последние показания датчиков
+def _latest_values(sensor_data):
+    return {col: float(sensor_data[col].iloc[-1]) for col in sensor_data.columns if col != "Time"}
+
+# Выбор уровня детализации: явный номер уровня (lod), бюджет треугольников (triangle_budget)
+# или размер области просмотра в пикселях (viewport_px). Возвращает номер уровня или None
+def select_lod_tier(args):
+    if args.get('lod') is not None:
+        tier = int(args.get('lod'))
+        if not 0 <= tier < len(LOD_TIERS):
+            raise ValueError(f"lod must be between 0 and {len(LOD_TIERS) - 1}")
+        return tier
+    
+    if args.get('triangle_budget') is not None:
+        budget = int(args.get('triangle_budget'))
+        fitting = [tier for tier, (segments, sections) in enumerate(LOD_TIERS)
+                   if triangle_count(segments, sections) <= budget]
+        return fitting[-1] if fitting else 0
+    
+    if args.get('viewport_px') is not None:
+        wanted_segments = float(args.get('viewport_px')) / PIXELS_PER_SEGMENT
+        for tier, (segments, _) in enumerate(LOD_TIERS):
+            if segments >= wanted_segments:
+                return tier
+        return len(LOD_TIERS) - 1
+    
+    return None
+
+# Параметры геометрии трубы из запроса. Если задан уровень детализации, segments/sections
+# берутся из него; иначе используются переданные значения, ограниченные самым подробным уровнем
+def _geometry_params(args):
+    tier = select_lod_tier(args)
+    if tier is not None:
+        segments, sections = LOD_TIERS[tier]
+    else:
+        max_segments, max_sections = LOD_TIERS[-1]
+        segments = min(int(args.get('segments', 32)), max_segments)
+        sections = min(int(args.get('sections', 64)), max_sections)
+
+    # Меньше трёх сегментов окружности или ни одного участка по длине - вырожденная сетка
+    if segments < 3:
+        raise ValueError(f"segments must be at least 3, got {segments}")
+    if sections < 1:
+        raise ValueError(f"sections must be at least 1, got {sections}")
+
+    length = float(args.get('length', 10.0))
+    radius = float(args.get('radius', 1.0))
+    wall_thickness = float(args.get('wall_thickness', 0.1))
+    for name, value in (("length", length), ("radius", radius), ("wall_thickness", wall_thickness)):
+        if not np.isfinite(value) or value <= 0:
+            raise ValueError(f"{name} must be a positive finite number, got {value}")
+    if wall_thickness >= radius:
+        raise ValueError(f"wall_thickness must be less than radius, got {wall_thickness} >= {radius}")
+
+    return (
+        round(length, GEOMETRY_DECIMALS),
+        round(radius, GEOMETRY_DECIMALS),
+        round(wall_thickness, GEOMETRY_DECIMALS),
+        segments,
+        sections
+    )
+
+# Предварительное построение геометрии всех уровней детализации для параметров по умолчанию
+@visualization_bp.record_once
+def _warm_lod_geometry(state):
+    for segments, sections in LOD_TIERS:
+        get_pipe_geometry(10.0, 1.0, 0.1, segments, sections)
+
 # Эндпоинт для получения данных модели трубы
 @visualization_bp.route('/pipe-model', methods=['GET'])
 def get_pipe_model():
     try:
         # Получаем параметры из запроса
-        length = float(request.args.get('length', 10.0))
-        radius = float(request.args.get('radius', 1.0))
-        wall_thickness = float(request.args.get('wall_thickness', 0.1))
-        segments = int(request.args.get('segments', 32))
-        sections = int(request.args.get('sections', 64))
+        length, radius, wall_thickness, segments, sections = _geometry_params(request.args)
         critical_threshold = float(request.args.get('critical_threshold', 500))
+        response_format = _response_format(request.args)
         
         time_start = request.args.get('time_start', None)
         time_end = request.args.get('time_end', None)
         
-        # Путь к CSV файлу
-        csv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'case_2.csv')
+        csv_path = SENSOR_CSV_PATH
         
         # Загружаем данные датчиков
         sensor_data = read_sensor_data_from_csv(csv_path, time_start, time_end)
@@ -262,6 +453,30 @@ def get_pipe_model():
                 "message": "Error reading sensor data from CSV"
             }), 500
         
+        if response_format == 'binary':
+            # Бинарный ответ: геометрия и цвета упаковываются в float32/uint32 без списков Python
+            geometry = get_pipe_geometry(length, radius, wall_thickness, segments, sections)
+            sensors = extract_sensors(sensor_data, length, radius)
+            colors = compute_vertex_colors(geometry["vertices"], sensors, critical_threshold)
+            metadata = {**geometry["metadata"]}
+            metadata["parameters"] = {**metadata["parameters"], "critical_threshold": critical_threshold}
+            
+            payload = pack_binary(
+                {
+                    "status": "success",
+                    "metadata": metadata,
+                    "sensors": sensors,
+                    "sensor_data": _latest_values(sensor_data)
+                },
+                [
+                    ("vertices", geometry["vertices"], "float32", 3),
+                    ("normals", geometry["normals"], "float32", 3),
+                    ("colors", colors, "float32", 3),
+                    ("indices", geometry["indices"], "uint32", 1)
+                ]
+            )
+            return Response(payload, mimetype=BINARY_MIMETYPE)
+        
         # Генерируем модель трубы
         pipe_model = generate_pipe_model(
             sensor_data, 
@@ -277,9 +492,15 @@ def get_pipe_model():
         return jsonify({
             "status": "success",
             "model": pipe_model,
-            "sensor_data": {col: float(sensor_data[col].iloc[-1]) for col in sensor_data.columns if col != "Time"}
+            "sensor_data": _latest_values(sensor_data)
         })
         
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid pipe model parameters: {str(e)}"
+        }), 400
+        
     except Exception as e:
         logging.error(f"Error generating pipe model: {str(e)}")
         return jsonify({
@@ -287,6 +508,92 @@ def get_pipe_model():
             "message": f"Error generating pipe model: {str(e)}"
         }), 500
 
+# Эндпоинт для получения только геометрии трубы (вершины, нормали, индексы).
+# Геометрия не меняется между опросами, поэтому отдаётся с ETag и может кэшироваться браузером
+@visualization_bp.route('/pipe-model/geometry', methods=['GET'])
+def get_pipe_model_geometry():
+    try:
+        geometry = get_pipe_geometry(*_geometry_params(request.args))
+        response_format = _response_format(request.args)
+        
+        # У каждого формата свой ETag, т.к. это разные представления одного ресурса
+        etag = geometry["etag"] if response_format == 'json' else f'{geometry["etag"]}-bin'
+        
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(
+                get_geometry_payload(geometry, response_format),
+                mimetype=BINARY_MIMETYPE if response_format == 'binary' else 'application/json'
+            )
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, max-age=86400'
+        return response
+        
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid pipe geometry parameters: {str(e)}"
+        }), 400
+        
+    except Exception as e:
+        logging.error(f"Error generating pipe geometry: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Error generating pipe geometry: {str(e)}"
+        }), 500
+
+# Эндпоинт для получения только цветов вершин и показаний датчиков за период.
+# Используется для обновления уже загруженной геометрии без её повторной передачи
+@visualization_bp.route('/pipe-model/colors', methods=['GET'])
+def get_pipe_model_colors():
+    try:
+        length, radius, wall_thickness, segments, sections = _geometry_params(request.args)
+        critical_threshold = float(request.args.get('critical_threshold', 500))
+        response_format = _response_format(request.args)
+        
+        time_start = request.args.get('time_start', None)
+        time_end = request.args.get('time_end', None)
+        
+        sensor_data = read_sensor_data_from_csv(SENSOR_CSV_PATH, time_start, time_end)
+        
+        if sensor_data is None or sensor_data.empty:
+            return jsonify({
+                "status": "error",
+                "message": "No sensor data for the requested period"
+            }), 404
+        
+        geometry = get_pipe_geometry(length, radius, wall_thickness, segments, sections)
+        sensors = extract_sensors(sensor_data, length, radius)
+        colors = compute_vertex_colors(geometry["vertices"], sensors, critical_threshold)
+        
+        header = {
+            "status": "success",
+            "geometry_etag": geometry["etag"],
+            "critical_threshold": critical_threshold,
+            "sensors": sensors,
+            "sensor_data": _latest_values(sensor_data)
+        }
+        
+        if response_format == 'binary':
+            return Response(pack_binary(header, [("colors", colors, "float32", 3)]), mimetype=BINARY_MIMETYPE)
+        
+        return jsonify({**header, "colors": colors.tolist()})
+        
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid pipe colors parameters: {str(e)}"
+        }), 400
+        
+    except Exception as e:
+        logging.error(f"Error calculating pipe colors: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Error calculating pipe colors: {str(e)}"
+        }), 500
+
 # Эндпоинт для получения всех данных датчиков
 @visualization_bp.route('/sensor-data', methods=['GET'])
 def get_sensor_data():
@@ -294,8 +601,7 @@ def get_sensor_data():
         # Получаем критический порог, если указан
         critical_threshold = float(request.args.get('critical_threshold', 500))
         
-        # Путь к CSV файлу
-        csv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'case_2.csv')
+        csv_path = SENSOR_CSV_PATH
         
         # Загружаем данные датчиков
         sensor_data = read_sensor_data_from_csv(csv_path)
@@ -358,4 +664,13 @@ def get_sensor_data():
         return jsonify({
             "status": "error",
             "message": f"Error getting sensor data: {str(e)}"
-        }), 500 
\ No newline at end of file
+        }), 500
+
+# Эндпоинт для получения статистики кэша разобранных CSV
+@visualization_bp.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        "status": "success",
+        "cache": sensor_frame_cache.stats(),
+        "geometry_cache": geometry_cache.stats()
+    })
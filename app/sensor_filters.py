@@ -0,0 +1,89 @@
+from typing import List, Optional
+import math
+import re
+
+import pandas as pd
+
+# Имена столбцов, которые можно вставить в выражение PostgREST без кавычек
+_PLAIN_COLUMN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def parse_value_bound(value, name: str) -> Optional[float]:
+    """Validates `value_min`/`value_max`: None or a finite number (numeric strings are accepted)."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    try:
+        bound = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if not math.isfinite(bound):
+        raise ValueError(f"{name} must be finite, got {value!r}")
+    return bound
+
+
+def parse_time_bound(value, name: str) -> Optional[pd.Timestamp]:
+    """Validates `time_start`/`time_end` and returns it as a UTC timestamp (None if not set)."""
+    if not value:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a date or an ISO 8601 timestamp, got {value!r}")
+    try:
+        # utc=True: дата без времени и время со смещением сравнимы между собой
+        return pd.to_datetime(value, utc=True)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{name} must be a date or an ISO 8601 timestamp, got {value!r}")
+
+
+def _column(name: str) -> str:
+    if _PLAIN_COLUMN.match(name):
+        return name
+    # Запятые, точки и скобки в имени сломали бы разбор выражения - такие имена берутся в кавычки
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _bound(value: float) -> str:
+    return repr(float(value))
+
+
+def value_filter_expression(column_names, value_min: Optional[float] = None,
+                            value_max: Optional[float] = None) -> Optional[str]:
+    """The body of a single PostgREST `and` filter: rows where every column lies in the range.
+
+    For columns a and b with both bounds this is `a.gte.min,a.lte.max,b.gte.min,b.lte.max`.
+    None without bounds.
+    """
+    if value_min is None and value_max is None:
+        return None
+
+    conditions: List[str] = []
+    for column_name in column_names:
+        column = _column(column_name)
+        if value_min is not None:
+            conditions.append(f"{column}.gte.{_bound(value_min)}")
+        if value_max is not None:
+            conditions.append(f"{column}.lte.{_bound(value_max)}")
+    return ",".join(conditions)
+
+
+def apply_sensor_filters(query, column_names, time_start=None, time_end=None,
+                         value_min: Optional[float] = None, value_max: Optional[float] = None):
+    """Applies the sensor endpoint filters; the data and the count query share it.
+
+    The time range becomes plain `Time` conditions and the value range one `and`
+    filter over the selected columns: a row is returned only if all selected
+    sensors are within [value_min, value_max].
+    """
+    if time_start:
+        query = query.gte('Time', time_start)
+
+    if time_end:
+        query = query.lte('Time', time_end)
+
+    expression = value_filter_expression(column_names, value_min, value_max)
+    if expression:
+        # У построителя postgrest нет and_, параметр добавляется так же, как это делает or_
+        query.params = query.params.add("and", f"({expression})")
+
+    return query
@@ -0,0 +1,233 @@
+from app.config import Config
+from app.db_client import DBClient
+from app.long_storage import long_storage, long_bounds
+from typing import Callable, List, Optional, Tuple
+import threading
+import logging
+import shutil
+import time
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+class TableCache:
+    """Local columnar copy of sensor tables: one Parquet file per table and UTC day.
+
+    Reads walk the range day by day, newest first, until the row limit or the duration
+    is reached. A day with a file is read from it (memory-mapped, only the requested
+    columns); any other day is fetched through `fetch` with just the requested columns
+    and only as many rows as are still needed, so a cold read costs no more than a
+    direct query. A fetched day is written only if it is over and was read completely;
+    today is always fetched. Loads call `invalidate` for the range they touched.
+    Without pyarrow the cache is disabled and `read` returns None.
+    """
+
+    # Время жизни границ таблицы (первое и последнее Time) в памяти процесса
+    BOUNDS_TTL = 60.0
+
+    def __init__(self, directory: str, enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled and pq is not None
+        self._bounds = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.rows_fetched = 0
+
+    def _day_path(self, table_name: str, day: pd.Timestamp) -> str:
+        return os.path.join(self.directory, table_name, f"{day.strftime('%Y-%m-%d')}.parquet")
+
+    def bounds(self, table_name: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """First and last Time of the table, or None for an empty table."""
+        with self._lock:
+            cached = self._bounds.get(table_name)
+            if cached is not None and time.monotonic() - cached[0] < self.BOUNDS_TTL:
+                return cached[1]
+
+        supabase = DBClient().get_supabase()
+        if long_storage():
+            bounds = long_bounds(supabase, table_name)
+        else:
+            first = supabase.table(table_name).select("Time").order('Time').limit(1).execute().data
+            last = supabase.table(table_name).select("Time").order('Time', desc=True).limit(1).execute().data
+            bounds = (first[0]["Time"], last[0]["Time"]) if first and last else None
+        bounds = (_utc(bounds[0]), _utc(bounds[1])) if bounds else None
+
+        with self._lock:
+            self._bounds[table_name] = (time.monotonic(), bounds)
+        return bounds
+
+    def read(self, table_name: str, column_names, limit: int, fetch: Callable[..., list], time_start=None,
+             time_end=None, duration: Optional[pd.Timedelta] = None) -> Optional[pd.DataFrame]:
+        """Returns the newest `limit` rows of the range as a sorted, Time-indexed float frame.
+
+        `fetch` has the signature of `fetch_rows` and reads the days that are not cached.
+        With `duration` reading stops once the rows span that long before the newest one.
+        """
+        if not self.enabled:
+            return None
+
+        columns = list(column_names)
+        bounds = self.bounds(table_name)
+        if bounds is None:
+            return _empty(columns)
+        # Начало таблицы только останавливает обход: без time_start её первый день можно сохранить целиком
+        start = _utc(time_start) if time_start else bounds[0].floor('D')
+        end = _utc(time_end) if time_end else None
+        if end is not None and start > end:
+            return _empty(columns)
+        first_day = max(start, bounds[0]).floor('D')
+
+        frames = []
+        rows = 0
+        newest = None
+        now = pd.Timestamp.now(tz='UTC')
+        # Обход начинается с последнего дня с данными, но верхняя граница сегодняшнего запроса
+        # не обрезается по кэшированному последнему Time - хвост дня всегда читается из базы
+        day = (min(end, bounds[1]) if end is not None else bounds[1]).floor('D')
+        while day >= first_day and rows < limit:
+            lower = max(start, day)
+            if duration is not None and newest is not None:
+                lower = max(lower, newest - duration)
+
+            frame = None
+            if day + pd.Timedelta(days=1) <= now:
+                frame = self._read_file(self._day_path(table_name, day), columns)
+            if frame is not None:
+                with self._lock:
+                    self.hits += 1
+                frame = frame[(frame.index >= lower) & ((frame.index <= end) if end is not None else True)]
+                frame = frame.iloc[-(limit - rows):]
+            else:
+                with self._lock:
+                    self.misses += 1
+                # Окно duration отсчитывается от самой новой строки; пока она не найдена, его соблюдает fetch
+                frame = self._fetch_day(table_name, columns, day, lower, end, limit - rows,
+                                        duration if newest is None else None, fetch, now)
+
+            if len(frame):
+                frames.insert(0, frame)
+                rows += len(frame)
+                if newest is None:
+                    newest = frame.index[-1]
+            if duration is not None and newest is not None and lower <= newest - duration:
+                break
+            day -= pd.Timedelta(days=1)
+
+        return pd.concat(frames) if frames else _empty(columns)
+
+    def _fetch_day(self, table_name: str, columns: List[str], day: pd.Timestamp, lower: pd.Timestamp,
+                   end: Optional[pd.Timestamp], limit: int, duration: Optional[pd.Timedelta],
+                   fetch: Callable[..., list], now: pd.Timestamp) -> pd.DataFrame:
+        # Конец суток с точностью timestamptz: lte по нему - то же, что lt по началу следующих суток
+        day_last = day + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+        ended = day_last < now
+        upper = min(end, day_last) if end is not None else (day_last if ended else None)
+
+        rows = fetch(table_name, columns, limit, lower.isoformat(), upper.isoformat() if upper is not None else None,
+                     duration)
+        with self._lock:
+            self.fetches += 1
+            self.rows_fetched += len(rows)
+        frame = _rows_to_frame(rows, columns)
+
+        # Сутки целиком: запрос покрыл их от начала до конца и закончился раньше лимита и окна duration
+        complete = ended and lower == day and upper == day_last and len(rows) < limit and (
+            duration is None or not rows or pd.Timestamp(rows[-1]["Time"]) > pd.Timestamp(rows[0]["Time"]) - duration
+        )
+        if complete:
+            path = self._day_path(table_name, day)
+            # Столбцы, уже сохранённые в файле дня по другим запросам, сохраняются вместе с новыми
+            stored = self._read_file(path)
+            merged = frame if stored is None else stored.drop(columns=columns, errors='ignore').join(frame, how='outer')
+            self._write_file(path, merged)
+        return frame
+
+    def _read_file(self, path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        if not os.path.exists(path):
+            return None
+        try:
+            if columns is not None and any(column not in pq.read_schema(path).names for column in columns):
+                return None
+            table = pq.read_table(path, columns=["Time", *columns] if columns is not None else None, memory_map=True)
+        except (OSError, pa.ArrowException) as e:
+            logging.warning(f"Could not read cached partition {path}: {e}")
+            return None
+        df = table.to_pandas()
+        df.index = pd.DatetimeIndex(df.pop("Time"))
+        return df
+
+    def _write_file(self, path: str, df: pd.DataFrame):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Запись через временный файл: параллельный читатель не увидит недописанный Parquet
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(pa.Table.from_pandas(df.rename_axis("Time").reset_index(), preserve_index=False), tmp_path)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, table_name: str, start=None, end=None):
+        """Drops the cached days of a table that overlap [start, end], or all of them."""
+        with self._lock:
+            self._bounds.pop(table_name, None)
+        table_directory = os.path.join(self.directory, table_name)
+        if not os.path.isdir(table_directory):
+            return
+        if start is None or end is None:
+            shutil.rmtree(table_directory, ignore_errors=True)
+            return
+        for day in pd.date_range(_utc(start).floor('D'), _utc(end).floor('D')):
+            path = self._day_path(table_name, day)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def stats(self) -> dict:
+        tables = {}
+        if os.path.isdir(self.directory):
+            for table_name in sorted(os.listdir(self.directory)):
+                files = [name for name in os.listdir(os.path.join(self.directory, table_name))
+                         if name.endswith('.parquet')]
+                tables[table_name] = {
+                    "days": len(files),
+                    "bytes": sum(os.path.getsize(os.path.join(self.directory, table_name, name)) for name in files)
+                }
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "pyarrow": pq is not None,
+                "directory": self.directory,
+                "day_hits": self.hits,
+                "day_misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+                "fetches": self.fetches,
+                "rows_fetched": self.rows_fetched,
+                "tables": tables
+            }
+
+
+def _utc(value) -> pd.Timestamp:
+    value = pd.Timestamp(value)
+    return value.tz_localize('UTC') if value.tz is None else value.tz_convert('UTC')
+
+
+def _empty(columns: List[str]) -> pd.DataFrame:
+    return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], tz='UTC'), dtype=float)
+
+
+def _rows_to_frame(rows: list, columns: List[str]) -> pd.DataFrame:
+    if not rows:
+        # Пустой день тоже сохраняется, чтобы пропуски в данных не запрашивались заново
+        return _empty(columns)
+    df = pd.DataFrame.from_records(rows, columns=["Time", *columns])
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("Time"), utc=True))
+    return df.apply(pd.to_numeric, errors='coerce').astype(float).sort_index()
+
+
+table_cache = TableCache(Config.get('TABLE_CACHE_DIR'), Config.get('TABLE_CACHE_ENABLED'))
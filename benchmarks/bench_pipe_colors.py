@@ -0,0 +1,86 @@
+"""Benchmark of pipe vertex coloring: vectorized compute_vertex_colors vs the original loop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipe_colors [segments] [sections]
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.routes.visualization.visualization import build_pipe_geometry, compute_vertex_colors
+
+
+def legacy_vertex_colors(vertices, sensors, critical_threshold):
+    # Исходная реализация: цикл по вершинам и вложенный цикл по датчикам
+    def get_color_for_value(value, critical_threshold):
+        ratio = value / critical_threshold
+        if ratio >= 1.0:
+            return [1.0, 0.0, 0.0]
+        elif ratio >= 0.8:
+            factor = (ratio - 0.8) / 0.2
+            return [1.0, 1.0 * (1 - factor), 0.0]
+        else:
+            factor = ratio / 0.8
+            return [factor, 1.0, 0.0]
+
+    colors = []
+    for i in range(len(vertices) // 3):
+        vertex_x, vertex_y, vertex_z = vertices[i * 3], vertices[i * 3 + 1], vertices[i * 3 + 2]
+        weights = []
+        for sensor in sensors:
+            if sensor["type"] == "temperature":
+                continue
+            sensor_x, sensor_y, sensor_z = sensor["position"]
+            distance = np.sqrt((vertex_x - sensor_x)**2 + (vertex_y - sensor_y)**2 + (vertex_z - sensor_z)**2)
+            weight = 1.0 / (1.0 + distance**2)
+            weights.append((sensor["id"], weight, sensor["value"]))
+        total_weight = sum(w[1] for w in weights)
+        if total_weight > 0:
+            weights = [(sid, w / total_weight, val) for sid, w, val in weights]
+        weighted_value = sum(val * w for _, w, val in weights) if weights else 0
+        colors.extend(get_color_for_value(weighted_value, critical_threshold))
+    return colors
+
+
+def make_sensors(length=10.0, radius=1.0, count=3):
+    rng = np.random.default_rng(0)
+    sensors = []
+    for num in range(1, count + 1):
+        position = float(num) / 3.0 * length
+        for sensor_type, xy in (("ring", [0, 0]), ("up", [0, radius]), ("right", [radius, 0]), ("left", [-radius, 0])):
+            sensors.append({
+                "id": f"T2_{sensor_type}_{num}",
+                "type": sensor_type,
+                "position": xy + [position],
+                "value": float(rng.uniform(0, 600))
+            })
+    return sensors
+
+
+def main():
+    segments = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    sections = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    vertices, _, _ = build_pipe_geometry(10.0, 1.0, 0.1, segments, sections)
+    vertex_list = vertices.tolist()
+    sensors = make_sensors()
+
+    started = time.perf_counter()
+    expected = legacy_vertex_colors(vertex_list, sensors, 500)
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = compute_vertex_colors(vertices, sensors, 500).tolist()
+    vectorized_time = time.perf_counter() - started
+
+    print(f"mesh {segments}x{sections}: {len(vertex_list) // 3} vertices, {len(sensors)} sensors")
+    print(f"legacy loop:  {legacy_time * 1000:.1f} ms")
+    print(f"vectorized:   {vectorized_time * 1000:.1f} ms ({legacy_time / vectorized_time:.0f}x)")
+    difference = np.abs(np.array(actual) - np.array(expected)).max()
+    print(f"max abs difference: {difference:.3g} (identical: {actual == expected})")
+
+
+if __name__ == '__main__':
+    main()
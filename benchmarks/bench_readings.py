@@ -0,0 +1,120 @@
+"""Benchmark of the sensor endpoint's response building: readings by time for data and forecasts.
+
+Compares the original per-cell loops (linear sensor search, DataFrame.iloc per value)
+with the dictionary lookup and column-wise conversion. Run from the repository root:
+
+    python -m benchmarks.bench_readings [sensors] [rows] [horizon]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.forecast.frame import ForecastFrame
+from app.readings import rows_to_readings_by_time
+
+
+def legacy_data_by_time(rows, column_names, sensor_info):
+    # Исходная реализация из get_sensor_data
+    data_by_time = {}
+    for row in rows:
+        time_value = row["Time"]
+        if time_value not in data_by_time:
+            data_by_time[time_value] = []
+
+        for column_name in column_names:
+            if column_name in row:
+                sensor_info_item = next((item for item in sensor_info if item["column_name"] == column_name), None)
+                sensor_type = sensor_info_item["sensor_type"] if sensor_info_item else "unknown"
+                sensor_index = sensor_info_item["sensor_index"] if sensor_info_item else 0
+
+                data_by_time[time_value].append({
+                    "sensor": column_name,
+                    "sensor_type": sensor_type,
+                    "sensor_index": sensor_index,
+                    "value": row[column_name]
+                })
+    return data_by_time
+
+
+def legacy_predictions_by_time(predictions_df, sensor_info):
+    # Исходная реализация: два обращения iloc на каждое значение
+    predictions_by_time = {}
+    for idx, timestamp in enumerate(predictions_df.index):
+        time_str = timestamp.isoformat()
+        if time_str not in predictions_by_time:
+            predictions_by_time[time_str] = []
+
+        for column in predictions_df.columns:
+            if not pd.isna(predictions_df.iloc[idx][column]):
+                sensor_info_item = next((item for item in sensor_info if item["column_name"] == column), None)
+                sensor_type = sensor_info_item["sensor_type"] if sensor_info_item else "unknown"
+                sensor_index = sensor_info_item["sensor_index"] if sensor_info_item else 0
+
+                predictions_by_time[time_str].append({
+                    "sensor": column,
+                    "sensor_type": sensor_type,
+                    "sensor_index": sensor_index,
+                    "value": float(predictions_df.iloc[idx][column])
+                })
+    return predictions_by_time
+
+
+def make_inputs(sensors, rows, horizon):
+    types = ('Up', 'K', 'L', 'R')
+    sensor_info = [
+        {"column_name": f"{types[i % 4]}_{i}", "sensor_type": types[i % 4], "sensor_index": i}
+        for i in range(sensors)
+    ]
+    column_names = [item["column_name"] for item in sensor_info]
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(rows, sensors)).tolist()
+    times = pd.date_range('2024-01-01', periods=rows, freq='10s')
+    data_rows = [
+        {"Time": timestamp.isoformat(), **dict(zip(column_names, row))}
+        for timestamp, row in zip(times, values)
+    ]
+
+    index = pd.date_range(times[-1], periods=horizon + 1, freq='10s')[1:]
+    bands = {column: rng.normal(size=(3, horizon)) for column in column_names}
+    return column_names, sensor_info, data_rows, ForecastFrame(index, bands, 0.05)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    sensors = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    horizon = int(sys.argv[3]) if len(sys.argv) > 3 else 360
+
+    column_names, sensor_info, data_rows, forecast = make_inputs(sensors, rows, horizon)
+    print(f"{sensors} sensors x {rows} rows, forecast horizon {horizon}")
+
+    expected, legacy_time = timed(legacy_data_by_time, data_rows, column_names, sensor_info)
+    actual, new_time = timed(rows_to_readings_by_time, data_rows, column_names, sensor_info)
+    print(f"data:        legacy {legacy_time * 1000:8.1f} ms, lookup {new_time * 1000:8.1f} ms "
+          f"({legacy_time / new_time:.0f}x), identical: {actual == expected}")
+
+    expected, legacy_time = timed(legacy_predictions_by_time, forecast.mean(), sensor_info)
+    actual, new_time = timed(forecast.readings_by_time, sensor_info)
+    # Новый формат дополнительно содержит границы интервала - сравниваются только значения
+    stripped = {
+        time_str: sorted((r["sensor"], r["sensor_type"], r["sensor_index"], r["value"]) for r in readings)
+        for time_str, readings in actual.items()
+    }
+    reference = {
+        time_str: sorted((r["sensor"], r["sensor_type"], r["sensor_index"], r["value"]) for r in readings)
+        for time_str, readings in expected.items()
+    }
+    print(f"predictions: legacy {legacy_time * 1000:8.1f} ms, columnar {new_time * 1000:8.1f} ms "
+          f"({legacy_time / new_time:.0f}x), identical values: {stripped == reference}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Accuracy and latency of the forecasting engines: batched NumPy AR vs SARIMAX.
+
+Every sensor gets a synthetic ARIMA series generated with its order from
+data/orders.json; the last `length` points are held out and compared with the
+forecast of each engine. Run from the repository root:
+
+    python -m benchmarks.compare_forecast_engines [sensors] [points] [length]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.forecast.ar import ar_forecasts
+from app.forecast.model_cache import fit_sarimax
+from app.forecast.parallel import forecast_bands
+from app.forecast.orders import order_registry
+
+ALPHA = 0.05
+
+
+def simulate_arima(rng, order, points):
+    p, d, q = order
+    phi = rng.uniform(-0.6, 0.6, size=p)
+    theta = rng.uniform(-0.5, 0.5, size=q)
+    noise = rng.normal(size=points + 100)
+
+    values = np.zeros(points + 100)
+    for t in range(max(p, q), len(values)):
+        values[t] = noise[t] + phi @ values[t - p:t][::-1] + theta @ noise[t - q:t][::-1]
+    values = values[100:]
+
+    for _ in range(d):
+        values = np.cumsum(values)
+    return values
+
+
+def make_series(sensors, points):
+    orders = {key: order for key, (_, order) in order_registry.match(order_registry.keys()).items()}
+    keys = [key for key in orders if not key.startswith('dummy_')] or list(orders)
+
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2024-01-01', periods=points, freq='10s')
+    series_by_column = {}
+    for number in range(sensors):
+        key = keys[number % len(keys)]
+        values = simulate_arima(rng, orders[key], points)
+        series_by_column[f"{key}_{number}"] = (key, orders[key], pd.Series(values, index=index))
+    return series_by_column
+
+
+def errors_against(holdout, forecasts):
+    # forecasts[column] - массив (3, length): среднее, нижняя и верхняя граница
+    mae = [np.abs(forecasts[column][0] - holdout[column]).mean() for column in forecasts]
+    rmse = [np.sqrt(((forecasts[column][0] - holdout[column]) ** 2).mean()) for column in forecasts]
+    coverage = [
+        ((forecasts[column][1] <= holdout[column]) & (holdout[column] <= forecasts[column][2])).mean()
+        for column in forecasts
+    ]
+    return float(np.mean(mae)), float(np.mean(rmse)), float(np.mean(coverage))
+
+
+def main():
+    sensors = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    points = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    length = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    full = make_series(sensors, points + length)
+    train = {column: (key, order, series.iloc[:-length]) for column, (key, order, series) in full.items()}
+    holdout = {column: series.iloc[-length:].to_numpy() for column, (_, _, series) in full.items()}
+
+    started = time.perf_counter()
+    ar, ar_errors = ar_forecasts(train, length, ALPHA)
+    ar_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sarimax = {}
+    for column, (_, order, series) in train.items():
+        sarimax[column] = forecast_bands(fit_sarimax(series.to_numpy(), order), length, ALPHA)
+    sarimax_time = time.perf_counter() - started
+
+    print(f"{sensors} sensors x {points} points, horizon {length}")
+    print(f"{'engine':<10}{'time, ms':>12}{'MAE':>10}{'RMSE':>10}{f'{1 - ALPHA:.0%} cover':>12}")
+    for name, elapsed, forecasts in (("sarimax", sarimax_time, sarimax), ("ar", ar_time, ar)):
+        mae, rmse, coverage = errors_against(holdout, forecasts)
+        print(f"{name:<10}{elapsed * 1000:>12.1f}{mae:>10.3f}{rmse:>10.3f}{coverage:>12.2f}")
+    print(f"speedup: {sarimax_time / ar_time:.0f}x")
+    if ar_errors:
+        print(f"ar errors: {ar_errors}")
+
+    difference = np.mean([np.abs(ar[column][0] - sarimax[column][0]).mean() for column in ar])
+    print(f"mean abs difference ar vs sarimax: {difference:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+-- Rollup merge (ROLLUPS_ENABLED): run once in the Supabase SQL editor.
+--
+-- merge_sensor_rollups upserts a batch of rollup buckets into {table}_rollup_{level}
+-- in one INSERT ... ON CONFLICT statement, so a failed batch changes nothing and
+-- concurrent loads into the same table add up instead of overwriting each other.
+-- The unique key on "Time" the upsert needs is created on first use.
+
+CREATE OR REPLACE FUNCTION merge_sensor_rollups(table_name TEXT, sensor_columns TEXT[], rows JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    key_name TEXT := table_name || '_time_key';
+    insert_columns TEXT;
+    updates TEXT;
+    merged INTEGER;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = key_name
+    ) THEN
+        EXECUTE format('CREATE UNIQUE INDEX IF NOT EXISTS %I ON %I ("Time")', key_name, table_name);
+    END IF;
+
+    SELECT string_agg(format('%I, %I, %I, %I, %I',
+                             c || '_min', c || '_max', c || '_mean', c || '_last', c || '_count'), ', ')
+      INTO insert_columns
+      FROM unnest(sensor_columns) AS c;
+
+    -- min/max/count складываются, среднее взвешивается по count, last берётся из более свежей части
+    SELECT string_agg(format(
+               '%1$I = LEAST(t.%1$I, EXCLUDED.%1$I), '
+               '%2$I = GREATEST(t.%2$I, EXCLUDED.%2$I), '
+               '%3$I = (COALESCE(t.%3$I * t.%5$I, 0) + COALESCE(EXCLUDED.%3$I * EXCLUDED.%5$I, 0)) '
+               '       / NULLIF(COALESCE(t.%5$I, 0) + COALESCE(EXCLUDED.%5$I, 0), 0), '
+               '%4$I = CASE WHEN EXCLUDED.%4$I IS NOT NULL AND (t.%4$I IS NULL OR EXCLUDED."Last_time" >= t."Last_time") '
+               '            THEN EXCLUDED.%4$I ELSE t.%4$I END, '
+               '%5$I = COALESCE(t.%5$I, 0) + COALESCE(EXCLUDED.%5$I, 0)',
+               c || '_min', c || '_max', c || '_mean', c || '_last', c || '_count'), ', ')
+      INTO updates
+      FROM unnest(sensor_columns) AS c;
+
+    EXECUTE format(
+        'INSERT INTO %1$I AS t ("Time", "Last_time", %2$s) '
+        'SELECT "Time", "Last_time", %2$s FROM jsonb_populate_recordset(NULL::%1$I, $1) '
+        'ON CONFLICT ("Time") DO UPDATE SET "Last_time" = GREATEST(t."Last_time", EXCLUDED."Last_time"), %3$s',
+        table_name, insert_columns, updates
+    ) USING rows;
+
+    GET DIAGNOSTICS merged = ROW_COUNT;
+    RETURN merged;
+END;
+$$;
+
+-- Полнота агрегатов по таблицам. Загрузка увеличивает loads_running в начале и уменьшает в конце;
+-- failed остаётся выставленным, если агрегаты хотя бы одной загрузки не записались, до пересоздания
+-- таблицы. Агрегированные таблицы читаются, только если loads_running = 0 и failed = FALSE.
+CREATE TABLE IF NOT EXISTS sensor_rollup_status (
+    table_name    TEXT PRIMARY KEY,
+    loads_running INTEGER NOT NULL DEFAULT 0,
+    failed        BOOLEAN NOT NULL DEFAULT FALSE,
+    error         TEXT,
+    updated_at    TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+-- p_reset: таблица создана заново, прежние ошибки к ней больше не относятся.
+-- Дозагрузка в таблицу без записи о полноте (агрегаты старше этой таблицы) помечает их неполными.
+CREATE OR REPLACE FUNCTION begin_rollup_load(p_table_name TEXT, p_reset BOOLEAN DEFAULT FALSE)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO sensor_rollup_status AS s (table_name, loads_running, failed, error)
+    VALUES (p_table_name, 1, NOT p_reset,
+            CASE WHEN p_reset THEN NULL ELSE 'Rollups were built before completeness tracking' END)
+    ON CONFLICT (table_name) DO UPDATE SET
+        loads_running = CASE WHEN p_reset THEN 1 ELSE s.loads_running + 1 END,
+        failed = s.failed AND NOT p_reset,
+        error = CASE WHEN p_reset THEN NULL ELSE s.error END,
+        updated_at = now()
+$$;
+
+CREATE OR REPLACE FUNCTION end_rollup_load(p_table_name TEXT, p_error TEXT DEFAULT NULL)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE sensor_rollup_status
+       SET loads_running = GREATEST(loads_running - 1, 0),
+           failed = failed OR p_error IS NOT NULL,
+           error = COALESCE(p_error, error),
+           updated_at = now()
+     WHERE table_name = p_table_name
+$$;
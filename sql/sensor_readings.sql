@@ -0,0 +1,66 @@
+-- Long-format sensor storage (STORAGE_MODE=long): one row per sensor reading.
+-- Run once in the Supabase SQL editor before switching STORAGE_MODE.
+
+CREATE TABLE IF NOT EXISTS sensor_readings (
+    table_id  TEXT NOT NULL,
+    sensor_id TEXT NOT NULL,
+    time      TIMESTAMP WITH TIME ZONE NOT NULL,
+    value     DOUBLE PRECISION,
+    -- Ведущие (sensor_id, time): выборка нескольких датчиков за длинный период читает только их строки
+    PRIMARY KEY (sensor_id, time, table_id)
+);
+
+-- Границы загрузки и постраничный вывод по таблице без фильтра по датчикам
+CREATE INDEX IF NOT EXISTS sensor_readings_table_time_idx ON sensor_readings (table_id, time);
+
+-- Постраничный вывод /sensor/{table_name}: страницы и total_count считаются по различным
+-- отметкам времени, а не по показаниям, поэтому показания одной отметки не делятся между страницами.
+-- С границами значений отметка попадает в выборку, только если в диапазоне показания всех
+-- выбранных датчиков - как фильтр `and` по строкам широкой таблицы.
+CREATE OR REPLACE FUNCTION sensor_reading_times(
+    p_table_id   TEXT,
+    p_sensor_ids TEXT[],
+    p_time_start TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_time_end   TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_value_min  DOUBLE PRECISION DEFAULT NULL,
+    p_value_max  DOUBLE PRECISION DEFAULT NULL,
+    p_before     TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_offset     INTEGER DEFAULT 0,
+    p_limit      INTEGER DEFAULT NULL
+)
+RETURNS TABLE (time TIMESTAMP WITH TIME ZONE)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT r.time
+      FROM sensor_readings r
+     WHERE r.table_id = p_table_id
+       AND r.sensor_id = ANY (p_sensor_ids)
+       AND (p_time_start IS NULL OR r.time >= p_time_start)
+       AND (p_time_end IS NULL OR r.time <= p_time_end)
+       AND (p_before IS NULL OR r.time < p_before)
+       AND (p_value_min IS NULL OR r.value >= p_value_min)
+       AND (p_value_max IS NULL OR r.value <= p_value_max)
+     GROUP BY r.time
+    HAVING (p_value_min IS NULL AND p_value_max IS NULL)
+        OR count(DISTINCT r.sensor_id) = cardinality(p_sensor_ids)
+     ORDER BY r.time DESC
+    OFFSET p_offset
+     LIMIT p_limit
+$$;
+
+CREATE OR REPLACE FUNCTION sensor_reading_time_count(
+    p_table_id   TEXT,
+    p_sensor_ids TEXT[],
+    p_time_start TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_time_end   TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_value_min  DOUBLE PRECISION DEFAULT NULL,
+    p_value_max  DOUBLE PRECISION DEFAULT NULL
+)
+RETURNS BIGINT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT count(*)
+      FROM sensor_reading_times(p_table_id, p_sensor_ids, p_time_start, p_time_end, p_value_min, p_value_max)
+$$;
@@ -0,0 +1,43 @@
+import struct
+
+import numpy as np
+
+from app.routes.visualization import visualization
+from app.routes.visualization.binary_format import pack_binary, unpack_binary
+
+
+def test_pipe_geometry_round_trip():
+    geometry = visualization._build_pipe_geometry(10.0, 0.5, 0.05, 16, 4)
+
+    payload = visualization.get_geometry_payload(geometry, 'binary')
+    header, arrays = unpack_binary(payload)
+
+    header_length = struct.unpack_from('<I', payload, 0)[0]
+    assert header_length % 4 == 0
+    assert header["status"] == "success"
+    assert header["metadata"] == geometry["metadata"]
+
+    offset = 0
+    for descriptor, name, dtype, item_size in zip(header["buffers"], ("vertices", "normals", "indices"),
+                                                  ("float32", "float32", "uint32"), (3, 3, 1)):
+        assert (descriptor["name"], descriptor["dtype"], descriptor["item_size"]) == (name, dtype, item_size)
+        # Буферы идут подряд, каждый выровнен на 4 байта
+        assert descriptor["offset"] == offset and offset % 4 == 0
+        assert descriptor["length"] == geometry[name].size
+        offset += descriptor["length"] * 4
+    assert len(payload) == 4 + header_length + offset
+
+    np.testing.assert_array_equal(arrays["vertices"], geometry["vertices"].astype(np.float32))
+    np.testing.assert_array_equal(arrays["normals"], geometry["normals"].astype(np.float32))
+    np.testing.assert_array_equal(arrays["indices"], geometry["indices"].astype(np.uint32))
+    assert arrays["vertices"].dtype == np.dtype('<f4') and arrays["indices"].dtype == np.dtype('<u4')
+
+
+def test_header_is_padded_to_four_bytes():
+    for name_length in range(1, 6):
+        payload = pack_binary({"name": "x" * name_length}, [("values", np.arange(3), "uint32", 1)])
+        header, arrays = unpack_binary(payload)
+
+        assert struct.unpack_from('<I', payload, 0)[0] % 4 == 0
+        assert header["name"] == "x" * name_length
+        np.testing.assert_array_equal(arrays["values"], [0, 1, 2])
@@ -0,0 +1,45 @@
+import io
+import os
+import tempfile
+
+import pytest
+from flask import Flask
+
+from app.routes.data.data import data_bp
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    app = Flask(__name__)
+    app.register_blueprint(data_bp)
+    return app.test_client()
+
+
+def upload(client, content: bytes, **form):
+    data = {"file": (io.BytesIO(content), "readings.csv"), "async": "false", **form}
+    return client.post('/api/v1/data/create_and_load', data=data, content_type='multipart/form-data')
+
+
+@pytest.mark.parametrize("field, value", [
+    ("chunk_size", "abc"), ("batch_size", "1.5"), ("workers", ""), ("workers", "0"), ("chunk_size", "-10")
+])
+def test_invalid_sizes_return_422(client, tmp_path, field, value):
+    response = upload(client, b"Time;Up_1\n2024-01-01T00:00:00;1,5\n", **{field: value})
+
+    assert response.status_code == 422
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_file_is_removed_when_validation_fails(client, tmp_path):
+    response = upload(client, b"Stamp;Up_1\n2024-01-01T00:00:00;1,5\n")
+
+    assert response.status_code == 400
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_file_is_removed_when_headers_cannot_be_read(client, tmp_path):
+    response = upload(client, b"\xff\xfe\xfa;Up_1\n")
+
+    assert response.status_code == 500
+    assert os.listdir(tmp_path) == []
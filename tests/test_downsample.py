@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from app.downsample import lttb_indices, bucket_aggregates, downsample_readings
+
+
+def reference_lttb(x, y, threshold):
+    # Построчная реализация алгоритма для сравнения с пакетной
+    n = len(x)
+    edges = np.arange(threshold - 1) * (n - 2) // (threshold - 2) + 1
+    selected = [0]
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < threshold - 2:
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+            next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        a = selected[-1]
+        areas = [abs((x[a] - next_x) * (y[i] - y[a]) - (x[a] - x[i]) * (next_y - y[a])) for i in range(start, end)]
+        selected.append(start + int(np.argmax(areas)))
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 1.5, size=1000))
+    Y = np.cumsum(rng.normal(size=(3, 1000)), axis=1)
+
+    result = lttb_indices(x, Y, 50)
+
+    assert result.shape == (3, 50)
+    for row in range(3):
+        np.testing.assert_array_equal(result[row], reference_lttb(x, Y[row], 50))
+
+
+def test_lttb_keeps_short_series():
+    x = np.arange(10.0)
+    result = lttb_indices(x, np.ones((2, 10)), 20)
+    np.testing.assert_array_equal(result, np.tile(np.arange(10), (2, 1)))
+
+
+def test_bucket_aggregates_match_groupby():
+    rng = np.random.default_rng(1)
+    x = np.sort(rng.uniform(0, 100, size=500))
+    values = rng.normal(size=(2, 500))
+    values[1, 100:200] = np.nan
+    valid = ~np.isnan(values)
+
+    aggregates = bucket_aggregates(x, 10, values, values, np.where(valid, values, 0.0), valid.astype(int))
+
+    ids = np.minimum(((x - x[0]) / (x[-1] - x[0]) * 10).astype(int), 9)
+    for row in range(2):
+        grouped = pd.Series(values[row]).groupby(ids)
+        np.testing.assert_allclose(aggregates["min"][row], grouped.min().to_numpy())
+        np.testing.assert_allclose(aggregates["max"][row], grouped.max().to_numpy())
+        np.testing.assert_allclose(aggregates["mean"][row], grouped.mean().to_numpy())
+        np.testing.assert_array_equal(aggregates["count"][row], grouped.count().to_numpy())
+
+
+def test_minmax_readings_report_bucket_bands():
+    index = pd.date_range('2024-01-01', periods=100, freq='10s', tz='UTC')
+    df = pd.DataFrame({"Up_1": np.arange(100.0)}, index=index)
+
+    by_time = downsample_readings(df, "minmax", 4, [{"column_name": "Up_1", "sensor_type": "Up", "sensor_index": 1}])
+
+    readings = [reading for readings in by_time.values() for reading in readings]
+    assert len(readings) == 4
+    assert sum(reading["count"] for reading in readings) == 100
+    assert readings[0]["min"] == 0.0 and readings[-1]["max"] == 99.0
+    assert all(reading["min"] <= reading["value"] <= reading["max"] for reading in readings)
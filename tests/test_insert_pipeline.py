@@ -0,0 +1,123 @@
+import threading
+
+from app import insert_pipeline
+from app.insert_pipeline import InsertPipeline
+
+
+class StubTable:
+    """PostgREST-compatible stub: each batch fails `failures` times before it is stored (-1: always)."""
+
+    def __init__(self, failures=0, gate=None):
+        self.failures = failures
+        self.gate = gate
+        self.attempts = {}
+        self.stored = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return StubInsert(self)
+
+
+class StubInsert:
+    def __init__(self, stub):
+        self.stub = stub
+
+    def insert(self, batch):
+        self.batch = batch
+        return self
+
+    def execute(self):
+        stub = self.stub
+        key = self.batch[0]["id"]
+        with stub._lock:
+            stub.running += 1
+            stub.max_running = max(stub.max_running, stub.running)
+            attempt = stub.attempts[key] = stub.attempts.get(key, 0) + 1
+        try:
+            if stub.gate is not None:
+                stub.gate.wait(5)
+            if stub.failures < 0 or attempt <= stub.failures:
+                raise RuntimeError(f"insert failed on attempt {attempt}")
+            with stub._lock:
+                stub.stored.extend(self.batch)
+            return self
+        finally:
+            with stub._lock:
+                stub.running -= 1
+
+
+def records(count):
+    return [{"id": i, "value": float(i)} for i in range(count)]
+
+
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(insert_pipeline.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_batches_are_retried_with_backoff_until_stored(monkeypatch):
+    sleeps = no_sleep(monkeypatch)
+    stub = StubTable(failures=2)
+    progress = []
+    pipeline = InsertPipeline('t', batch_size=10, max_workers=1, max_retries=3, retry_backoff=0.5,
+                              supabase=stub, progress=progress.append)
+
+    pipeline.submit(records(25))
+    summary = pipeline.close()
+
+    assert sorted(row["id"] for row in stub.stored) == list(range(25))
+    assert summary["rows_inserted"] == 25
+    assert summary["rows_failed"] == 0 and summary["failed_batches"] == []
+    assert [batch["offset"] for batch in summary["batches"]] == [0, 10, 20]
+    assert [batch["rows"] for batch in summary["batches"]] == [10, 10, 5]
+    assert all(batch["attempts"] == 3 for batch in summary["batches"])
+    # Две неудачи на пакет: пауза 0.5 с, затем вдвое больше
+    assert sleeps == [0.5, 1.0] * 3
+    assert progress == [10, 20, 25]
+    latency = summary["latency_ms"]
+    assert latency["min"] <= latency["avg"] <= latency["max"] and latency["min"] <= latency["p95"] <= latency["max"]
+
+
+def test_batches_that_keep_failing_are_reported(monkeypatch):
+    sleeps = no_sleep(monkeypatch)
+    stub = StubTable(failures=-1)
+    pipeline = InsertPipeline('t', batch_size=10, max_workers=2, max_retries=2, retry_backoff=0.1, supabase=stub)
+
+    pipeline.submit(records(30))
+    summary = pipeline.close()
+
+    assert stub.stored == []
+    assert summary["rows_inserted"] == 0
+    assert summary["rows_failed"] == 30
+    assert [batch["offset"] for batch in summary["failed_batches"]] == [0, 10, 20]
+    assert all(batch["attempts"] == 3 for batch in summary["failed_batches"])
+    assert all("attempt 3" in batch["error"] for batch in summary["failed_batches"])
+    assert summary["rows_per_second"] == 0
+    assert sorted(sleeps) == [0.1] * 3 + [0.2] * 3
+
+
+def test_in_flight_batches_are_bounded():
+    gate = threading.Event()
+    stub = StubTable(gate=gate)
+    pipeline = InsertPipeline('t', batch_size=1, max_workers=2, max_retries=0, supabase=stub)
+    queued = []
+    submit = pipeline._executor.submit
+    pipeline._executor.submit = lambda *args: queued.append(args) or submit(*args)
+
+    producer = threading.Thread(target=pipeline.submit, args=(records(20),))
+    producer.start()
+    producer.join(0.3)
+
+    # Пока вставка стоит, читатель CSV заблокирован: в работе не больше 2 пакетов на поток
+    assert producer.is_alive()
+    assert len(queued) == 4
+    assert stub.max_running == 2
+
+    gate.set()
+    producer.join(5)
+    summary = pipeline.close()
+    assert summary["rows_inserted"] == 20
+    assert stub.max_running <= 2
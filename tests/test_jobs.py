@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+from app.jobs import Job, JobQueue
+
+
+def finished_job(minutes_ago):
+    job = Job('test')
+    job.state = Job.FINISHED
+    job.finished_at = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return job
+
+
+def test_prune_skips_jobs_that_are_still_finishing(monkeypatch):
+    queue = JobQueue()
+    old, recent = finished_job(10), finished_job(1)
+    # Состояние уже итоговое, а время окончания ещё не записано
+    finishing = Job('test')
+    finishing.state = Job.FAILED
+    monkeypatch.setattr(queue, '_jobs', {job.id: job for job in (old, finishing, recent)})
+    monkeypatch.setattr(queue, '_max_history', 1)
+
+    queue._prune()
+
+    assert set(queue._jobs) == {finishing.id, recent.id}
+
+
+def test_run_records_finish_time_with_the_final_state(monkeypatch):
+    queue = JobQueue()
+    monkeypatch.setattr(queue, '_jobs', {})
+
+    def work(job):
+        return 42
+
+    job = Job('test')
+    queue._run(job, work, (), {})
+    failed = Job('test')
+    queue._run(failed, lambda job: 1 / 0, (), {})
+
+    assert (job.state, job.result) == (Job.FINISHED, 42)
+    assert failed.state == Job.FAILED and failed.errors
+    assert job.finished_at is not None and failed.finished_at is not None
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from app.config import Config
+from app.forecast import service
+from app.long_storage import LONG_TABLE, long_count, long_page
+from app.rollups import ROLLUP_STATUS_TABLE, aggregate_readings, rollup_table_name
+from app.routes.analyze import analyze
+
+
+class FakeQuery:
+    """Just enough of the postgrest builder for long_query and the reading fetch of long_page."""
+
+    def __init__(self, df):
+        self.df = df
+        self.orders = []
+        self.start, self.end = 0, len(df)
+
+    def select(self, columns, count=None, head=None):
+        return self
+
+    def eq(self, column, value):
+        self.df = self.df[self.df[column] == value]
+        return self
+
+    def in_(self, column, values):
+        self.df = self.df[self.df[column].isin(values)]
+        return self
+
+    def gte(self, column, value):
+        self.df = self.df[self.df[column] >= _value(column, value)]
+        return self
+
+    def lte(self, column, value):
+        self.df = self.df[self.df[column] <= _value(column, value)]
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, not desc))
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        rows = self.df
+        if self.orders:
+            columns, ascending = zip(*self.orders)
+            rows = rows.sort_values(list(columns), ascending=list(ascending))
+        rows = rows.iloc[self.start:self.end + 1]
+        times = {column: rows[column].map(lambda value: value.isoformat())
+                 for column in rows.columns if pd.api.types.is_datetime64_any_dtype(rows[column])}
+        self.data = rows.assign(**times).to_dict('records')
+        return self
+
+
+class FakeClient:
+    """Readings table plus Python versions of the functions in sql/sensor_readings.sql.
+
+    `wide_tables` are served as they are, like the rollup tables of a long-format table.
+    """
+
+    def __init__(self, df, wide_tables=None):
+        self.df = df
+        self.wide_tables = wide_tables or {}
+
+    def get_supabase(self):
+        return self
+
+    def table(self, table_name):
+        if table_name == LONG_TABLE:
+            return FakeQuery(self.df)
+        return FakeQuery(self.wide_tables[table_name]) if table_name in self.wide_tables else MissingTable()
+
+    def rpc(self, name, params):
+        df = self.df[(self.df["table_id"] == params["p_table_id"]) & self.df["sensor_id"].isin(params["p_sensor_ids"])]
+        if params["p_value_min"] is not None:
+            df = df[df["value"] >= params["p_value_min"]]
+        if params["p_value_max"] is not None:
+            df = df[df["value"] <= params["p_value_max"]]
+        sensors = df.groupby("time")["sensor_id"].nunique().sort_index(ascending=False)
+        if params["p_value_min"] is not None or params["p_value_max"] is not None:
+            sensors = sensors[sensors == len(params["p_sensor_ids"])]
+        times = sensors.index
+        if params.get("p_before"):
+            times = times[times < pd.Timestamp(params["p_before"])]
+
+        if name == 'sensor_reading_time_count':
+            return FakeResult(len(times))
+        offset, limit = params["p_offset"], params["p_limit"]
+        return FakeResult([{"time": value.isoformat()} for value in times[offset:offset + limit]])
+
+
+class MissingTable:
+    """A query on a table that does not exist: builds like any other and fails when executed."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        raise Exception("relation does not exist")
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+def _value(column, value):
+    return pd.to_datetime(value, utc=True) if column.lower() == 'time' else value
+
+
+def readings():
+    times = pd.date_range('2024-01-01', periods=50, freq='10s', tz='UTC')
+    values = np.random.default_rng(0).uniform(0, 10, size=(len(times), 3))
+    wide = pd.DataFrame(values, index=times, columns=["Up_1", "K_1", "L_1"]).rename_axis("time")
+    long = wide.reset_index().melt(id_vars="time", var_name="sensor_id", value_name="value")
+    return wide, long.assign(table_id='t')
+
+
+def test_offset_pages_cover_each_timestamp_once():
+    wide, long = readings()
+    client = FakeClient(long)
+    columns = ["Up_1", "K_1", "L_1"]
+
+    pages = [long_page(client, 't', columns, page=page, page_size=7)[0] for page in range(1, 9)]
+
+    assert [len(rows) for rows in pages] == [7] * 7 + [1]
+    assert all(len(row) == 4 for rows in pages for row in rows)
+    times = [pd.Timestamp(row["Time"]) for rows in pages for row in rows]
+    assert times == list(wide.index[::-1])
+    assert long_count(client, 't', columns) == 50
+
+
+def test_value_filters_need_every_sensor_in_range():
+    wide, long = readings()
+    client = FakeClient(long)
+    columns = ["Up_1", "K_1"]
+    expected = wide[(wide[columns] >= 2).all(axis=1) & (wide[columns] <= 8).all(axis=1)].index[::-1]
+
+    rows, has_more = long_page(client, 't', columns, value_min=2, value_max=8, page_size=5, keyset=True)
+    cursor_rows = []
+    while rows:
+        cursor_rows.extend(rows)
+        if not has_more:
+            break
+        rows, has_more = long_page(client, 't', columns, value_min=2, value_max=8, page_size=5,
+                                   cursor=rows[-1]["Time"], keyset=True)
+
+    assert [pd.Timestamp(row["Time"]) for row in cursor_rows] == list(expected)
+    assert all(2 <= row[column] <= 8 for row in cursor_rows for column in columns)
+    assert long_count(client, 't', columns, value_min=2, value_max=8) == len(expected)
+
+
+@pytest.mark.parametrize("status, source", [
+    ({"loads_running": 0, "failed": False}, 't_rollup_1m'),
+    ({"loads_running": 1, "failed": False}, 't'),
+    ({"loads_running": 0, "failed": True}, 't'),
+    (None, 't')
+])
+def test_aggregation_reads_wide_rollups_in_long_mode(monkeypatch, status, source):
+    wide, long = readings()
+    rollup = aggregate_readings(wide.rename_axis("Time"), '1m').rename_axis("Time").reset_index()
+    statuses = pd.DataFrame([{"table_name": 't', **status}] if status else [],
+                            columns=["table_name", "loads_running", "failed"])
+    client = FakeClient(long, {rollup_table_name('t', '1m'): rollup, ROLLUP_STATUS_TABLE: statuses})
+    monkeypatch.setattr(Config, 'STORAGE_MODE', 'long')
+    monkeypatch.setattr(Config, 'ROLLUPS_ENABLED', True)
+    monkeypatch.setattr(analyze, 'DBClient', lambda: client)
+    monkeypatch.setattr(service, 'DBClient', lambda: client)
+    app = Flask(__name__)
+    app.register_blueprint(analyze.analyze_bp)
+
+    response = app.test_client().post('/api/v1/analyze/sensor/t', json={
+        "filters": {"sensors": [{"Up": 1}, {"K": 1}], "time_start": "2024-01-01", "time_end": "2024-01-01T00:10:00"},
+        "aggregation": "minmax", "points": 5, "resolution": 60
+    })
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["aggregation"]["source"] == source
+    # Неполные агрегаты заменяются исходными показаниями
+    assert body["aggregation"]["rows"] == (len(rollup) if source != 't' else 50)
+    assert body["data"]
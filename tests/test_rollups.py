@@ -0,0 +1,174 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import ingest
+from app.config import Config
+from app.insert_pipeline import InsertPipeline
+from app.rollups import AGGREGATES, RollupBuilder, aggregate_readings, merge_rollups, rollup_table_name
+
+
+def readings(start, periods, seed):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=periods, freq='10s', tz='UTC')
+    values = rng.normal(size=(periods, 2))
+    values[5:40, 1] = np.nan
+    return pd.DataFrame(values, index=index, columns=["Up_1", "K_1"])
+
+
+def assert_rollups_equal(actual, expected):
+    columns = [f"{column}_{aggregate}" for column in ("Up_1", "K_1") for aggregate in AGGREGATES]
+    pd.testing.assert_frame_equal(actual[columns], expected[columns], check_freq=False, check_names=False, check_dtype=False)
+    assert (actual["Last_time"] == expected["Last_time"]).all()
+
+
+def test_merged_parts_match_direct_aggregation():
+    df = readings('2024-01-01', 1000, 0)
+    # Части пересекаются по интервалам: граница проходит внутри минуты
+    parts = [aggregate_readings(df.iloc[:333], '1m'), aggregate_readings(df.iloc[333:], '1m')]
+
+    assert_rollups_equal(merge_rollups(parts, ["Up_1", "K_1"]), aggregate_readings(df, '1m'))
+
+
+def test_rebucketing_matches_direct_aggregation():
+    df = readings('2024-01-01', 2000, 1)
+
+    merged = merge_rollups([aggregate_readings(df, '1m')], ["Up_1", "K_1"], '1h')
+
+    assert_rollups_equal(merged, aggregate_readings(df, '1h'))
+
+
+class MergingRollupTables:
+    """Fake client whose merge_sensor_rollups merges like the SQL upsert in sql/rollups.sql."""
+
+    def __init__(self):
+        self.tables = {}
+
+    def rpc(self, name, params):
+        assert name == 'merge_sensor_rollups'
+        frame = pd.DataFrame.from_records(params['rows'])
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop("Time"), utc=True))
+        frame["Last_time"] = pd.to_datetime(frame["Last_time"], utc=True)
+        frame = frame.astype({column: float for column in frame.columns if column != "Last_time"})
+        existing = self.tables.get(params['table_name'])
+        parts = [frame] if existing is None else [existing, frame]
+        self.tables[params['table_name']] = merge_rollups(parts, params['sensor_columns'])
+        return self
+
+    def execute(self):
+        return self
+
+
+def builder_for(df):
+    builder = RollupBuilder('t', ["Up_1", "K_1"], "Time")
+    builder.add(df.rename_axis("Time").reset_index())
+    return builder
+
+
+def test_write_merges_consecutive_loads():
+    df = readings('2024-01-01', 3000, 2)
+    supabase = MergingRollupTables()
+
+    builder_for(df.iloc[:1700]).write(supabase)
+    builder_for(df.iloc[1700:]).write(supabase)
+
+    for level in ('1m', '1h', '1d'):
+        assert_rollups_equal(supabase.tables[rollup_table_name('t', level)], aggregate_readings(df, level))
+
+
+class FlakyTable:
+    """Fake client that rejects every insert containing `bad_time`."""
+
+    def __init__(self, bad_time):
+        self.bad_time = bad_time
+
+    def table(self, name):
+        return self
+
+    def insert(self, batch):
+        self.batch = batch
+        return self
+
+    def execute(self):
+        if any(row["Time"] == self.bad_time for row in self.batch):
+            raise RuntimeError("insert failed")
+        return self
+
+
+def test_rollups_skip_failed_batches():
+    df = readings('2024-01-01', 500, 3)
+    records = df.rename_axis("Time").reset_index().assign(Time=lambda frame: frame["Time"].map(pd.Timestamp.isoformat))
+    records = records.to_dict('records')
+    builder = RollupBuilder('t', ["Up_1", "K_1"], "Time")
+
+    pipeline = InsertPipeline('t', batch_size=100, max_workers=2, max_retries=0, supabase=FlakyTable(records[250]["Time"]),
+                              on_batch=lambda batch: builder.add(pd.DataFrame.from_records(batch)))
+    pipeline.submit(records)
+    summary = pipeline.close()
+
+    assert summary["rows_failed"] == 100
+    kept = pd.concat([df.iloc[:200], df.iloc[300:]])
+    assert_rollups_equal(builder.levels()['1m'], aggregate_readings(kept, '1m'))
+
+
+class IngestClient:
+    """Fake client for ingest_csv that records RPC calls; `fail_merge` rejects rollup merges."""
+
+    def __init__(self, fail_merge=False):
+        self.fail_merge = fail_merge
+        self.calls = []
+
+    def get_supabase(self):
+        return self
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        if name == 'merge_sensor_rollups' and self.fail_merge:
+            raise RuntimeError("merge failed")
+        return self
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self.calls.append(('insert', rows))
+        return self
+
+    def upsert(self, rows):
+        return self
+
+    def execute(self):
+        self.data = None
+        return self
+
+
+def csv_stream(periods):
+    times = pd.date_range('2024-01-01', periods=periods, freq='10s')
+    lines = ["Time;Up_1;K_1"] + [f"{time.isoformat()};{i},5;{i % 7}" for i, time in enumerate(times)]
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+@pytest.mark.parametrize("fail_merge", [False, True])
+def test_ingest_records_rollup_completeness(monkeypatch, fail_merge):
+    client = IngestClient(fail_merge)
+    monkeypatch.setattr(Config, 'ROLLUPS_ENABLED', True)
+    monkeypatch.setattr(ingest, 'DBClient', lambda: client)
+
+    result = ingest.ingest_csv(csv_stream(200), 't', batch_size=50, max_workers=2)
+
+    status_calls = [(name, params) for name, params in client.calls if name.endswith('_rollup_load')]
+    assert status_calls[0] == ('begin_rollup_load', {'p_table_name': 't', 'p_reset': True})
+    assert status_calls[-1][0] == 'end_rollup_load'
+    assert len(status_calls) == 2
+    # Вставка начинается только после отметки о начале загрузки
+    names = [name for name, _ in client.calls]
+    first_batch = next(i for i, (name, rows) in enumerate(client.calls) if name == 'insert' and isinstance(rows, list))
+    assert names.index('begin_rollup_load') < first_batch
+    if fail_merge:
+        assert "merge failed" in result["rollups"]["error"]
+        assert "merge failed" in status_calls[-1][1]['p_error']
+    else:
+        assert status_calls[-1][1]['p_error'] is None
+        assert result["rollups"]["1m"]["rows"] == 34
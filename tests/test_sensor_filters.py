@@ -0,0 +1,40 @@
+from urllib.parse import parse_qs
+
+import pytest
+from postgrest import SyncPostgrestClient
+
+from app.sensor_filters import apply_sensor_filters, parse_value_bound, value_filter_expression
+
+
+def test_expression_requires_every_column_in_range():
+    assert value_filter_expression(["Up_1", "K_1"], 1, 2.5) == \
+        "Up_1.gte.1.0,Up_1.lte.2.5,K_1.gte.1.0,K_1.lte.2.5"
+    assert value_filter_expression(["Up_1", "K_1"], value_max=-3) == "Up_1.lte.-3.0,K_1.lte.-3.0"
+    assert value_filter_expression(["Up_1"]) is None
+
+
+def test_expression_quotes_names_that_break_the_syntax():
+    assert value_filter_expression(['a,b', 'c"d'], value_min=0) == '"a,b".gte.0.0,"c\\"d".gte.0.0'
+
+
+def test_filters_compile_to_one_and_param():
+    query = SyncPostgrestClient("http://localhost").from_("t").select("Time,Up_1,K_1")
+    query = apply_sensor_filters(query, ["Up_1", "K_1"], "2024-01-01", "2024-01-02", 0, 10)
+
+    params = parse_qs(str(query.params))
+    assert params["Time"] == ["gte.2024-01-01", "lte.2024-01-02"]
+    assert params["and"] == ["(Up_1.gte.0.0,Up_1.lte.10.0,K_1.gte.0.0,K_1.lte.10.0)"]
+    assert "or" not in params
+
+
+def test_no_value_bounds_add_no_value_param():
+    query = SyncPostgrestClient("http://localhost").from_("t").select("Time,Up_1")
+    params = parse_qs(str(apply_sensor_filters(query, ["Up_1"]).params))
+    assert set(params) == {"select"}
+
+
+@pytest.mark.parametrize("value", ["abc", float("nan"), float("inf"), True, [1]])
+def test_invalid_value_bounds_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_value_bound(value, "value_min")
+
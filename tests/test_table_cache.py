@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app import table_cache as table_cache_module
+from app.forecast import service
+from app.table_cache import TableCache
+
+
+class FakeQuery:
+    """Just enough of the postgrest builder for fetch_rows and TableCache.bounds."""
+
+    def __init__(self, client, df):
+        self.client = client
+        self.df = df
+        self.columns = list(df.columns)
+
+    def select(self, columns):
+        self.columns = columns.split(",")
+        return self
+
+    def gte(self, column, value):
+        self.df = self.df[self.df[column] >= pd.to_datetime(value, utc=True)]
+        return self
+
+    def lte(self, column, value):
+        self.df = self.df[self.df[column] <= pd.to_datetime(value, utc=True)]
+        return self
+
+    def order(self, column, desc=False):
+        self.df = self.df.sort_values(column, ascending=not desc)
+        return self
+
+    def range(self, start, end):
+        self.df = self.df.iloc[start:end + 1]
+        return self
+
+    def limit(self, count):
+        self.df = self.df.iloc[:count]
+        return self
+
+    def execute(self):
+        rows = self.df[self.columns].assign(Time=self.df["Time"].map(lambda value: value.isoformat()))
+        self.client.queries += 1
+        self.client.cells += rows.size
+        self.data = rows.to_dict('records')
+        return self
+
+
+class FakeClient:
+    def __init__(self, df):
+        self.df = df
+        self.queries = 0
+        self.cells = 0
+
+    def get_supabase(self):
+        return self
+
+    def table(self, table_name):
+        return FakeQuery(self, self.df)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    index = pd.date_range('2024-01-01', '2024-01-03 23:59', freq='1min', tz='UTC')
+    values = np.random.default_rng(0).normal(size=(len(index), 3))
+    fake = FakeClient(pd.DataFrame(values, columns=["a", "b", "c"]).assign(Time=index))
+    monkeypatch.setattr(table_cache_module, 'DBClient', lambda: fake)
+    monkeypatch.setattr(service, 'DBClient', lambda: fake)
+    return fake
+
+
+def cache_read(cache, columns, limit, time_start=None, time_end=None, duration=None):
+    return cache.read('t', columns, limit, service.fetch_rows, time_start, time_end, duration)
+
+
+def direct_read(client, columns, limit, time_start=None, time_end=None, duration=None):
+    cells = client.cells
+    rows = service.fetch_rows('t', columns, limit, time_start, time_end, duration)
+    return service.rows_to_frame(rows, columns, dropna=False), client.cells - cells
+
+
+def test_day_partitions_hit_miss_invalidate(client, tmp_path):
+    cache = TableCache(str(tmp_path), enabled=True)
+    cache.bounds('t')
+    expected, direct_cells = direct_read(client, ["a", "b"], 10000, '2024-01-01')
+
+    client.cells = 0
+    cold = cache_read(cache, ["a", "b"], 10000, '2024-01-01')
+    pd.testing.assert_frame_equal(cold, expected, check_freq=False, check_names=False)
+    assert client.cells <= direct_cells
+    assert cache.stats()["day_misses"] == 3
+    assert sorted(os.listdir(tmp_path / 't')) == ['2024-01-01.parquet', '2024-01-02.parquet', '2024-01-03.parquet']
+
+    client.cells = 0
+    warm = cache_read(cache, ["a", "b"], 10000, '2024-01-01')
+    pd.testing.assert_frame_equal(warm, expected, check_freq=False, check_names=False)
+    assert client.cells == 0
+    assert cache.stats()["day_hits"] == 3
+
+    cache.invalidate('t', '2024-01-02T12:00:00+00:00', '2024-01-02T13:00:00+00:00')
+    cache.bounds('t')
+    client.cells = 0
+    again = cache_read(cache, ["a", "b"], 10000, '2024-01-01')
+    pd.testing.assert_frame_equal(again, expected, check_freq=False, check_names=False)
+    # Из базы перечитан только удалённый день
+    assert client.cells == 24 * 60 * 3
+    assert cache.stats()["day_misses"] == 4
+
+
+def test_newest_rows_fetch_no_more_than_direct_query(client, tmp_path):
+    cache = TableCache(str(tmp_path), enabled=True)
+    cache.bounds('t')
+    expected, direct_cells = direct_read(client, ["a"], 500)
+
+    client.cells = 0
+    frame = cache_read(cache, ["a"], 500)
+    pd.testing.assert_frame_equal(frame, expected, check_freq=False, check_names=False)
+    assert client.cells <= direct_cells
+    # Неполный день не сохраняется
+    assert not os.path.exists(tmp_path / 't')
+
+
+def test_new_columns_are_merged_into_day_files(client, tmp_path):
+    cache = TableCache(str(tmp_path), enabled=True)
+    cache_read(cache, ["a"], 10000, '2024-01-02', '2024-01-02T23:59:59.999999+00:00')
+    cache_read(cache, ["b"], 10000, '2024-01-02', '2024-01-02T23:59:59.999999+00:00')
+
+    client.cells = 0
+    frame = cache_read(cache, ["a", "b"], 10000, '2024-01-02', '2024-01-02T23:59:59.999999+00:00')
+    assert client.cells == 0
+    expected, _ = direct_read(client, ["a", "b"], 10000, '2024-01-02', '2024-01-02T23:59:59.999999+00:00')
+    pd.testing.assert_frame_equal(frame, expected, check_freq=False, check_names=False)
@@ -0,0 +1,14 @@
+from app.routes.visualization import visualization
+
+
+def test_pipe_model_builds_geometry_once_outside_lod_tiers(monkeypatch):
+    calls = []
+    build = visualization._build_pipe_geometry
+    monkeypatch.setattr(visualization, '_build_pipe_geometry', lambda *args: calls.append(args) or build(*args))
+    assert (17, 5) not in visualization.LOD_TIERS
+
+    model = visualization.generate_pipe_model(None, length=10.0, radius=0.5, wall_thickness=0.05, segments=17, sections=5)
+
+    assert len(calls) == 1
+    assert model["metadata"]["lod"]["tier"] is None
+    assert model["metadata"]["lod"]["triangles"] == visualization.triangle_count(17, 5)